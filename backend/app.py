@@ -1,18 +1,54 @@
 import os
 import re
+import base64
+import hashlib
+import hmac
+import html
+import json
+import math
+import mimetypes
+import time
 import requests
-from flask import Flask, request, jsonify, send_from_directory
-from flask_bcrypt import Bcrypt
+from flask import Flask, request, jsonify, send_file, g, Response, redirect, stream_with_context
+from werkzeug.security import safe_join
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, JWTManager
 from flask_cors import CORS
 from datetime import datetime, timedelta
 import traceback
+import uuid
+import click
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 from bson import ObjectId
+from bson.errors import InvalidId
+from chunking import wav_duration, transcribe_chunked
+from audio_metadata import probe_audio
+from audio_codec import CODECS, storage_format, encode, decoded_wav, ffmpeg_path
+from preprocess import SpeechMap, detect_speech, write_segments, normalize_wav
+from transcription_cache import TranscriptionCache, hash_audio_file, is_cacheable
+from password_hashing import PasswordHasher
+from ttl_cache import TTLCache
+from database import LazyDatabase
+from export_stream import ndjson_lines, zip_stream
+from compression import negotiate, compress
+from audio_storage import (FilesystemStorage, S3Storage, AudioNotFound,
+                           AudioRangeNotSatisfiable, AudioNotModified, file_etag)
+from providers import HuggingFaceWhisper, OpenAIWhisper, CircuitBreaker, CircuitOpenError, ProviderError
+import metrics
+from metrics import (STAGE_SECONDS, REQUEST_SECONDS, PROVIDER_FALLBACKS, PROVIDER_HEDGES,
+                     AUDIO_INGEST_BYTES, AUDIO_STORED_BYTES, AUDIO_STORED_SECONDS,
+                     SILENCE_TRIMMED_SECONDS)
 import tempfile
-import wave
-import struct
+import threading
+from contextlib import contextmanager
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 load_dotenv()
 
@@ -43,8 +79,52 @@ app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024 
 app.config['UPLOAD_FOLDER'] = '/tmp/audio_files' 
 
+# Durable audio storage: 'filesystem' (UPLOAD_FOLDER) or 's3' (AWS S3 / MinIO).
+# UPLOAD_FOLDER is always the local working directory for ingest.
+AUDIO_STORAGE = os.getenv('AUDIO_STORAGE', 'filesystem').lower()
+# Redirect playback to short-lived presigned object URLs instead of proxying bytes
+AUDIO_S3_REDIRECT = os.getenv('AUDIO_S3_REDIRECT', 'true').lower() in ('1', 'true', 'yes')
+AUDIO_S3_PRESIGN_TTL = int(os.getenv('AUDIO_S3_PRESIGN_TTL', 900))
+
+# Signed audio URLs: expiry is rounded up to a bucket so repeated listings
+# hand out identical (cacheable) URLs within the same window
+AUDIO_URL_TTL = int(os.getenv('AUDIO_URL_TTL', 6 * 3600))
+AUDIO_URL_BUCKET = int(os.getenv('AUDIO_URL_BUCKET', 3600))
+
+# Audio playback caching: files are write-once, so browsers may keep them privately
+AUDIO_CACHE_MAX_AGE = int(os.getenv('AUDIO_CACHE_MAX_AGE', 3600))
+AUDIO_MIMETYPES = {
+    '.wav': 'audio/wav',
+    '.webm': 'audio/webm',
+    '.weba': 'audio/webm',
+    '.mp3': 'audio/mpeg',
+    '.ogg': 'audio/ogg',
+    '.oga': 'audio/ogg',
+    '.opus': 'audio/ogg',
+    '.m4a': 'audio/mp4',
+    '.mp4': 'audio/mp4',
+    '.aac': 'audio/aac',
+    '.flac': 'audio/flac',
+    '.3gp': 'audio/3gpp'
+}
+
+# Transcription result cache (Mongo TTL collection + in-process LRU)
+TRANSCRIPTION_CACHE_TTL = int(os.getenv('TRANSCRIPTION_CACHE_TTL', 7 * 24 * 3600))
+TRANSCRIPTION_CACHE_LRU_SIZE = int(os.getenv('TRANSCRIPTION_CACHE_LRU_SIZE', 256))
+
+# Codec for storing uncompressed (WAV) uploads: opus, flac (lossless) or original.
+# Compressed uploads such as the browser's WebM/Opus are always kept as uploaded.
+AUDIO_STORAGE_CODEC = os.getenv('AUDIO_STORAGE_CODEC', 'opus').lower()
+if AUDIO_STORAGE_CODEC not in CODECS:
+    AUDIO_STORAGE_CODEC = 'opus'
 
-bcrypt = Bcrypt(app)
+
+# bcrypt runs on a process pool sized to the cores (per web worker process)
+password_hasher = PasswordHasher(
+    rounds=int(os.getenv('BCRYPT_LOG_ROUNDS', 12)),
+    max_workers=int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)),
+    timeout=float(os.getenv('PASSWORD_HASH_TIMEOUT', 30))
+)
 jwt = JWTManager(app)
 
 
@@ -52,27 +132,41 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # --- MongoDB Connection ---
 def init_mongodb():
-    """Initialize MongoDB connection with proper error handling"""
-    try:
-        mongodb_uri = os.environ.get('MONGODB_URI')
-        if not mongodb_uri:
-            print("ERROR: MONGODB_URI environment variable not set!")
-            return None
-            
-        client = MongoClient(mongodb_uri, serverSelectionTimeoutMS=5000)
-       
-        client.server_info()
-        db = client.get_database()
-        print("MongoDB connection successful!")
-        
-        # Create indexes for better performance
-        db.users.create_index("email", unique=True)
-        db.transcripts.create_index([("user_id", 1), ("created_at", -1)])
-        
-        return db
-    except Exception as e:
-        print(f" MongoDB connection error: {e}")
+    """
+    Lazy handle on the configured database. No connection is made here; the
+    client is created on first use in each (forked) worker process.
+    """
+    mongodb_uri = os.environ.get('MONGODB_URI')
+    if not mongodb_uri:
+        print("ERROR: MONGODB_URI environment variable not set!")
         return None
+    
+    # Under gevent one worker can hold hundreds of requests; size the pool to match
+    return LazyDatabase.from_uri(
+        mongodb_uri,
+        serverSelectionTimeoutMS=int(os.environ.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        maxPoolSize=int(os.environ.get('MONGODB_MAX_POOL_SIZE', 100))
+    )
+
+def ensure_indexes(database):
+    """Create or update every index the app relies on (run via `flask migrate`)"""
+    database.users.create_index("email", unique=True)
+    database.transcripts.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+    # Per-user full-text search (queries must always filter on user_id)
+    database.transcripts.create_index(
+        [("user_id", 1), ("name", "text"), ("text", "text")],
+        weights={"name": 5, "text": 1},
+        name="transcripts_search"
+    )
+    database.jobs.create_index([("status", 1), ("created_at", 1)])
+    database.user_stats_buckets.create_index([("_id.user_id", 1), ("_id.period", 1), ("_id.start", -1)])
+    try:
+        database.transcription_cache.create_index("created_at", expireAfterSeconds=TRANSCRIPTION_CACHE_TTL)
+    except OperationFailure as e:
+        if e.code != 85:  # IndexOptionsConflict: TRANSCRIPTION_CACHE_TTL changed
+            raise
+        database.command("collMod", "transcription_cache",
+                         index={"keyPattern": {"created_at": 1}, "expireAfterSeconds": TRANSCRIPTION_CACHE_TTL})
 
 
 db = init_mongodb()
@@ -90,14 +184,170 @@ def invalid_token_callback(error):
 def missing_token_callback(error):
     return jsonify({"error": "Authorization token is required"}), 401
 
+@jwt.user_lookup_loader
+def user_lookup_callback(jwt_header, jwt_payload):
+    # Runs on every @jwt_required request; served from user_cache when warm
+    return UserDocument.find_by_id(jwt_payload["sub"])
+
+@jwt.user_lookup_error_loader
+def user_lookup_error_callback(jwt_header, jwt_payload):
+    return jsonify({"error": "User not found"}), 401
+
 
 HUGGINGFACE_API_KEY = os.getenv('HUGGINGFACE_API_KEY')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
+# Optional bearer token protecting /metrics
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+HF_WHISPER_MODEL = "openai/whisper-large-v3"
+OPENAI_WHISPER_MODEL = "whisper-1"
+PROVIDER_MODELS = {"huggingface": HF_WHISPER_MODEL, "openai": OPENAI_WHISPER_MODEL}
+
+# Provider clients keep one keep-alive connection pool each per process
+huggingface_whisper = HuggingFaceWhisper(
+    HUGGINGFACE_API_KEY,
+    HF_WHISPER_MODEL,
+    base_url=os.getenv('HF_API_BASE_URL', 'https://api-inference.huggingface.co/models'),
+    timeout=float(os.getenv('HF_TIMEOUT_SECONDS', 120)),
+    max_retries=int(os.getenv('HF_MAX_RETRIES', 3)),
+    backoff_cap=float(os.getenv('HF_BACKOFF_CAP_SECONDS', 30)),
+    pool_size=int(os.getenv('HF_POOL_SIZE', 10)),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv('HF_BREAKER_THRESHOLD', 5)),
+        reset_timeout=float(os.getenv('HF_BREAKER_RESET_SECONDS', 60))
+    )
+)
+def create_audio_storage():
+    if AUDIO_STORAGE == 's3':
+        return S3Storage(
+            bucket=os.environ['AUDIO_S3_BUCKET'],
+            prefix=os.getenv('AUDIO_S3_PREFIX', 'audio'),
+            endpoint_url=os.getenv('AUDIO_S3_ENDPOINT_URL'),
+            region=os.getenv('AUDIO_S3_REGION'),
+            access_key=os.getenv('AUDIO_S3_ACCESS_KEY_ID'),
+            secret_key=os.getenv('AUDIO_S3_SECRET_ACCESS_KEY'),
+            # MinIO and most self-hosted stores need path-style addressing
+            addressing_style=os.getenv('AUDIO_S3_ADDRESSING_STYLE', 'path' if os.getenv('AUDIO_S3_ENDPOINT_URL') else 'auto'),
+            multipart_threshold=int(os.getenv('AUDIO_S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024)),
+            multipart_chunksize=int(os.getenv('AUDIO_S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024))
+        )
+    return FilesystemStorage(app.config['UPLOAD_FOLDER'])
+
+audio_storage = create_audio_storage()
+
+# Hedging: race OpenAI against HF once HF is slower than its recent p95
+HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', 95))
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', 20))
+HEDGE_INITIAL_DELAY = float(os.getenv('HEDGE_INITIAL_DELAY', 15))
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', 2))
+HEDGE_MAX_DELAY = float(os.getenv('HEDGE_MAX_DELAY', 60))
+hedge_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('HEDGE_MAX_WORKERS', 16)),
+    thread_name_prefix="hedge"
+)
+
+openai_whisper = OpenAIWhisper(
+    OPENAI_API_KEY,
+    OPENAI_WHISPER_MODEL,
+    base_url=os.getenv('OPENAI_BASE_URL') or None,
+    timeout=float(os.getenv('OPENAI_TIMEOUT_SECONDS', 120)),
+    max_retries=int(os.getenv('OPENAI_MAX_RETRIES', 2))
+)
+
 if not HUGGINGFACE_API_KEY and not OPENAI_API_KEY:
     print("⚠️  WARNING: No API keys configured! Transcription will not work.")
+if not ffmpeg_path():
+    print("⚠️  WARNING: ffmpeg not found! WebM/MP4 uploads are sent whole: no chunking, normalization or silence trimming.")
+
+# Background transcription jobs (async ingest mode)
+JOB_WORKERS = int(os.getenv('TRANSCRIBE_WORKERS', 2))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2.0))
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 600))
+# Running jobs renew their lease this often, so only a dead worker's lease expires
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', JOB_LEASE_SECONDS / 3))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+
+# Batch uploads are processed concurrently by a bounded pool per request
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', 50))
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 4))
+
+# Transcript list paging
+TRANSCRIPTS_PAGE_SIZE = 20
+TRANSCRIPTS_MAX_PAGE_SIZE = 100
+TRANSCRIPT_PREVIEW_CHARS = 200
+
+# Transcript search
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+SEARCH_SNIPPET_CHARS = 160
+
+# Transcripts touched by one bulk request
+TRANSCRIPTS_BULK_LIMIT = int(os.getenv('TRANSCRIPTS_BULK_LIMIT', 500))
+
+# Transcripts fetched per query while streaming an export
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 100))
+
+# Long recordings are split into overlapping windows transcribed in parallel
+CHUNK_SECONDS = float(os.getenv('TRANSCRIBE_CHUNK_SECONDS', 30))
+CHUNK_OVERLAP_SECONDS = float(os.getenv('TRANSCRIBE_CHUNK_OVERLAP_SECONDS', 2))
+CHUNK_MAX_WORKERS = int(os.getenv('TRANSCRIBE_CHUNK_WORKERS', 4))
+# Failed windows are retried; a window that still fails fails the whole file
+CHUNK_RETRIES = int(os.getenv('TRANSCRIBE_CHUNK_RETRIES', 1))
+
+# Provider audio is downmixed to mono and resampled to Whisper's native rate;
+# the stored recording keeps its original rate and channels for playback
+AUDIO_NORMALIZE_ENABLED = os.getenv('AUDIO_NORMALIZE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+PROVIDER_SAMPLE_RATE = int(os.getenv('PROVIDER_SAMPLE_RATE', 16000))
+
+# Silence trimming (energy VAD) before audio is sent to the provider
+SILENCE_TRIM_ENABLED = os.getenv('SILENCE_TRIM_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+SILENCE_MIN_MS = int(os.getenv('SILENCE_MIN_MS', 700))
+SILENCE_PAD_MS = int(os.getenv('SILENCE_PAD_MS', 200))
+SILENCE_MARGIN_DB = float(os.getenv('SILENCE_MARGIN_DB', 12))
+# Skip re-encoding when less than this fraction of the recording is silence
+SILENCE_MIN_SAVING = float(os.getenv('SILENCE_MIN_SAVING', 0.1))
+
+# --- Signed Audio URLs ---
+# Dedicated key so audio signatures can't be confused with JWT signatures
+AUDIO_URL_KEY = hmac.new(
+    (os.getenv('AUDIO_URL_SECRET') or app.config['JWT_SECRET_KEY']).encode(),
+    b"audio-url-signing",
+    hashlib.sha256
+).digest()
+
+def _audio_signature(user_id, filename, expires):
+    message = f"{user_id}/{filename}:{expires}".encode()
+    return hmac.new(AUDIO_URL_KEY, message, hashlib.sha256).hexdigest()
+
+def audio_url_expiry():
+    """Expiry stamped on audio URLs signed now (constant within an AUDIO_URL_BUCKET)"""
+    return int(math.ceil((time.time() + AUDIO_URL_TTL) / AUDIO_URL_BUCKET) * AUDIO_URL_BUCKET)
+
+def sign_audio_url(user_id, filename):
+    """Short-lived URL for one audio file, bound to its owner"""
+    expires = audio_url_expiry()
+    signature = _audio_signature(user_id, filename, expires)
+    return f"/audio/{user_id}/{filename}?expires={expires}&sig={signature}"
+
+def verify_audio_signature(user_id, filename, expires, signature):
+    try:
+        if int(expires) < time.time():
+            return False
+    except (TypeError, ValueError):
+        return False
+    expected = _audio_signature(user_id, filename, int(expires))
+    return hmac.compare_digest(expected, signature or "")
 
 # --- Database Models ---
+# Short-lived cache for user lookups; entries are never negative, so a new
+# signup is visible immediately
+user_cache = TTLCache(
+    maxsize=int(os.getenv('USER_CACHE_SIZE', 4096)),
+    ttl_seconds=float(os.getenv('USER_CACHE_TTL', 30))
+)
+
 class UserDocument:
     @staticmethod
     def create(username, email, password_hash):
@@ -108,58 +358,171 @@ class UserDocument:
             "created_at": datetime.utcnow()
         }
     
+    @staticmethod
+    def cache_user(user):
+        user_cache.set(("email", user["email"]), user)
+        user_cache.set(("id", str(user["_id"])), user)
+    
     @staticmethod
     def find_by_email(email):
         if db is None:
             return None
-        return db.users.find_one({"email": email.lower().strip()})
+        email = email.lower().strip()
+        user = user_cache.get(("email", email))
+        if user is None:
+            user = db.users.find_one({"email": email})
+            if user:
+                UserDocument.cache_user(user)
+        return dict(user) if user else None
     
     @staticmethod
     def find_by_id(user_id):
         if db is None:
             return None
-        try:
-            return db.users.find_one({"_id": ObjectId(user_id)})
-        except:
-            return None
+        user = user_cache.get(("id", str(user_id)))
+        if user is None:
+            try:
+                user = db.users.find_one({"_id": ObjectId(user_id)})
+            except InvalidId:
+                return None
+            if user:
+                UserDocument.cache_user(user)
+        return dict(user) if user else None
     
     @staticmethod
     def insert(user_doc):
+        """Insert a user; DuplicateKeyError (email taken) propagates to the caller"""
         if db is None:
             return None
         try:
             result = db.users.insert_one(user_doc)
             return result.inserted_id
+        except DuplicateKeyError:
+            raise
         except Exception as e:
             print(f"User insert error: {e}")
             return None
 
 class TranscriptDocument:
+    # Fields returned by summary listings (everything except the full text)
+    SUMMARY_FIELDS = ("user_id", "name", "audio_filename", "created_at", "updated_at",
+                      "word_count", "sentence_count", "speech_rate", "avg_words_per_sentence",
+                      "speaking_rate", "speech_seconds")
+    # Fields a mutation hands back for stats deltas and audio cleanup
+    MUTATION_FIELDS = ("user_id", "created_at", "audio_filename", "duration_seconds", "audio_bytes",
+                       "speech_seconds", "word_count", "sentence_count", "speech_rate")
+    
     @staticmethod
-    def create(user_id, name, text, audio_filename, analysis):
+    def create(user_id, name, text, audio_filename, analysis, duration_seconds=None, audio_bytes=None,
+               speech_segments=None):
         return {
             "user_id": ObjectId(user_id),
             "name": name,
             "text": text,
             "audio_filename": audio_filename,
+            "duration_seconds": duration_seconds,
+            "audio_bytes": audio_bytes,
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
             "word_count": analysis.get("word_count", 0),
             "sentence_count": analysis.get("sentence_count", 0),
             "speech_rate": analysis.get("speech_rate", 0.0),
-            "avg_words_per_sentence": analysis.get("avg_words_per_sentence", 0.0)
+            "avg_words_per_sentence": analysis.get("avg_words_per_sentence", 0.0),
+            "speaking_rate": analysis.get("speaking_rate", 0.0),
+            "speech_seconds": analysis.get("speech_seconds"),
+            # Kept (start, end) seconds of the original when silence was trimmed
+            "speech_segments": speech_segments
         }
     
     @staticmethod
-    def find_by_user(user_id):
+    def find_page(user_id, cursor=None, limit=TRANSCRIPTS_PAGE_SIZE, summary=False):
+        """
+        Keyset-paginated listing, newest first, ordered by (created_at, _id).
+        Returns (docs, next_cursor). In summary mode the full text is projected
+        out and replaced by a short preview computed server-side.
+        """
         if db is None:
-            return []
+            return [], None
+        
+        query = {"user_id": ObjectId(user_id)}
+        if cursor:
+            created_at, last_id = TranscriptDocument.decode_cursor(cursor)
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": last_id}}
+            ]
+        
+        projection = None
+        if summary:
+            projection = {field: 1 for field in TranscriptDocument.SUMMARY_FIELDS}
+            projection["preview"] = {"$substrCP": ["$text", 0, TRANSCRIPT_PREVIEW_CHARS]}
+        
+        docs = list(db.transcripts.find(query, projection)
+                    .sort([("created_at", -1), ("_id", -1)])
+                    .limit(limit + 1))
+        
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = TranscriptDocument.encode_cursor(docs[-1])
+        
+        return docs, next_cursor
+    
+    @staticmethod
+    def iter_user(user_id, batch_size=EXPORT_BATCH_SIZE):
+        """
+        Every transcript of a user, newest first. Fetched in keyset-paged
+        batches rather than through one long-lived cursor, so a slow consumer
+        (an export streaming audio) never hits the server's cursor timeout.
+        """
+        cursor = None
+        while True:
+            docs, cursor = TranscriptDocument.find_page(user_id, cursor=cursor, limit=batch_size)
+            yield from docs
+            if not cursor:
+                return
+    
+    @staticmethod
+    def search(user_id, query, offset=0, limit=SEARCH_PAGE_SIZE):
+        """
+        Ranked full-text search over one user's transcripts using the
+        transcripts_search text index. Returns (docs, next_offset).
+        """
+        if db is None:
+            return [], None
+        
+        projection = {field: 1 for field in TranscriptDocument.SUMMARY_FIELDS}
+        projection["text"] = 1
+        projection["score"] = {"$meta": "textScore"}
+        
+        docs = list(db.transcripts.find(
+            {"user_id": ObjectId(user_id), "$text": {"$search": query}},
+            projection
+        ).sort([("score", {"$meta": "textScore"}), ("created_at", -1)])
+         .skip(offset)
+         .limit(limit + 1))
+        
+        next_offset = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_offset = offset + limit
+        
+        return docs, next_offset
+    
+    @staticmethod
+    def encode_cursor(doc):
+        raw = f"{doc['created_at'].isoformat()}|{doc['_id']}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """Raises ValueError for malformed cursors"""
         try:
-            return list(db.transcripts.find(
-                {"user_id": ObjectId(user_id)}
-            ).sort("created_at", -1).limit(100))  # Limit for performance
-        except:
-            return []
+            padded = cursor + "=" * (-len(cursor) % 4)
+            created_at, last_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+            return datetime.fromisoformat(created_at), ObjectId(last_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
     
     @staticmethod
     def find_by_id(transcript_id):
@@ -172,181 +535,862 @@ class TranscriptDocument:
     
     @staticmethod
     def insert(transcript_doc):
+        """Insert a transcript; DuplicateKeyError (a preset _id already taken) propagates"""
         if db is None:
             return None
         try:
             result = db.transcripts.insert_one(transcript_doc)
             return result.inserted_id
+        except DuplicateKeyError:
+            raise
         except Exception as e:
             print(f"Transcript insert error: {e}")
             return None
     
     @staticmethod
-    def update(transcript_id, updates):
+    def insert_many(transcript_docs):
+        """
+        Unordered bulk insert. Returns a list of inserted ids aligned with the
+        input (None where a document failed), or None if nothing was written.
+        """
+        if db is None or not transcript_docs:
+            return None
+        try:
+            result = db.transcripts.insert_many(transcript_docs, ordered=False)
+            return list(result.inserted_ids)
+        except BulkWriteError as e:
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            print(f"Transcript bulk insert: {len(failed)} of {len(transcript_docs)} failed")
+            return [None if i in failed else doc.get("_id") for i, doc in enumerate(transcript_docs)]
+        except Exception as e:
+            print(f"Transcript bulk insert error: {e}")
+            return None
+    
+    @staticmethod
+    def owned(transcript_id, user_id):
+        """Filter matching a transcript only when it belongs to user_id (raises InvalidId)"""
+        return {"_id": ObjectId(transcript_id), "user_id": ObjectId(user_id)}
+    
+    @staticmethod
+    def rate_expression(word_count, seconds_field, default):
+        """Server-side form of analyze_transcript's words-per-minute figure"""
+        seconds = {"$max": [{"$ifNull": [seconds_field, default]}, 1]}
+        return {"$round": [{"$multiply": [{"$divide": [word_count, seconds]}, 60]}, 2]}
+    
+    @staticmethod
+    def update(transcript_id, user_id, name=None, text=None, analysis=None):
+        """
+        Rename a user's transcript and/or replace its text in a single
+        find_one_and_update. `analysis` holds the duration-independent figures
+        for the new text; the rates are derived from the stored
+        duration_seconds/speech_seconds inside the update pipeline. Returns the
+        document as it was before the update (MUTATION_FIELDS), or None if the
+        user has no such transcript.
+        """
         if db is None:
-            return False
+            return None
         try:
-            updates["updated_at"] = datetime.utcnow()
-            result = db.transcripts.update_one(
-                {"_id": ObjectId(transcript_id)}, 
-                {"$set": updates}
-            )
-            return result.modified_count > 0
-        except:
-            return False
+            query = TranscriptDocument.owned(transcript_id, user_id)
+        except InvalidId:
+            return None
+        
+        changes = {"updated_at": datetime.utcnow()}
+        if name is not None:
+            changes["name"] = name
+        if text is None:
+            update = {"$set": changes}
+        else:
+            word_count = analysis["word_count"]
+            speech_rate = TranscriptDocument.rate_expression(word_count, "$duration_seconds", 30)
+            changes.update({
+                "text": text,
+                "word_count": word_count,
+                "sentence_count": analysis["sentence_count"],
+                "avg_words_per_sentence": analysis["avg_words_per_sentence"]
+            })
+            # Pipeline stages read user strings starting with "$" as field paths
+            update = [{"$set": {
+                **{field: {"$literal": value} for field, value in changes.items()},
+                "speech_rate": speech_rate,
+                "speaking_rate": {"$cond": [
+                    {"$eq": [{"$ifNull": ["$speech_seconds", None]}, None]},
+                    speech_rate,
+                    TranscriptDocument.rate_expression(word_count, "$speech_seconds", 1)
+                ]}
+            }}]
+        
+        return db.transcripts.find_one_and_update(
+            query, update,
+            projection={field: 1 for field in TranscriptDocument.MUTATION_FIELDS},
+            return_document=ReturnDocument.BEFORE
+        )
     
     @staticmethod
-    def delete(transcript_id):
+    def delete(transcript_id, user_id):
+        """Delete a user's transcript; returns the removed document (MUTATION_FIELDS) or None"""
         if db is None:
-            return False
+            return None
         try:
-            result = db.transcripts.delete_one({"_id": ObjectId(transcript_id)})
-            return result.deleted_count > 0
-        except:
-            return False
+            query = TranscriptDocument.owned(transcript_id, user_id)
+        except InvalidId:
+            return None
+        return db.transcripts.find_one_and_delete(
+            query, projection={field: 1 for field in TranscriptDocument.MUTATION_FIELDS}
+        )
+    
+    @staticmethod
+    def bulk_modify(user_id, delete_ids=(), renames=None):
+        """
+        Delete and rename many of a user's transcripts, every operation scoped
+        to the owner. Each delete is a find_one_and_delete, so the documents
+        returned (for stats and audio cleanup) are exactly the ones this call
+        removed, even when another request deletes some of them concurrently;
+        renames go in one unordered bulk_write. Returns (deleted_docs,
+        renamed_count).
+        """
+        if db is None:
+            return [], 0
+        owner = ObjectId(user_id)
+        delete_ids = [ObjectId(i) for i in delete_ids]
+        renames = {ObjectId(i): name for i, name in (renames or {}).items()}
+        
+        projection = {field: 1 for field in TranscriptDocument.MUTATION_FIELDS}
+        deleted = []
+        for _id in dict.fromkeys(delete_ids):
+            doc = db.transcripts.find_one_and_delete({"_id": _id, "user_id": owner}, projection=projection)
+            if doc:
+                deleted.append(doc)
+        
+        renamed = 0
+        if renames:
+            now = datetime.utcnow()
+            result = db.transcripts.bulk_write([
+                UpdateOne({"_id": _id, "user_id": owner}, {"$set": {"name": name, "updated_at": now}})
+                for _id, name in renames.items()
+            ], ordered=False)
+            renamed = result.matched_count
+        return deleted, renamed
     
     @staticmethod
-    def to_dict(doc, include_audio_url=False, token=None):
+    def to_dict(doc, include_audio_url=False):
         result = {
             "id": str(doc["_id"]),
             "name": doc["name"],
-            "text": doc["text"],
             "createdAt": doc["created_at"].isoformat(),
             "updatedAt": doc["updated_at"].isoformat() if doc.get("updated_at") else None,
             "word_count": doc.get("word_count", 0),
             "sentence_count": doc.get("sentence_count", 0),
             "speech_rate": doc.get("speech_rate", 0.0),
-            "avg_words_per_sentence": doc.get("avg_words_per_sentence", 0.0)
+            "avg_words_per_sentence": doc.get("avg_words_per_sentence", 0.0),
+            "speaking_rate": doc.get("speaking_rate", doc.get("speech_rate", 0.0)),
+            "speech_seconds": doc.get("speech_seconds")
         }
         
-        if include_audio_url and doc.get("audio_filename") and token:
-            result["audioUrl"] = f"/audio/{doc['user_id']}/{doc['audio_filename']}?token={token}"
+        # Summary listings carry a preview instead of the full text
+        if "text" in doc:
+            result["text"] = doc["text"]
+        if "preview" in doc:
+            result["preview"] = doc["preview"]
         
+        if include_audio_url and doc.get("audio_filename"):
+            result["audioUrl"] = sign_audio_url(doc['user_id'], doc['audio_filename'])
+
         return result
 
+class JobDocument:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    @staticmethod
+    def create(user_id, audio_filename, timestamp):
+        return {
+            "user_id": ObjectId(user_id),
+            "audio_filename": audio_filename,
+            "timestamp": timestamp,
+            "status": JobDocument.QUEUED,
+            "attempts": 0,
+            "transcript_id": None,
+            "error": None,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+
+    @staticmethod
+    def insert(job_doc):
+        if db is None:
+            return None
+        try:
+            result = db.jobs.insert_one(job_doc)
+            return result.inserted_id
+        except Exception as e:
+            print(f"Job insert error: {e}")
+            return None
+
+    @staticmethod
+    def find_by_id(job_id):
+        if db is None:
+            return None
+        try:
+            return db.jobs.find_one({"_id": ObjectId(job_id)})
+        except:
+            return None
+
+    @staticmethod
+    def claim_next():
+        """
+        Atomically move the oldest runnable job to running under a new lease
+        owner token. Jobs whose lease expired (the worker holding them died)
+        are picked up again.
+        """
+        if db is None:
+            return None
+        now = datetime.utcnow()
+        try:
+            # One at a time, so exactly one worker cleans up each abandoned upload
+            while True:
+                abandoned = db.jobs.find_one_and_update(
+                    {"status": JobDocument.RUNNING,
+                     "lease_expires_at": {"$lt": now},
+                     "attempts": {"$gte": JOB_MAX_ATTEMPTS}},
+                    {"$set": {"status": JobDocument.FAILED,
+                              "error": "Job abandoned after too many attempts",
+                              "updated_at": now}}
+                )
+                if abandoned is None:
+                    break
+                delete_stored_audio(abandoned["user_id"], abandoned["audio_filename"])
+            return db.jobs.find_one_and_update(
+                {"$or": [
+                    {"status": JobDocument.QUEUED},
+                    {"status": JobDocument.RUNNING, "lease_expires_at": {"$lt": now}}
+                ]},
+                {"$set": {"status": JobDocument.RUNNING,
+                          "lease_owner": uuid.uuid4().hex,
+                          "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                          "updated_at": now},
+                 "$inc": {"attempts": 1}},
+                sort=[("created_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            print(f"Job claim error: {e}")
+            return None
+
+    @staticmethod
+    def renew_lease(job):
+        """Extend a running job's lease; False once another worker has taken it over"""
+        if db is None:
+            return False
+        now = datetime.utcnow()
+        try:
+            result = db.jobs.update_one(
+                {"_id": job["_id"], "status": JobDocument.RUNNING, "lease_owner": job["lease_owner"]},
+                {"$set": {"lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                          "updated_at": now}}
+            )
+            return result.matched_count > 0
+        except Exception as e:
+            print(f"Job lease renewal error: {e}")
+            return False
+
+    @staticmethod
+    def finish(job_id, status, transcript_id=None, error=None, lease_owner=None):
+        """
+        Record a job's outcome. With `lease_owner`, only while that lease still
+        holds the job; returns False if it was lost to another worker.
+        """
+        if db is None:
+            return False
+        query = {"_id": ObjectId(job_id)}
+        if lease_owner is not None:
+            query.update({"status": JobDocument.RUNNING, "lease_owner": lease_owner})
+        try:
+            result = db.jobs.update_one(
+                query,
+                {"$set": {"status": status,
+                          "transcript_id": transcript_id,
+                          "error": error,
+                          "updated_at": datetime.utcnow()},
+                 "$unset": {"lease_expires_at": "", "lease_owner": ""}}
+            )
+            return result.modified_count > 0
+        except:
+            return False
+
+    @staticmethod
+    def to_dict(job):
+        result = {
+            "id": str(job["_id"]),
+            "status": job["status"],
+            "createdAt": job["created_at"].isoformat(),
+            "updatedAt": job["updated_at"].isoformat() if job.get("updated_at") else None
+        }
+
+        if job["status"] == JobDocument.FAILED:
+            result["error"] = job.get("error") or "Processing failed"
+
+        if job["status"] == JobDocument.DONE and job.get("transcript_id"):
+            transcript = TranscriptDocument.find_by_id(job["transcript_id"])
+            if transcript:
+                result["transcript"] = TranscriptDocument.to_dict(
+                    transcript, include_audio_url=True
+                )
+
+        return result
+
+class UserStatsDocument:
+    """
+    Per-user rollups kept current with $inc deltas. Totals live in user_stats
+    (one document per user); daily/weekly buckets live in user_stats_buckets
+    keyed by {user_id, period, start}. Every write to a user's transcripts
+    also bumps the totals' `revision` and `updated_at`, which version the
+    transcript list.
+    """
+    PERIODS = ("daily", "weekly")
+    
+    @staticmethod
+    def bucket_start(created_at, period):
+        day = datetime(created_at.year, created_at.month, created_at.day)
+        if period == "weekly":
+            return day - timedelta(days=day.weekday())  # Monday
+        return day
+    
+    @staticmethod
+    def analysis_delta(old=None, new=None, count=0):
+        old = old or {}
+        new = new or {}
+        delta = {
+            "transcripts": count,
+            "words": new.get("word_count", 0) - old.get("word_count", 0),
+            "sentences": new.get("sentence_count", 0) - old.get("sentence_count", 0),
+            "speech_rate_sum": round(new.get("speech_rate", 0.0) - old.get("speech_rate", 0.0), 4)
+        }
+        # Audio size/length only change when a recording is added or removed
+        if count:
+            source = new if count > 0 else old
+            delta["audio_seconds"] = round(count * (source.get("duration_seconds") or 0), 3)
+            delta["audio_bytes"] = count * (source.get("audio_bytes") or 0)
+        return delta
+    
+    @staticmethod
+    def apply(user_id, created_at, delta):
+        """Atomically add `delta` to the user's totals and to the buckets containing created_at"""
+        if db is None:
+            return False
+        try:
+            user_oid = ObjectId(user_id)
+            db.user_stats.update_one(
+                {"_id": user_oid},
+                {"$inc": {**delta, "revision": 1}, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            if not any(delta.values()):
+                return True
+            for period in UserStatsDocument.PERIODS:
+                db.user_stats_buckets.update_one(
+                    {"_id": {"user_id": user_oid,
+                             "period": period,
+                             "start": UserStatsDocument.bucket_start(created_at, period)}},
+                    {"$inc": delta},
+                    upsert=True
+                )
+            return True
+        except Exception as e:
+            print(f"User stats update error: {e}")
+            return False
+    
+    @staticmethod
+    def record_insert(doc):
+        UserStatsDocument.apply(doc["user_id"], doc["created_at"],
+                                UserStatsDocument.analysis_delta(new=doc, count=1))
+    
+    @staticmethod
+    def record_update(old_doc, new_analysis):
+        UserStatsDocument.apply(old_doc["user_id"], old_doc["created_at"],
+                                UserStatsDocument.analysis_delta(old=old_doc, new=new_analysis))
+    
+    @staticmethod
+    def record_delete(doc):
+        UserStatsDocument.apply(doc["user_id"], doc["created_at"],
+                                UserStatsDocument.analysis_delta(old=doc, count=-1))
+    
+    @staticmethod
+    def record_change(user_id):
+        """A write that moves no figures (a rename) but still changes the list"""
+        UserStatsDocument.apply(user_id, None, {})
+    
+    @staticmethod
+    def record_deletes(user_id, docs):
+        """record_delete for many of a user's transcripts: one $inc per affected rollup document"""
+        if db is None or not docs:
+            return False
+        totals = {}
+        buckets = {}
+        for doc in docs:
+            delta = UserStatsDocument.analysis_delta(old=doc, count=-1)
+            targets = [totals] + [
+                buckets.setdefault((period, UserStatsDocument.bucket_start(doc["created_at"], period)), {})
+                for period in UserStatsDocument.PERIODS
+            ]
+            for target in targets:
+                for field, value in delta.items():
+                    target[field] = target.get(field, 0) + value
+        try:
+            user_oid = ObjectId(user_id)
+            db.user_stats.update_one(
+                {"_id": user_oid},
+                {"$inc": {**totals, "revision": 1}, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            db.user_stats_buckets.bulk_write([
+                UpdateOne({"_id": {"user_id": user_oid, "period": period, "start": start}},
+                          {"$inc": delta}, upsert=True)
+                for (period, start), delta in buckets.items()
+            ], ordered=False)
+            return True
+        except Exception as e:
+            print(f"User stats update error: {e}")
+            return False
+    
+    @staticmethod
+    def find_by_user(user_id):
+        if db is None:
+            return None
+        try:
+            return db.user_stats.find_one({"_id": ObjectId(user_id)})
+        except:
+            return None
+    
+    @staticmethod
+    def version(user_id):
+        """
+        (count, revision, updated_at) of a user's transcripts, read from their
+        single user_stats document; changes with every insert, edit and delete.
+        None without a database.
+        """
+        if db is None:
+            return None
+        stats = db.user_stats.find_one({"_id": ObjectId(user_id)},
+                                       {"transcripts": 1, "revision": 1, "updated_at": 1}) or {}
+        return stats.get("transcripts", 0), stats.get("revision", 0), stats.get("updated_at")
+    
+    @staticmethod
+    def find_buckets(user_id, period, limit):
+        if db is None:
+            return []
+        try:
+            return list(db.user_stats_buckets.find(
+                {"_id.user_id": ObjectId(user_id), "_id.period": period}
+            ).sort("_id.start", -1).limit(limit))
+        except:
+            return []
+    
+    @staticmethod
+    def rebuild(user_id=None):
+        """
+        Recompute rollups from the transcripts collection, for one user or all.
+        Each rollup level is a single aggregation pipeline ending in $merge.
+        """
+        if db is None:
+            return False
+        
+        match = {"user_id": ObjectId(user_id)} if user_id else {}
+        sums = {
+            "transcripts": {"$sum": 1},
+            "words": {"$sum": {"$ifNull": ["$word_count", 0]}},
+            "sentences": {"$sum": {"$ifNull": ["$sentence_count", 0]}},
+            "speech_rate_sum": {"$sum": {"$ifNull": ["$speech_rate", 0]}},
+            "audio_seconds": {"$sum": {"$ifNull": ["$duration_seconds", 0]}},
+            "audio_bytes": {"$sum": {"$ifNull": ["$audio_bytes", 0]}}
+        }
+        
+        db.user_stats.delete_many({"_id": match["user_id"]} if user_id else {})
+        db.user_stats_buckets.delete_many({"_id.user_id": match["user_id"]} if user_id else {})
+        
+        db.transcripts.aggregate([
+            {"$match": match},
+            {"$group": {"_id": "$user_id", **sums}},
+            {"$set": {"updated_at": "$$NOW"}},
+            {"$merge": {"into": "user_stats", "on": "_id", "whenMatched": "replace"}}
+        ])
+        
+        for period, unit in (("daily", "day"), ("weekly", "week")):
+            trunc = {"date": "$created_at", "unit": unit}
+            if unit == "week":
+                trunc["startOfWeek"] = "monday"
+            db.transcripts.aggregate([
+                {"$match": match},
+                {"$group": {
+                    "_id": {"user_id": "$user_id",
+                            "period": {"$literal": period},
+                            "start": {"$dateTrunc": trunc}},
+                    **sums
+                }},
+                {"$merge": {"into": "user_stats_buckets", "on": "_id", "whenMatched": "replace"}}
+            ])
+        return True
+    
+    @staticmethod
+    def to_dict(doc):
+        doc = doc or {}
+        count = doc.get("transcripts", 0)
+        audio_minutes = doc.get("audio_seconds", 0) / 60.0
+        return {
+            "transcripts": count,
+            "total_words": doc.get("words", 0),
+            "total_sentences": doc.get("sentences", 0),
+            "avg_speech_rate": round(doc.get("speech_rate_sum", 0.0) / count, 2) if count else 0.0,
+            "avg_words_per_transcript": round(doc.get("words", 0) / count, 2) if count else 0.0,
+            "audio_minutes": round(audio_minutes, 2),
+            "audio_bytes": doc.get("audio_bytes", 0),
+            "audio_bytes_per_minute": round(doc.get("audio_bytes", 0) / audio_minutes) if audio_minutes else 0
+        }
+
 # --- Whisper Large V3 Transcription (API ONLY) ---
 def transcribe_with_whisper_large_v3(audio_file_path):
     """
     Use Hugging Face API for Whisper Large V3 ONLY
     This is the ONLY transcription method - no local models!
     """
+    return transcribe_with_provider(audio_file_path)[0]
+
+def needs_chunking(duration):
+    """Whether transcribe_with_provider splits audio this long; only the Hugging Face path chunks"""
+    return bool(HUGGINGFACE_API_KEY) and (duration or 0) > CHUNK_SECONDS + CHUNK_OVERLAP_SECONDS
+
+def transcribe_with_provider(audio_file_path):
+    """
+    transcribe_with_whisper_large_v3, returning (text, provider): the provider
+    that produced the text, or None for error markers and for chunked audio
+    whose chunks were answered by different providers
+    """
     if not HUGGINGFACE_API_KEY:
         if OPENAI_API_KEY:
             return transcribe_with_openai_whisper(audio_file_path)
         else:
-            return "[ERROR: No API keys configured]"
+            return "[ERROR: No API keys configured]", None
+    
+    # Long WAV files are fanned out as overlapping chunks (each chunk recurses
+    # back in here, but is short enough to take the single-request path)
+    duration = wav_duration(audio_file_path)
+    if duration is None:
+        # Compact formats are decoded to a temporary WAV only when they need chunking
+        metadata = probe_audio(audio_file_path)
+        if metadata and needs_chunking(metadata.get("duration")):
+            with decoded_wav(audio_file_path, metadata, offload) as wav_path:
+                if wav_path:
+                    return transcribe_with_provider(wav_path)
+    
+    if needs_chunking(duration):
+        providers = set()
+        
+        def transcribe_chunk(chunk_path):
+            text, provider = transcribe_with_provider(chunk_path)
+            if provider:
+                providers.add(provider)
+            return text
+        
+        with tempfile.TemporaryDirectory(prefix="chunks_") as chunk_dir:
+            text = transcribe_chunked(
+                audio_file_path,
+                transcribe_chunk,
+                chunk_dir,
+                window_seconds=CHUNK_SECONDS,
+                overlap_seconds=CHUNK_OVERLAP_SECONDS,
+                max_workers=CHUNK_MAX_WORKERS,
+                retries=CHUNK_RETRIES
+            )
+        if not is_cacheable(text) or len(providers) != 1:
+            return text, None
+        return text, providers.pop()
+    
+    # Race OpenAI against a slow HF request instead of waiting out the timeout
+    if HEDGE_ENABLED and OPENAI_API_KEY and huggingface_whisper.breaker.state == CircuitBreaker.CLOSED:
+        return transcribe_hedged(audio_file_path)
     
     try:
-        # Hugging Face Whisper Large V3 API
-        API_URL = "https://api-inference.huggingface.co/models/openai/whisper-large-v3" 
-        
-        audio_format = audio_file_path.split('.')[-1]
-        headers = {
-            "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
-            "Content-Type": f"audio/{audio_format}"
-        }
-        
-        # Read audio file as binary
-        with open(audio_file_path, "rb") as f:
-            audio_data = f.read()
-        
-        # Make API request with timeout
-        response = requests.post(
-            API_URL, 
-            headers=headers, 
-            data=audio_data, 
-            timeout=120  # 2 minute timeout
-        )
-        
-        print(f"Hugging Face API Status: {response.status_code}")
-        
-        if response.status_code == 200:
-            result = response.json()
-            
-            # Handle different response formats
-            if isinstance(result, dict) and 'text' in result:
-                text = result['text'].strip()
-            elif isinstance(result, str):
-                text = result.strip()
-            else:
-                text = str(result).strip()
-            
-            return text if text else "[No speech detected]"
-            
-        elif response.status_code == 503:
-            print("Model loading, retrying in 10 seconds...")
-            import time
-            time.sleep(10)
-          
-            response = requests.post(API_URL, headers=headers, data=audio_data, timeout=120)
-            if response.status_code == 200:
-                result = response.json()
-                text = result.get('text', '').strip() if isinstance(result, dict) else str(result).strip()
-                return text if text else "[No speech detected]"
-        
-        print(f"Hugging Face API Error: {response.status_code} - {response.text}")
+        text = call_huggingface(audio_file_path)
+        return (text if text else "[No speech detected]"), "huggingface"
+    except Exception as e:
+        return handle_huggingface_failure(e, audio_file_path)
+
+def call_huggingface(audio_file_path, cancel_event=None):
+    with STAGE_SECONDS.labels("huggingface").time():
+        return huggingface_whisper.transcribe(audio_file_path, cancel_event)
+
+def handle_huggingface_failure(error, audio_file_path):
+    """Map a failed HF call to the OpenAI fallback or an error marker; returns (text, provider)"""
+    if isinstance(error, CircuitOpenError):
+        print("Hugging Face circuit open, skipping straight to fallback")
+        if OPENAI_API_KEY:
+            return fallback_to_openai(audio_file_path, "circuit_open")
+        return "[API Error: Hugging Face unavailable]", None
+    
+    if isinstance(error, ProviderError):
+        print(f"Hugging Face API Error: {error.status_code} - {error.message}")
         
         # Fallback to OpenAI if available
         if OPENAI_API_KEY:
-            return transcribe_with_openai_whisper(audio_file_path)
-        
-        return f"[API Error: {response.status_code}]"
+            return fallback_to_openai(audio_file_path, "provider_error")
         
-    except requests.exceptions.Timeout:
+        return f"[API Error: {error.status_code}]", None
+    
+    if isinstance(error, requests.exceptions.Timeout):
         print("Hugging Face API timeout")
-        return "[API Timeout - Try shorter audio]"
-    except Exception as e:
-        print(f"Whisper Large V3 API error: {e}")
         if OPENAI_API_KEY:
-            return transcribe_with_openai_whisper(audio_file_path)
-        return f"[Transcription Error: {str(e)}]"
+            return fallback_to_openai(audio_file_path, "timeout")
+        return "[API Timeout - Try shorter audio]", None
+    
+    print(f"Whisper Large V3 API error: {error}")
+    if OPENAI_API_KEY:
+        return fallback_to_openai(audio_file_path, "exception")
+    return f"[Transcription Error: {str(error)}]", None
+
+def hedge_deadline():
+    """
+    Seconds to wait on HF before hedging: the configured percentile of recent
+    HF latencies, clamped; a fixed initial value until enough samples exist.
+    """
+    tracker = huggingface_whisper.latency
+    if len(tracker) < HEDGE_MIN_SAMPLES:
+        return HEDGE_INITIAL_DELAY
+    return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, tracker.percentile(HEDGE_PERCENTILE)))
+
+def transcribe_hedged(audio_file_path):
+    """
+    Start HF; if it hasn't answered by hedge_deadline(), start OpenAI in
+    parallel and return whichever succeeds first, as (text, provider). The
+    loser is cancelled cooperatively (no further retries) and its result
+    discarded.
+    """
+    cancel_event = threading.Event()
+    hf_future = hedge_executor.submit(call_huggingface, audio_file_path, cancel_event)
+    
+    try:
+        text = hf_future.result(timeout=hedge_deadline())
+        return (text if text else "[No speech detected]"), "huggingface"
+    except FutureTimeoutError:
+        pass
+    except Exception as e:
+        # HF failed before the deadline: normal fallback rules apply
+        return handle_huggingface_failure(e, audio_file_path)
+    
+    print("Hugging Face slower than hedge deadline, starting OpenAI in parallel")
+    PROVIDER_HEDGES.labels("started").inc()
+    openai_future = hedge_executor.submit(call_openai, audio_file_path)
+    pending = {hf_future: "huggingface", openai_future: "openai"}
+    errors = {}
+    
+    while pending:
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for future in done:
+            provider = pending.pop(future)
+            try:
+                text = future.result()
+            except Exception as e:
+                print(f"Hedged {provider} request failed: {e}")
+                errors[provider] = e
+                continue
+            cancel_event.set()
+            PROVIDER_HEDGES.labels(f"{provider}_won").inc()
+            return (text if text else "[No speech detected]"), provider
+    
+    PROVIDER_HEDGES.labels("both_failed").inc()
+    if isinstance(errors.get("huggingface"), requests.exceptions.Timeout):
+        return "[API Timeout - Try shorter audio]", None
+    return f"[OpenAI Error: {str(errors.get('openai'))}]", None
+
+def fallback_to_openai(audio_file_path, reason):
+    PROVIDER_FALLBACKS.labels(reason).inc()
+    return transcribe_with_openai_whisper(audio_file_path)
+
+def call_openai(audio_file_path):
+    with STAGE_SECONDS.labels("openai").time():
+        return openai_whisper.transcribe(audio_file_path)
 
 def transcribe_with_openai_whisper(audio_file_path):
     """
-    Fallback to OpenAI Whisper API
+    Fallback to OpenAI Whisper API; returns (text, provider)
     """
     try:
-        import openai
-        
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        
-        with open(audio_file_path, 'rb') as audio_file:
-            response = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="text"
-            )
-        
-        text = response.strip() if response else ""
-        return text if text else "[No speech detected]"
+        text = call_openai(audio_file_path)
+        return (text if text else "[No speech detected]"), "openai"
         
     except Exception as e:
         print(f"OpenAI Whisper error: {e}")
-        return f"[OpenAI Error: {str(e)}]"
+        return f"[OpenAI Error: {str(e)}]", None
+
+transcription_cache = TranscriptionCache(
+    lambda: db.transcription_cache if db is not None else None,
+    ttl_seconds=TRANSCRIPTION_CACHE_TTL,
+    lru_size=TRANSCRIPTION_CACHE_LRU_SIZE
+)
+
+def preprocessing_signature():
+    """Every setting that shapes what the provider hears (and so its transcript) for a given upload"""
+    return "|".join(str(value) for value in (
+        AUDIO_STORAGE_CODEC, AUDIO_NORMALIZE_ENABLED, PROVIDER_SAMPLE_RATE,
+        SILENCE_TRIM_ENABLED, SILENCE_MARGIN_DB, SILENCE_MIN_MS, SILENCE_PAD_MS, SILENCE_MIN_SAVING,
+        CHUNK_SECONDS, CHUNK_OVERLAP_SECONDS
+    ))
+
+def upload_cache_hash(upload_path):
+    """Hash of the original upload bytes plus the preprocessing settings, or None if unreadable"""
+    try:
+        with STAGE_SECONDS.labels("hash").time():
+            audio_hash = offload(hash_audio_file, upload_path)
+    except Exception as e:
+        print(f"Audio hashing error: {e}")
+        return None
+    return hashlib.sha256(f"{audio_hash}|{preprocessing_signature()}".encode()).hexdigest()
+
+def transcribe_upload(upload_path, metadata, stored_path):
+    """
+    (text, speech_map) for a saved upload, through the transcription cache.
+    Entries are keyed by the original upload bytes, not the provider audio
+    (Ogg encodes differ byte-wise every time), so a hit skips decoding,
+    preprocessing and the API. Identical uploads hit only when the preferred
+    provider/model answered them; results are stored under the provider that
+    actually answered, so an OpenAI fallback is never served as Hugging Face's.
+    """
+    cache_hash = upload_cache_hash(upload_path)
+    preferred = "huggingface" if HUGGINGFACE_API_KEY else "openai"
+    if cache_hash:
+        cached = transcription_cache.get_entry(
+            TranscriptionCache.make_key(cache_hash, preferred, PROVIDER_MODELS[preferred])
+        )
+        if cached is not None:
+            print("Transcription cache hit")
+            speech = SpeechMap.from_dict(cached["speech"]) if cached.get("speech") else None
+            return cached["text"], speech
+
+    provider = None
+    with provider_audio(upload_path, metadata, stored_path) as (provider_path, speech):
+        if provider_path is None:
+            text = "[No speech detected]"
+        else:
+            text, provider = transcribe_with_provider(provider_path)
+
+    if cache_hash and provider:
+        model = PROVIDER_MODELS[provider]
+        transcription_cache.put(TranscriptionCache.make_key(cache_hash, provider, model), text,
+                                provider, model, speech.to_dict() if speech else None)
+    return text, speech
 
 # --- Audio Processing ---
-def convert_to_wav(input_path, output_path):
+def preprocess_for_provider(wav_path, work_dir, stored_path):
+    """
+    Build the audio to send to the provider from a PCM rendition of the
+    upload: normalize to PROVIDER_SAMPLE_RATE mono, then cut long silences.
+    Returns (path, speech_map); path is None when there is no speech at all.
+    Audio that will be chunked is returned as WAV (the chunker splits PCM);
+    anything else (including long audio for OpenAI, which is never chunked
+    and caps uploads at 25 MB) goes out as FLAC, which is lossless and an order of
+    magnitude cheaper to encode than Opus, unless the stored file is smaller.
+    """
+    source = wav_path
+    speech = None
+    
+    if AUDIO_NORMALIZE_ENABLED:
+        normalized_path = os.path.join(work_dir, "normalized.wav")
+        with STAGE_SECONDS.labels("normalize").time():
+            if offload(normalize_wav, wav_path, normalized_path, PROVIDER_SAMPLE_RATE):
+                source = normalized_path
+    
+    if SILENCE_TRIM_ENABLED:
+        with STAGE_SECONDS.labels("vad").time():
+            speech = offload(detect_speech, source, margin_db=SILENCE_MARGIN_DB,
+                             min_silence_ms=SILENCE_MIN_MS, pad_ms=SILENCE_PAD_MS)
+        if not speech.segments:
+            return None, speech
+        if speech.trimmed_seconds >= speech.duration * SILENCE_MIN_SAVING:
+            trimmed_path = os.path.join(work_dir, "trimmed.wav")
+            with STAGE_SECONDS.labels("trim").time():
+                offload(write_segments, source, trimmed_path, speech.segments)
+            SILENCE_TRIMMED_SECONDS.inc(speech.trimmed_seconds)
+            speech.applied = True
+            source = trimmed_path
+    
+    if needs_chunking(wav_duration(source)):
+        return source, speech
+    if source == wav_path:
+        return stored_path, speech
+    
+    target = storage_format(probe_audio(source), "flac")
+    if not target:
+        return source, speech
+    encoded_path = os.path.join(work_dir, f"provider{target[0]}")
+    with STAGE_SECONDS.labels("provider_encode").time():
+        offload(encode, source, encoded_path, target[1], target[2])
+    if not (speech and speech.applied) and os.path.getsize(encoded_path) >= os.path.getsize(stored_path):
+        return stored_path, speech
+    return encoded_path, speech
+
+@contextmanager
+def provider_audio(upload_path, metadata, stored_path):
+    """
+    Yield (path, speech_map) to send to the transcription provider. The
+    upload is decoded to PCM once and preprocessed in a temporary directory
+    that is removed on exit; the stored (playback) audio is never modified.
+    Without preprocessing, or on any error, the stored audio is sent as-is.
+    """
+    if not (AUDIO_NORMALIZE_ENABLED or SILENCE_TRIM_ENABLED):
+        yield stored_path, None
+        return
+    
+    with decoded_wav(upload_path, metadata, offload) as wav_path, \
+            tempfile.TemporaryDirectory(prefix="provider_") as work_dir:
+        path, speech = stored_path, None
+        if wav_path:
+            try:
+                path, speech = preprocess_for_provider(wav_path, work_dir, stored_path)
+            except Exception as e:
+                print(f"Audio preprocessing error: {e}")
+                path, speech = stored_path, None
+        yield path, speech
+
+def encode_for_storage(input_path, output_dir, metadata=None):
     """
-    Convert audio to WAV format for better processing
+    Re-encode uncompressed uploads with AUDIO_STORAGE_CODEC for storage, under
+    the upload's own (unique) name with the new extension. Returns the path to
+    keep: the new file, or input_path when the upload is already compact (or
+    encoding is unavailable or fails).
     """
+    target = storage_format(metadata or probe_audio(input_path), AUDIO_STORAGE_CODEC)
+    if not target:
+        return input_path
+    
+    extension, output_format, subtype = target
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    output_path = os.path.join(output_dir, f"{stem}{extension}")
+    if os.path.abspath(output_path) == os.path.abspath(input_path):
+        return input_path
+    
     try:
-        # Trying simple conversion first
-        with open(input_path, 'rb') as f:
-            audio_data = f.read()
-        
-        # For now, just copy the file - can add conversion later if needed
-        with open(output_path, 'wb') as f:
-            f.write(audio_data)
-        
-        return True
+        encode(input_path, output_path, output_format, subtype)
+        print(f"Encoded {os.path.getsize(input_path)} -> {os.path.getsize(output_path)} bytes ({extension})")
+        return output_path
     except Exception as e:
-        print(f"Audio conversion error: {e}")
-        return False
+        print(f"Audio encoding error: {e}")
+        remove_audio_files(output_path)
+        return input_path
+
+def get_audio_metadata(audio_path):
+    """
+    Read duration, sample rate and channels from the container headers
+    """
+    return probe_audio(audio_path) or {}
 
 def get_audio_duration(audio_path):
     """
-    Estimate audio duration
+    Audio duration from container headers, falling back to a size estimate
     """
+    metadata = get_audio_metadata(audio_path)
+    if metadata.get("duration"):
+        return metadata["duration"]
+    
     try:
         file_size = os.path.getsize(audio_path)
         
@@ -355,16 +1399,19 @@ def get_audio_duration(audio_path):
     except:
         return 30.0  # Default fallback
 
-def analyze_transcript(text, audio_duration_seconds):
+def analyze_transcript(text, audio_duration_seconds, speech_seconds=None):
     """
-    Analyze transcript for speech statistics
+    Analyze transcript for speech statistics. speech_rate is words per minute
+    of recording; speaking_rate uses only the detected speech time, when known.
     """
     if not text or text.strip() in ["[No speech detected]", "[ERROR: No API keys configured]", "[API Timeout - Try shorter audio]"]:
         return {
             "word_count": 0,
             "sentence_count": 0,
             "speech_rate": 0.0,
-            "avg_words_per_sentence": 0.0
+            "avg_words_per_sentence": 0.0,
+            "speaking_rate": 0.0,
+            "speech_seconds": speech_seconds
         }
     
     # Clean text and count words
@@ -379,6 +1426,7 @@ def analyze_transcript(text, audio_duration_seconds):
     
     # Calculate speech rate (words per minute)
     speech_rate = (word_count / max(audio_duration_seconds, 1)) * 60
+    speaking_rate = (word_count / max(speech_seconds, 1)) * 60 if speech_seconds is not None else speech_rate
     
     # Average words per sentence
     avg_words_per_sentence = word_count / sentence_count
@@ -387,29 +1435,420 @@ def analyze_transcript(text, audio_duration_seconds):
         "word_count": word_count,
         "sentence_count": sentence_count,
         "speech_rate": round(speech_rate, 2),
-        "avg_words_per_sentence": round(avg_words_per_sentence, 2)
+        "avg_words_per_sentence": round(avg_words_per_sentence, 2),
+        "speaking_rate": round(speaking_rate, 2),
+        "speech_seconds": speech_seconds
     }
 
+def search_terms(query):
+    """Terms worth highlighting: quoted phrases and plain words, minus negations"""
+    terms = re.findall(r'"([^"]+)"', query)
+    for word in re.sub(r'"[^"]*"', ' ', query).split():
+        if not word.startswith('-'):
+            terms.append(word)
+    return [t.strip() for t in terms if t.strip()]
+
+def highlight_snippet(text, terms, width=SEARCH_SNIPPET_CHARS):
+    """
+    HTML-escaped excerpt of `text` around the first matching term, with every
+    match wrapped in <mark>. Falls back to the start of the text.
+    """
+    if not text:
+        return ""
+    pattern = re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE) if terms else None
+    match = pattern.search(text) if pattern else None
+    
+    start = 0
+    if match:
+        start = max(0, match.start() - width // 3)
+        # Don't cut a word in half at the left edge
+        space = text.rfind(' ', 0, start)
+        start = space + 1 if start and space != -1 else start
+    excerpt = text[start:start + width]
+    
+    parts = []
+    last = 0
+    for m in (pattern.finditer(excerpt) if pattern else []):
+        parts.append(html.escape(excerpt[last:m.start()]))
+        parts.append(f"<mark>{html.escape(m.group(0))}</mark>")
+        last = m.end()
+    parts.append(html.escape(excerpt[last:]))
+    
+    snippet = "".join(parts)
+    if start > 0:
+        snippet = "…" + snippet
+    if start + width < len(text):
+        snippet += "…"
+    return snippet
+
+# --- Transcription Pipeline ---
+def save_uploaded_audio(audio_file, user_id):
+    """
+    Save an uploaded file under the user's audio directory.
+    Returns (file_path, filename, timestamp).
+    """
+    user_audio_dir = os.path.join(app.config['UPLOAD_FOLDER'], str(user_id))
+    os.makedirs(user_audio_dir, exist_ok=True)
+
+    # Timestamp for display, random suffix for uniqueness: no storage probes
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    original_ext = os.path.splitext(audio_file.filename)[1] or '.webm'
+    filename = f"recording_{timestamp}_{uuid.uuid4().hex[:12]}{original_ext}"
+    file_path = os.path.join(user_audio_dir, filename)
+
+    with STAGE_SECONDS.labels("save").time():
+        audio_file.save(file_path)
+    print(f"Audio file saved: {file_path} ({os.path.getsize(file_path)} bytes)")
+
+    return file_path, filename, timestamp
+
+def audio_key(user_id, filename):
+    return f"{user_id}/{filename}"
+
+def store_audio(user_id, file_path, filename):
+    """Move a local working file into durable storage"""
+    with STAGE_SECONDS.labels("store").time():
+        audio_storage.save(audio_key(user_id, filename), file_path, audio_mimetype(filename))
+
+def delete_stored_audio(user_id, filename):
+    if filename and audio_storage.delete(audio_key(user_id, filename)):
+        print(f"Deleted audio file: {audio_key(user_id, filename)}")
+
+def remove_audio_files(*paths):
+    for path in paths:
+        try:
+            if path and os.path.exists(path):
+                os.remove(path)
+        except:
+            pass
+
+def prepare_transcript(user_id, file_path, timestamp):
+    """
+    Run encode -> transcribe -> analyze for a saved upload, then move the
+    compact audio into storage. Returns the (not yet inserted) transcript document.
+    Audio files are removed on failure.
+    """
+    user_audio_dir = os.path.dirname(file_path)
+    filename = os.path.basename(file_path)
+    stored_path = None
+
+    try:
+        metadata = get_audio_metadata(file_path)
+        with STAGE_SECONDS.labels("audio_duration").time():
+            duration_seconds = get_audio_duration(file_path)
+        print(f"Audio duration: {duration_seconds:.1f} seconds")
+        ingest_format = metadata.get("format", "unknown")
+        AUDIO_INGEST_BYTES.labels(ingest_format).inc(os.path.getsize(file_path))
+
+        # Keep a compact copy; the provider is sent the compact file as well
+        with STAGE_SECONDS.labels("encode").time():
+            stored_path = offload(encode_for_storage, file_path, user_audio_dir, metadata)
+        stored_filename = os.path.basename(stored_path)
+        audio_bytes = os.path.getsize(stored_path)
+
+        # Transcribe using Whisper Large V3 API
+        print("Starting Whisper Large V3 transcription...")
+        transcription, speech = transcribe_upload(file_path, metadata, stored_path)
+        print(f"Transcription result: {transcription[:100]}...")
+        speech_seconds = round(speech.speech_seconds, 2) if speech else None
+        # Timestamp map back to the original, only needed when audio was actually cut
+        speech_segments = speech.to_list() if speech and speech.applied else None
+
+        # Analyze transcript
+        with STAGE_SECONDS.labels("analyze").time():
+            analysis = analyze_transcript(transcription, duration_seconds, speech_seconds)
+        print(f"Analysis: {analysis}")
+
+        # Clean up the uncompressed upload (and a queued original already in storage)
+        if stored_path != file_path:
+            remove_audio_files(file_path)
+            delete_stored_audio(user_id, filename)
+
+        store_audio(user_id, stored_path, stored_filename)
+        stored_format = os.path.splitext(stored_filename)[1].lstrip('.') or ingest_format
+        AUDIO_STORED_BYTES.labels(stored_format).inc(audio_bytes)
+        AUDIO_STORED_SECONDS.labels(stored_format).inc(duration_seconds)
+
+        return TranscriptDocument.create(
+            user_id=user_id,
+            name=f"Recording {timestamp}",
+            text=transcription,
+            audio_filename=stored_filename,
+            analysis=analysis,
+            duration_seconds=duration_seconds,
+            audio_bytes=audio_bytes,
+            speech_segments=speech_segments
+        )
+
+    except Exception:
+        remove_audio_files(file_path, stored_path if stored_path != file_path else None)
+        raise
+
+def process_transcription(user_id, file_path, timestamp, transcript_id=None):
+    """
+    Run the full pipeline for a saved upload and insert the result, under
+    `transcript_id` if given. Returns the inserted transcript document.
+    """
+    transcript_doc = prepare_transcript(user_id, file_path, timestamp)
+    if transcript_id is not None:
+        transcript_doc['_id'] = transcript_id
+
+    # Save to MongoDB
+    with STAGE_SECONDS.labels("db_insert").time():
+        transcript_id = TranscriptDocument.insert(transcript_doc)
+    if not transcript_id:
+        delete_stored_audio(user_id, transcript_doc['audio_filename'])
+        raise Exception("Failed to save transcript to database")
+
+    transcript_doc['_id'] = transcript_id
+    UserStatsDocument.record_insert(transcript_doc)
+    return transcript_doc
+
+def process_transcription_batch(user_id, uploads):
+    """
+    Prepare many saved uploads concurrently and store them with one insert_many.
+    `uploads` is a list of (original_name, file_path, timestamp); returns one
+    result dict per upload, in order. A failed file never aborts the others.
+    """
+    results = [{"filename": name} for name, _, _ in uploads]
+    prepared = []
+
+    def prepare(upload):
+        _, file_path, timestamp = upload
+        return prepare_transcript(user_id, file_path, timestamp)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(BATCH_MAX_WORKERS, len(uploads)))) as executor:
+        futures = [executor.submit(prepare, upload) for upload in uploads]
+        for index, future in enumerate(futures):
+            try:
+                prepared.append((index, future.result()))
+            except Exception as e:
+                print(f"Batch item {uploads[index][0]} failed: {e}")
+                results[index].update({"status": "error", "error": f"Processing failed: {str(e)}"})
+
+    if prepared:
+        with STAGE_SECONDS.labels("db_insert_many").time():
+            inserted_ids = TranscriptDocument.insert_many([doc for _, doc in prepared])
+        for position, (index, doc) in enumerate(prepared):
+            inserted_id = inserted_ids[position] if inserted_ids else None
+            if inserted_id is None:
+                delete_stored_audio(user_id, doc['audio_filename'])
+                results[index].update({"status": "error", "error": "Failed to save transcript to database"})
+                continue
+            doc['_id'] = inserted_id
+            UserStatsDocument.record_insert(doc)
+            results[index].update({
+                "status": "ok",
+                "transcript": TranscriptDocument.to_dict(doc, include_audio_url=True)
+            })
+
+    return results
+
+# --- Background Job Workers ---
+_job_wakeup = threading.Event()
+_job_workers_lock = threading.Lock()
+_job_workers_pid = None
+
+def start_job_workers():
+    """
+    Start the bounded pool of transcription worker threads for this process.
+    Safe to call repeatedly; forked processes get their own pool.
+    """
+    global _job_workers_pid
+    if _job_workers_pid == os.getpid() or db is None or JOB_WORKERS <= 0:
+        return
+    with _job_workers_lock:
+        if _job_workers_pid == os.getpid():
+            return
+        for i in range(JOB_WORKERS):
+            worker = threading.Thread(
+                target=_job_worker_loop,
+                name=f"transcribe-worker-{i}",
+                daemon=True
+            )
+            worker.start()
+        _job_workers_pid = os.getpid()
+        print(f"Started {JOB_WORKERS} transcription workers (pid {os.getpid()})")
+
+def _job_worker_loop():
+    while True:
+        job = JobDocument.claim_next()
+        if job is None:
+            _job_wakeup.wait(JOB_POLL_INTERVAL)
+            _job_wakeup.clear()
+            continue
+        run_transcription_job(job)
+
+@contextmanager
+def job_lease_heartbeat(job):
+    """Keep renewing a claimed job's lease while the block runs"""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            if not JobDocument.renew_lease(job):
+                print(f"Job {job['_id']}: lease lost to another worker")
+                return
+
+    heartbeat = threading.Thread(target=beat, name=f"job-lease-{job['_id']}", daemon=True)
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        stop.set()
+
+def run_transcription_job(job):
+    """Process one claimed job and record its outcome while it still holds the lease"""
+    file_path = os.path.join(
+        app.config['UPLOAD_FOLDER'],
+        str(job['user_id']),
+        job['audio_filename']
+    )
+    print(f"Job {job['_id']}: processing {file_path} (attempt {job.get('attempts', 1)})")
+
+    with job_lease_heartbeat(job):
+        try:
+            if not os.path.exists(file_path):
+                # Queued on another instance: pull the upload down from storage
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                try:
+                    audio_storage.fetch(audio_key(job['user_id'], job['audio_filename']), file_path)
+                except AudioNotFound:
+                    raise Exception("Uploaded audio file is missing")
+            try:
+                # The job id doubles as the transcript id: one transcript per job
+                # even if a worker that lost its lease finishes too
+                process_transcription(str(job['user_id']), file_path, job['timestamp'],
+                                      transcript_id=job['_id'])
+            except DuplicateKeyError:
+                print(f"Job {job['_id']}: transcript already stored by another attempt")
+            if not JobDocument.finish(job['_id'], JobDocument.DONE, transcript_id=job['_id'],
+                                      lease_owner=job['lease_owner']):
+                print(f"Job {job['_id']}: lease lost, outcome left to the current owner")
+        except Exception as e:
+            print(f"Job {job['_id']} failed: {e}")
+            traceback.print_exc()
+            if JobDocument.finish(job['_id'], JobDocument.FAILED, error=f"Processing failed: {str(e)}",
+                                  lease_owner=job['lease_owner']):
+                # Failed jobs are not retried, so nothing will ever read the upload again
+                delete_stored_audio(job['user_id'], job['audio_filename'])
+            else:
+                print(f"Job {job['_id']}: lease lost, outcome left to the current owner")
+
+def enqueue_transcription_job(user_id, file_path, filename, timestamp):
+    # Any instance's workers may claim the job, so the upload must be shared
+    store_audio(user_id, file_path, filename)
+    job_doc = JobDocument.create(user_id, filename, timestamp)
+    job_id = JobDocument.insert(job_doc)
+    if not job_id:
+        return None
+    job_doc['_id'] = job_id
+    # Wakes this process's workers, if it runs any; others pick it up on their next poll
+    _job_wakeup.set()
+    return job_doc
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.get('request_started')
+    if started is not None:
+        # Route templates (not raw paths) keep label cardinality bounded
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.labels(request.method, route, response.status_code).observe(
+            time.perf_counter() - started
+        )
+    return response
+
+def dump_json(payload):
+    """Compact JSON bytes, via orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+def json_response(payload, status=200, etag=None):
+    """JSON response with negotiated gzip/brotli compression and an optional weak ETag"""
+    body, encoding = compress(dump_json(payload), negotiate(request.headers.get('Accept-Encoding')))
+    response = Response(body, status=status, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+def private_revalidate(response):
+    """Browsers may keep the response but must revalidate it (If-None-Match) on every use"""
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def transcripts_etag(user_id):
+    """
+    Weak ETag for the user's transcript list under the current query, or
+    None without a database. Covers the signed audio URLs' expiry, so
+    clients pick up fresh links when the signing bucket rolls over.
+    """
+    version = UserStatsDocument.version(user_id)
+    if version is None:
+        return None
+    count, revision, updated_at = version
+    raw = (f"{user_id}|{count}|{revision}|{updated_at.isoformat() if updated_at else ''}|"
+           f"{audio_url_expiry()}|{request.query_string.decode()}")
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+def concurrency_mode():
+    """'gevent' when running under monkey-patched (cooperative) workers"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return "threads"
+    return "gevent" if monkey.is_module_patched("socket") else "threads"
+
+def offload(fn, *args, **kwargs):
+    """
+    Run CPU-bound audio work (hashing, resampling, VAD, encoding) on the gevent
+    hub's native thread pool, so one long upload doesn't stall every other
+    request in the worker; a plain call under threaded workers. `fn` must not
+    touch gevent-patched locks (metrics are recorded by the caller).
+    """
+    if concurrency_mode() == "gevent":
+        from gevent import get_hub
+        return get_hub().threadpool.apply(fn, args, kwargs)
+    return fn(*args, **kwargs)
+
+def wants_async_ingest():
+    if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'respond-async' in request.headers.get('Prefer', '')
+
 # --- API Routes ---
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check with service status"""
     try:
         # Test database
-        db_status = "connected" if db else "disconnected"
+        db_status = db.status() if db is not None else "disconnected"
         
         # Check API keys
         services = {
             "huggingface_whisper": "configured" if HUGGINGFACE_API_KEY else "missing",
-            "openai_whisper": "configured" if OPENAI_API_KEY else "missing"
+            "openai_whisper": "configured" if OPENAI_API_KEY else "missing",
+            "huggingface_circuit": huggingface_whisper.breaker.state,
+            # Needed to decode browser (WebM/Opus) uploads for chunking and preprocessing
+            "ffmpeg": "available" if ffmpeg_path() else "missing"
         }
         
         return jsonify({
             "status": "healthy",
             "database": db_status,
             "services": services,
-            "audio_storage": "filesystem",
+            "audio_storage": audio_storage.name,
             "transcription": "api_only",
+            "transcription_cache": transcription_cache.stats(),
+            "concurrency": concurrency_mode(),
             "timestamp": datetime.utcnow().isoformat()
         }), 200
     except Exception as e:
@@ -418,6 +1857,13 @@ def health_check():
             "error": str(e)
         }), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint, aggregated across worker processes"""
+    if METRICS_TOKEN and request.headers.get('Authorization', '') != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/api/signup', methods=['POST'])
 def signup():
     """User registration"""
@@ -439,16 +1885,15 @@ def signup():
         if len(password) < 6:
             return jsonify({"error": "Password must be at least 6 characters"}), 400
         
-        # Check if user exists
-        if UserDocument.find_by_email(email):
-            return jsonify({"error": "Email already registered"}), 409
-        
-        # Create user
+        # Create user (the unique email index rejects duplicates)
         username = data.get('username', '').strip() or email.split('@')[0]
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        hashed_password = password_hasher.hash(password)
         
         user_doc = UserDocument.create(username, email, hashed_password)
-        user_id = UserDocument.insert(user_doc)
+        try:
+            user_id = UserDocument.insert(user_doc)
+        except DuplicateKeyError:
+            return jsonify({"error": "Email already registered"}), 409
         
         if not user_id:
             return jsonify({"error": "Failed to create user"}), 500
@@ -474,7 +1919,7 @@ def login():
         # Find user
         user = UserDocument.find_by_email(email)
         
-        if user and bcrypt.check_password_hash(user['password_hash'], password):
+        if user and password_hasher.check(user['password_hash'], password):
             # Create JWT token
             access_token = create_access_token(identity=str(user['_id']))
             return jsonify({
@@ -491,26 +1936,95 @@ def login():
 @app.route('/api/transcripts', methods=['GET'])
 @jwt_required()
 def get_transcripts():
-    """Get user's transcripts"""
+    """
+    Get user's transcripts.
+    With ?limit=, ?cursor= or ?summary= the response is a page:
+    {"items": [...], "next_cursor": ...}; otherwise the legacy array of
+    every transcript, read in keyset-paged batches.
+    """
     try:
         current_user_id = get_jwt_identity()
-        transcripts = TranscriptDocument.find_by_user(current_user_id)
         
-        # Get token from header for audio URLs
-        auth_header = request.headers.get('Authorization', '')
-        token = auth_header.replace('Bearer ', '') if auth_header.startswith('Bearer ') else ''
+        # Polls with an unchanged list are answered before any document is read
+        etag = transcripts_etag(current_user_id)
+        if etag and request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            response.vary.add('Accept-Encoding')
+            return private_revalidate(response)
+        
+        paged = any(arg in request.args for arg in ('cursor', 'limit', 'summary'))
+        if not paged:
+            result = [
+                TranscriptDocument.to_dict(t, include_audio_url=True) 
+                for t in TranscriptDocument.iter_user(current_user_id)
+            ]
+            return private_revalidate(json_response(result, etag=etag))
         
-        result = [
-            TranscriptDocument.to_dict(t, include_audio_url=True, token=token) 
-            for t in transcripts
-        ]
+        try:
+            limit = int(request.args.get('limit', TRANSCRIPTS_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, TRANSCRIPTS_MAX_PAGE_SIZE))
+        summary = request.args.get('summary', '').lower() in ('1', 'true', 'yes')
+        
+        cursor = request.args.get('cursor') or None
+        if cursor:
+            try:
+                TranscriptDocument.decode_cursor(cursor)
+            except ValueError:
+                return jsonify({"error": "Invalid cursor"}), 400
         
-        return jsonify(result), 200
+        transcripts, next_cursor = TranscriptDocument.find_page(
+            current_user_id, cursor=cursor, limit=limit, summary=summary
+        )
+        
+        return private_revalidate(json_response({
+            "items": [
+                TranscriptDocument.to_dict(t, include_audio_url=True)
+                for t in transcripts
+            ],
+            "next_cursor": next_cursor
+        }, etag=etag))
         
     except Exception as e:
         print(f"Get transcripts error: {e}")
         return jsonify({"error": "Failed to fetch transcripts"}), 500
 
+@app.route('/api/transcripts/search', methods=['GET'])
+@jwt_required()
+def search_transcripts():
+    """Full-text search across the user's transcripts (?q=&offset=&limit=)"""
+    try:
+        current_user_id = get_jwt_identity()
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"error": "Search query is required"}), 400
+        
+        try:
+            offset = max(0, int(request.args.get('offset', 0)))
+            limit = int(request.args.get('limit', SEARCH_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "offset and limit must be integers"}), 400
+        limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+        
+        docs, next_offset = TranscriptDocument.search(current_user_id, query, offset, limit)
+        terms = search_terms(query)
+        
+        items = []
+        for doc in docs:
+            snippet = highlight_snippet(doc.pop("text", ""), terms)
+            item = TranscriptDocument.to_dict(doc, include_audio_url=True)
+            item["score"] = round(doc.get("score", 0.0), 4)
+            item["snippet"] = snippet
+            items.append(item)
+        
+        return jsonify({"items": items, "next_offset": next_offset}), 200
+        
+    except Exception as e:
+        print(f"Search transcripts error: {e}")
+        return jsonify({"error": "Failed to search transcripts"}), 500
+
 @app.route('/api/transcribe', methods=['POST'])
 @jwt_required()
 def transcribe_audio():
@@ -526,71 +2040,22 @@ def transcribe_audio():
         if audio_file.filename == '':
             return jsonify({"error": "No file selected"}), 400
         
-        # Create user directory
-        user_audio_dir = os.path.join(app.config['UPLOAD_FOLDER'], str(current_user_id))
-        os.makedirs(user_audio_dir, exist_ok=True)
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        original_ext = os.path.splitext(audio_file.filename)[1] or '.webm'
-        filename = f"recording_{timestamp}{original_ext}"
-        file_path = os.path.join(user_audio_dir, filename)
-        
-       
-        audio_file.save(file_path)
-        print(f"Audio file saved: {file_path} ({os.path.getsize(file_path)} bytes)")
-        
-        
-        duration_seconds = get_audio_duration(file_path)
-        print(f"Estimated duration: {duration_seconds:.1f} seconds")
-        
-        # Converting to WAV (for better processing)
-        wav_filename = f"recording_{timestamp}.wav"
-        wav_path = os.path.join(user_audio_dir, wav_filename)
-        
-        if convert_to_wav(file_path, wav_path):
-            transcription_path = wav_path
-            final_filename = wav_filename
-        else:
-            transcription_path = file_path
-            final_filename = filename
-        
-        # Transcribe using Whisper Large V3 API
-        print("Starting Whisper Large V3 transcription...")
-        transcription = transcribe_with_whisper_large_v3(transcription_path)
-        print(f"Transcription result: {transcription[:100]}...")
-        
-        # Analyze transcript
-        analysis = analyze_transcript(transcription, duration_seconds)
-        print(f"Analysis: {analysis}")
-        
-        # Save to MongoDB
-        transcript_doc = TranscriptDocument.create(
-            user_id=current_user_id,
-            name=f"Recording {timestamp}",
-            text=transcription,
-            audio_filename=final_filename,
-            analysis=analysis
-        )
-        
-        transcript_id = TranscriptDocument.insert(transcript_doc)
-        if not transcript_id:
-            raise Exception("Failed to save transcript to database")
+        file_path, filename, timestamp = save_uploaded_audio(audio_file, current_user_id)
         
-        transcript_doc['_id'] = transcript_id
+        # Ingest mode: queue the work and let the background pool process it
+        if wants_async_ingest():
+            job = enqueue_transcription_job(current_user_id, file_path, filename, timestamp)
+            if not job:
+                raise Exception("Failed to queue transcription job")
+            
+            response = jsonify(JobDocument.to_dict(job))
+            response.headers['Location'] = f"/api/jobs/{job['_id']}"
+            return response, 202
         
-        # Clean up temporary files
-        try:
-            if transcription_path != file_path and os.path.exists(file_path):
-                os.remove(file_path) 
-        except:
-            pass
+        transcript_doc = process_transcription(current_user_id, file_path, timestamp)
         
         # Return response with audio URL
-        auth_header = request.headers.get('Authorization', '')
-        token = auth_header.replace('Bearer ', '') if auth_header.startswith('Bearer ') else ''
-        
-        result = TranscriptDocument.to_dict(transcript_doc, include_audio_url=True, token=token)
+        result = TranscriptDocument.to_dict(transcript_doc, include_audio_url=True)
         
         return jsonify(result), 201
 
@@ -598,56 +2063,91 @@ def transcribe_audio():
         print(f"Transcription error: {e}")
         traceback.print_exc()
         
-        
         try:
             if 'file_path' in locals() and os.path.exists(file_path):
                 os.remove(file_path)
-            if 'wav_path' in locals() and os.path.exists(wav_path):
-                os.remove(wav_path)
         except:
             pass
         
         return jsonify({"error": f"Processing failed: {str(e)}"}), 500
 
-@app.route('/api/transcripts/<string:transcript_id>', methods=['PUT'])
+@app.route('/api/transcribe/batch', methods=['POST'])
 @jwt_required()
-def update_transcript(transcript_id):
-    """Update transcript name or text"""
+def transcribe_batch():
+    """Transcribe many uploaded files (multipart field 'audio', repeated) in one request"""
+    current_user_id = get_jwt_identity()
+    uploads = []
+    
+    try:
+        audio_files = [f for f in request.files.getlist('audio') if f.filename]
+        if not audio_files:
+            return jsonify({"error": "No audio files provided"}), 400
+        
+        if len(audio_files) > BATCH_MAX_FILES:
+            return jsonify({"error": f"Too many files. Maximum is {BATCH_MAX_FILES} per batch."}), 400
+        
+        for audio_file in audio_files:
+            file_path, _, timestamp = save_uploaded_audio(audio_file, current_user_id)
+            uploads.append((audio_file.filename, file_path, timestamp))
+        
+        results = process_transcription_batch(current_user_id, uploads)
+        succeeded = sum(1 for r in results if r.get("status") == "ok")
+        
+        return jsonify({
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        }), 201 if succeeded else 500
+        
+    except Exception as e:
+        print(f"Batch transcription error: {e}")
+        traceback.print_exc()
+        remove_audio_files(*[file_path for _, file_path, _ in uploads])
+        return jsonify({"error": f"Processing failed: {str(e)}"}), 500
+
+@app.route('/api/jobs/<string:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Report the status of a queued transcription job"""
     try:
         current_user_id = get_jwt_identity()
-        transcript = TranscriptDocument.find_by_id(transcript_id)
+        job = JobDocument.find_by_id(job_id)
         
-        if not transcript or str(transcript['user_id']) != current_user_id:
-            return jsonify({"error": "Transcript not found or unauthorized"}), 403
+        if not job or str(job['user_id']) != current_user_id:
+            return jsonify({"error": "Job not found"}), 404
         
-        data = request.get_json()
-        updates = {}
+        return jsonify(JobDocument.to_dict(job)), 200
         
-        if 'name' in data:
-            updates['name'] = data['name'].strip()
+    except Exception as e:
+        print(f"Get job error: {e}")
+        return jsonify({"error": "Failed to fetch job"}), 500
+
+@app.route('/api/transcripts/<string:transcript_id>', methods=['PUT'])
+@jwt_required()
+def update_transcript(transcript_id):
+    """Update transcript name or text"""
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json() or {}
         
-        if 'text' in data:
-            updates['text'] = data['text'].strip()
-            
-            
-            try:
-                audio_path = os.path.join(
-                    app.config['UPLOAD_FOLDER'], 
-                    str(transcript['user_id']), 
-                    transcript['audio_filename']
-                )
-                duration = get_audio_duration(audio_path) if os.path.exists(audio_path) else 30
-                analysis = analyze_transcript(data['text'], duration)
-                updates.update(analysis)
-            except Exception as e:
-                print(f"Analysis recalculation error: {e}")
+        name = data['name'].strip() if 'name' in data else None
+        text = data['text'].strip() if 'text' in data else None
+        analysis = analyze_transcript(text, 1) if text is not None else None
         
-        success = TranscriptDocument.update(transcript_id, updates)
+        transcript = TranscriptDocument.update(transcript_id, current_user_id, name, text, analysis)
+        if not transcript:
+            return jsonify({"error": "Transcript not found or unauthorized"}), 403
         
-        if success:
-            return jsonify({"message": "Transcript updated successfully"}), 200
+        if text is not None:
+            # Same figures the update pipeline stored, from the stored durations
+            duration = transcript.get('duration_seconds')
+            analysis = analyze_transcript(text, 30 if duration is None else duration,
+                                          transcript.get('speech_seconds'))
+            UserStatsDocument.record_update(transcript, analysis)
         else:
-            return jsonify({"error": "Failed to update transcript"}), 500
+            UserStatsDocument.record_change(current_user_id)
+        
+        return jsonify({"message": "Transcript updated successfully"}), 200
         
     except Exception as e:
         print(f"Update transcript error: {e}")
@@ -659,75 +2159,244 @@ def delete_transcript(transcript_id):
     """Delete transcript and associated audio file"""
     try:
         current_user_id = get_jwt_identity()
-        transcript = TranscriptDocument.find_by_id(transcript_id)
+        transcript = TranscriptDocument.delete(transcript_id, current_user_id)
         
-        if not transcript or str(transcript['user_id']) != current_user_id:
+        if not transcript:
             return jsonify({"error": "Transcript not found or unauthorized"}), 403
         
-        
+        UserStatsDocument.record_delete(transcript)
         if transcript.get('audio_filename'):
-            audio_path = os.path.join(
-                app.config['UPLOAD_FOLDER'], 
-                str(transcript['user_id']), 
-                transcript['audio_filename']
-            )
             try:
-                if os.path.exists(audio_path):
-                    os.remove(audio_path)
-                    print(f"Deleted audio file: {audio_path}")
+                delete_stored_audio(transcript['user_id'], transcript['audio_filename'])
             except Exception as e:
                 print(f"Error deleting audio file: {e}")
         
-        # Delete from database
-        success = TranscriptDocument.delete(transcript_id)
-        
-        if success:
-            return jsonify({"message": "Transcript deleted successfully"}), 200
-        else:
-            return jsonify({"error": "Failed to delete transcript"}), 500
+        return jsonify({"message": "Transcript deleted successfully"}), 200
         
     except Exception as e:
         print(f"Delete transcript error: {e}")
         return jsonify({"error": "Failed to delete transcript"}), 500
 
-# --- Audio Serving Routes ---
-@app.route('/audio/<string:user_id>/<path:filename>')
-def serve_audio_with_token(user_id, filename):
-    """Serve audio files with JWT token validation"""
-    token = request.args.get('token')
-    if not token:
-        return jsonify({"error": "Token required"}), 401
+@app.route('/api/transcripts/bulk', methods=['POST'])
+@jwt_required()
+def bulk_modify_transcripts():
+    """
+    Delete and/or rename many transcripts in one request:
+    {"delete": [id, ...], "rename": {id: name, ...}}
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        delete_ids = data.get('delete') or []
+        renames = data.get('rename') or {}
+        
+        if not isinstance(delete_ids, list) or not isinstance(renames, dict):
+            return jsonify({"error": "delete must be a list of ids and rename an object of id: name"}), 400
+        if len(delete_ids) + len(renames) > TRANSCRIPTS_BULK_LIMIT:
+            return jsonify({"error": f"At most {TRANSCRIPTS_BULK_LIMIT} transcripts per request"}), 400
+        if not all(isinstance(name, str) and name.strip() for name in renames.values()):
+            return jsonify({"error": "Names must be non-empty strings"}), 400
+        
+        try:
+            deleted, renamed = TranscriptDocument.bulk_modify(
+                current_user_id, delete_ids,
+                {transcript_id: name.strip() for transcript_id, name in renames.items()}
+            )
+        except (InvalidId, TypeError):
+            return jsonify({"error": "Invalid transcript id"}), 400
+        
+        if renamed:
+            UserStatsDocument.record_change(current_user_id)
+        UserStatsDocument.record_deletes(current_user_id, deleted)
+        for transcript in deleted:
+            if transcript.get('audio_filename'):
+                try:
+                    delete_stored_audio(transcript['user_id'], transcript['audio_filename'])
+                except Exception as e:
+                    print(f"Error deleting audio file: {e}")
+        
+        return jsonify({"deleted": len(deleted), "renamed": renamed}), 200
+        
+    except Exception as e:
+        print(f"Bulk transcript error: {e}")
+        return jsonify({"error": "Failed to modify transcripts"}), 500
+
+def export_zip_entries(user_id, include_audio):
+    """transcripts.ndjson first, then each recording under audio/ (two passes over the collection)"""
+    def records():
+        for doc in TranscriptDocument.iter_user(user_id):
+            record = TranscriptDocument.to_dict(doc)
+            if include_audio and doc.get("audio_filename"):
+                record["audioFile"] = f"audio/{doc['audio_filename']}"
+            yield record
+    
+    yield "transcripts.ndjson", ndjson_lines(records()), True, None
+    if not include_audio:
+        return
+    
+    for doc in TranscriptDocument.iter_user(user_id):
+        if not doc.get("audio_filename"):
+            continue
+        try:
+            chunks = audio_storage.iter_chunks(audio_key(user_id, doc["audio_filename"]))
+        except AudioNotFound:
+            print(f"Export: missing audio for transcript {doc['_id']}")
+            continue
+        yield f"audio/{doc['audio_filename']}", chunks, False, doc["created_at"]
+
+@app.route('/api/export', methods=['GET'])
+@jwt_required()
+def export_transcripts():
+    """
+    Stream all of the user's transcripts. ?format=ndjson (default) sends one
+    JSON object per line with signed audio URLs; ?format=zip sends an archive
+    with transcripts.ndjson and the recordings (?audio=0 leaves them out).
+    """
+    current_user_id = get_jwt_identity()
+    export_format = request.args.get('format', 'ndjson').lower()
+    stamp = datetime.utcnow().strftime('%Y%m%d')
+    
+    if export_format == 'ndjson':
+        records = (TranscriptDocument.to_dict(doc, include_audio_url=True)
+                   for doc in TranscriptDocument.iter_user(current_user_id))
+        body, mimetype = ndjson_lines(records), 'application/x-ndjson'
+    elif export_format == 'zip':
+        include_audio = request.args.get('audio', '1').lower() not in ('0', 'false', 'no')
+        body, mimetype = zip_stream(export_zip_entries(current_user_id, include_audio)), 'application/zip'
+    else:
+        return jsonify({"error": "format must be 'ndjson' or 'zip'"}), 400
     
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="transcripts-{stamp}.{export_format}"'
+    # Let proxies pass chunks through as they are produced
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.cache_control.no_store = True
+    return response
+
+@app.route('/api/stats', methods=['GET'])
+@jwt_required()
+def get_stats():
+    """Rolled-up statistics for the user (?bucket=daily|weekly&limit=)"""
     try:
-        from flask_jwt_extended import decode_token
-        decoded_token = decode_token(token)
-        token_user_id = str(decoded_token['sub'])
+        current_user_id = get_jwt_identity()
+        result = UserStatsDocument.to_dict(UserStatsDocument.find_by_user(current_user_id))
         
-        if user_id != token_user_id:
-            return jsonify({"error": "Unauthorized"}), 403
+        period = request.args.get('bucket')
+        if period:
+            if period not in UserStatsDocument.PERIODS:
+                return jsonify({"error": "bucket must be 'daily' or 'weekly'"}), 400
+            try:
+                limit = max(1, min(int(request.args.get('limit', 30)), 366))
+            except ValueError:
+                return jsonify({"error": "limit must be an integer"}), 400
             
+            result["bucket"] = period
+            result["buckets"] = [
+                {"start": b["_id"]["start"].date().isoformat(), **UserStatsDocument.to_dict(b)}
+                for b in UserStatsDocument.find_buckets(current_user_id, period, limit)
+            ]
+        
+        return jsonify(result), 200
+        
     except Exception as e:
-        print(f"Token validation error: {e}")
-        return jsonify({"error": "Invalid token"}), 401
+        print(f"Get stats error: {e}")
+        return jsonify({"error": "Failed to fetch stats"}), 500
+
+# --- Audio Serving Routes ---
+@app.route('/audio/<string:user_id>/<path:filename>')
+def serve_audio_with_token(user_id, filename):
+    """Serve audio files behind a signed, expiring URL"""
+    expires = request.args.get('expires')
+    signature = request.args.get('sig')
+    if not expires or not signature:
+        return jsonify({"error": "Signed URL required"}), 401
     
-    # Serve the file
-    directory = os.path.join(app.config['UPLOAD_FOLDER'], str(user_id))
-    file_path = os.path.join(directory, filename)
+    if not verify_audio_signature(user_id, filename, expires, signature):
+        return jsonify({"error": "Invalid or expired audio URL"}), 403
     
-    if not os.path.exists(file_path):
+    if not safe_join(str(user_id), filename):
         return jsonify({"error": "Audio file not found"}), 404
+    key = audio_key(user_id, filename)
     
-    # Determine MIME type
-    if filename.endswith('.wav'):
-        mimetype = 'audio/wav'
-    elif filename.endswith('.webm'):
-        mimetype = 'audio/webm'
-    elif filename.endswith('.mp3'):
-        mimetype = 'audio/mpeg'
-    else:
-        mimetype = 'audio/wav'
+    # Serve the file
+    file_path = audio_storage.local_path(key)
+    if file_path:
+        return send_audio_file(file_path)
+    
+    try:
+        if AUDIO_S3_REDIRECT:
+            return redirect_to_presigned_audio(key, filename)
+        return stream_stored_audio(key, filename)
+    except AudioNotFound:
+        return jsonify({"error": "Audio file not found"}), 404
+
+def audio_mimetype(filename):
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in AUDIO_MIMETYPES:
+        return AUDIO_MIMETYPES[ext]
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+def send_audio_file(file_path):
+    """
+    Send audio with Range/206, If-None-Match/If-Range (304) handling and a
+    private caching policy so repeat plays and seeks stay on the client.
+    """
+    stat = os.stat(file_path)
+    response = send_file(
+        file_path,
+        mimetype=audio_mimetype(file_path),
+        as_attachment=False,
+        conditional=True,
+        etag=file_etag(stat),
+        last_modified=stat.st_mtime,
+        max_age=AUDIO_CACHE_MAX_AGE
+    )
+    # The URL is per-user; shared caches must not store it
+    response.cache_control.public = None
+    response.cache_control.private = True
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+def redirect_to_presigned_audio(key, filename):
+    """Hand playback to the object store; the app never carries the bytes"""
+    url = audio_storage.presigned_url(key, AUDIO_S3_PRESIGN_TTL, audio_mimetype(filename))
+    response = redirect(url, code=302)
+    # Let the browser reuse the redirect while the presigned URL is still valid
+    response.cache_control.private = True
+    response.cache_control.max_age = max(0, min(AUDIO_CACHE_MAX_AGE, AUDIO_S3_PRESIGN_TTL - 60))
+    return response
+
+def stream_stored_audio(key, filename):
+    """Proxy an object-store read, passing Range/If-None-Match through"""
+    try:
+        stored = audio_storage.get(
+            key,
+            byte_range=request.headers.get('Range'),
+            if_none_match=request.headers.get('If-None-Match')
+        )
+    except AudioNotModified:
+        return Response(status=304)
+    except AudioRangeNotSatisfiable:
+        return Response(status=416)
     
-    return send_from_directory(directory, filename, mimetype=mimetype, as_attachment=False)
+    response = Response(
+        stored.iter_chunks(),
+        status=206 if stored.content_range else 200,
+        mimetype=audio_mimetype(filename),
+        direct_passthrough=True
+    )
+    if stored.content_length is not None:
+        response.headers['Content-Length'] = str(stored.content_length)
+    if stored.content_range:
+        response.headers['Content-Range'] = stored.content_range
+    if stored.etag:
+        response.headers['ETag'] = stored.etag
+    if stored.last_modified:
+        response.last_modified = stored.last_modified
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.cache_control.private = True
+    response.cache_control.max_age = AUDIO_CACHE_MAX_AGE
+    return response
 
 # --- Error Handlers ---
 @app.errorhandler(413)
@@ -738,13 +2407,107 @@ def too_large(e):
 def internal_error(e):
     return jsonify({"error": "Internal server error"}), 500
 
+# --- CLI Commands ---
+@app.cli.command("migrate")
+def migrate_command():
+    """Create or update MongoDB indexes; run once per deploy, before the workers start"""
+    if db is None:
+        raise click.ClickException("MONGODB_URI is not set")
+    ensure_indexes(db)
+    click.echo("Indexes are up to date")
+
+@app.cli.command("run-workers")
+def run_workers_command():
+    """
+    Process queued transcription jobs in this process until interrupted.
+    Its metrics stay in this process (nothing serves /metrics here), so run
+    it without PROMETHEUS_MULTIPROC_DIR; gunicorn.conf.py sets that only for
+    the web workers.
+    """
+    if db is None:
+        raise click.ClickException("MONGODB_URI is not set")
+    if JOB_WORKERS <= 0:
+        raise click.ClickException("TRANSCRIBE_WORKERS must be at least 1")
+    start_job_workers()
+    while True:
+        time.sleep(3600)
+
+@app.cli.command("rebuild-stats")
+@click.option("--user", "user_id", default=None, help="Only rebuild this user's rollups")
+def rebuild_stats_command(user_id):
+    """Rebuild per-user statistics rollups from the transcripts collection"""
+    if db is None:
+        raise click.ClickException("Database connection failed")
+    UserStatsDocument.rebuild(user_id)
+    click.echo("User statistics rebuilt")
+
+@app.cli.command("compact-audio")
+@click.option("--user", "user_id", default=None, help="Only compact this user's recordings")
+@click.option("--limit", default=0, help="Stop after this many recordings (0 = all)")
+def compact_audio_command(user_id, limit):
+    """Re-encode stored WAV recordings with AUDIO_STORAGE_CODEC"""
+    if db is None:
+        raise click.ClickException("Database connection failed")
+    
+    query = {"audio_filename": {"$regex": r"\.wav$"}}
+    if user_id:
+        query["user_id"] = ObjectId(user_id)
+    saved = 0
+    compacted = 0
+    
+    for doc in db.transcripts.find(query).limit(limit):
+        owner = str(doc["user_id"])
+        with tempfile.TemporaryDirectory(prefix="compact_") as work_dir:
+            original_path = os.path.join(work_dir, doc["audio_filename"])
+            try:
+                audio_storage.fetch(audio_key(owner, doc["audio_filename"]), original_path)
+            except AudioNotFound:
+                click.echo(f"Missing audio for {doc['_id']}, skipping")
+                continue
+            
+            encoded_path = encode_for_storage(original_path, work_dir)
+            if encoded_path == original_path:
+                continue
+            
+            audio_bytes = os.path.getsize(encoded_path)
+            duration_seconds = doc.get("duration_seconds") or get_audio_duration(original_path)
+            new_filename = os.path.basename(encoded_path)
+            store_audio(owner, encoded_path, new_filename)
+            
+            # Only switch over if the transcript still points at the WAV
+            result = db.transcripts.update_one(
+                {"_id": doc["_id"], "audio_filename": doc["audio_filename"]},
+                {"$set": {"audio_filename": new_filename,
+                          "audio_bytes": audio_bytes,
+                          "duration_seconds": duration_seconds,
+                          "updated_at": datetime.utcnow()}}
+            )
+            if not result.modified_count:
+                delete_stored_audio(owner, new_filename)
+                continue
+            delete_stored_audio(owner, doc["audio_filename"])
+            UserStatsDocument.apply(owner, doc["created_at"], {
+                "audio_bytes": audio_bytes - (doc.get("audio_bytes") or 0),
+                "audio_seconds": round(duration_seconds - (doc.get("duration_seconds") or 0), 3)
+            })
+            saved += os.path.getsize(original_path) - audio_bytes
+            compacted += 1
+    
+    click.echo(f"Compacted {compacted} recordings, saved {saved / (1024 * 1024):.1f} MB")
+
 # --- Application Startup ---
 if __name__ == '__main__':
     print("Starting Transcribed AI with Whisper Large V3 API...")
     
     # Validate configuration
     if db is None:
-        print("⚠️  WARNING: Database connection failed!")
+        print("⚠️  WARNING: MONGODB_URI is not set!")
+    else:
+        # Local runs create indexes themselves; deploys use `flask migrate`
+        try:
+            ensure_indexes(db)
+        except Exception as e:
+            print(f"⚠️  WARNING: Could not create MongoDB indexes: {e}")
     
     if HUGGINGFACE_API_KEY:
         print("Hugging Face API configured - Whisper Large V3 ready")
@@ -754,6 +2517,7 @@ if __name__ == '__main__':
         print("No transcription APIs configured!")
     
     print("Application started successfully")
+    start_job_workers()
     
     # Get port from environment (Railway/Vercel compatibility)
     port = int(os.environ.get('PORT', 5001))
@@ -0,0 +1,110 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import soundfile
+except (ImportError, OSError):  # OSError: libsndfile missing
+    soundfile = None
+
+BLOCK_FRAMES = 64 * 1024
+CODECS = ("opus", "flac", "original")
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# Only uncompressed uploads are re-encoded; WebM/Ogg/MP3/M4A already carry a
+# compact codec and are stored in their original container
+PCM_FORMATS = ("wav",)
+
+
+def ffmpeg_path():
+    return shutil.which("ffmpeg")
+
+
+def storage_format(metadata, codec):
+    """
+    (extension, soundfile format, subtype) to store audio with `metadata` as,
+    or None to keep the upload as-is.
+    """
+    if codec == "original" or soundfile is None:
+        return None
+    if not metadata or metadata.get("format") not in PCM_FORMATS:
+        return None
+    if codec == "opus" and metadata.get("sample_rate") in OPUS_SAMPLE_RATES:
+        # .ogg rather than .opus: OpenAI's upload endpoint only accepts the former
+        return (".ogg", "OGG", "OPUS")
+    return (".flac", "FLAC", None)
+
+
+def encode(input_path, output_path, output_format, subtype=None):
+    """Re-encode block by block so long recordings are never held in memory"""
+    with soundfile.SoundFile(input_path) as source:
+        if subtype is None:
+            subtype = "PCM_24" if source.subtype == "PCM_24" else "PCM_16"
+        with soundfile.SoundFile(output_path, "w", samplerate=source.samplerate,
+                                 channels=source.channels, format=output_format,
+                                 subtype=subtype) as target:
+            for block in source.blocks(BLOCK_FRAMES, dtype="int16" if subtype == "PCM_16" else "float32"):
+                target.write(block)
+
+
+def _soundfile_to_wav(input_path, output_path):
+    try:
+        with soundfile.SoundFile(input_path) as source:
+            with soundfile.SoundFile(output_path, "w", samplerate=source.samplerate,
+                                     channels=source.channels, format="WAV",
+                                     subtype="PCM_16") as target:
+                for block in source.blocks(BLOCK_FRAMES, dtype="int16"):
+                    target.write(block)
+        return True
+    except RuntimeError:
+        return False  # not a format libsndfile knows
+
+
+def decode_to_wav(input_path, output_path, run=None):
+    """
+    Decode any stored format to 16-bit PCM WAV. libsndfile covers FLAC and
+    Ogg; other containers (WebM, MP4) need ffmpeg. Returns False if neither
+    can read the file. `run(fn, *args)` executes the in-process (CPU-bound)
+    libsndfile decode, e.g. on a thread pool; ffmpeg already runs apart.
+    """
+    run = run or (lambda fn, *args: fn(*args))
+    if soundfile is not None and run(_soundfile_to_wav, input_path, output_path):
+        return True
+
+    ffmpeg = ffmpeg_path()
+    if not ffmpeg:
+        return False
+    result = subprocess.run(
+        [ffmpeg, "-nostdin", "-loglevel", "error", "-y", "-i", input_path,
+         "-vn", "-c:a", "pcm_s16le", "-f", "wav", output_path],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        print(f"ffmpeg decode failed: {result.stderr.decode(errors='replace').strip()[:200]}")
+        return False
+    return True
+
+
+@contextmanager
+def decoded_wav(input_path, metadata=None, run=None):
+    """
+    Yield a WAV rendition of `input_path` for consumers that need PCM (the
+    chunker), decoded once into a temporary file that is removed afterwards.
+    Yields the input itself when it already is WAV, or None if undecodable.
+    `run` is passed on to decode_to_wav.
+    """
+    if metadata and metadata.get("format") in PCM_FORMATS:
+        yield input_path
+        return
+
+    fd, output_path = tempfile.mkstemp(prefix="decoded_", suffix=".wav")
+    os.close(fd)
+    try:
+        yield output_path if decode_to_wav(input_path, output_path, run) else None
+    finally:
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
@@ -0,0 +1,350 @@
+import os
+import struct
+
+# How much of the file start/end we are willing to read when probing
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 256 * 1024
+
+
+def probe_audio(audio_path):
+    """
+    Read duration, sample rate and channel count from container headers
+    without decoding the stream. Supports RIFF/WAV, FLAC, WebM/Matroska, MP3
+    and Ogg (Opus/Vorbis). Returns a dict or None if the format isn't recognised;
+    individual fields may be None when the container doesn't carry them.
+    """
+    try:
+        file_size = os.path.getsize(audio_path)
+        with open(audio_path, 'rb') as f:
+            head = f.read(HEAD_BYTES)
+
+            if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+                return _probe_wav(f, file_size)
+            if head[:4] == b'fLaC':
+                return _probe_flac(head)
+            if head[:4] == b'\x1a\x45\xdf\xa3':
+                return _probe_matroska(f, head, file_size)
+            if head[:4] == b'OggS':
+                return _probe_ogg(f, head, file_size)
+            if head[:3] == b'ID3' or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+                return _probe_mp3(f, head, file_size)
+    except Exception as e:
+        print(f"Audio probe error: {e}")
+    return None
+
+
+def _result(fmt, duration=None, sample_rate=None, channels=None):
+    return {
+        "format": fmt,
+        "duration": round(duration, 3) if duration is not None else None,
+        "sample_rate": sample_rate,
+        "channels": channels
+    }
+
+
+# --- RIFF / WAV ---
+def _probe_wav(f, file_size):
+    f.seek(12)
+    channels = sample_rate = byte_rate = None
+
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        chunk_id, chunk_size = struct.unpack('<4sI', header)
+
+        if chunk_id == b'fmt ':
+            fmt = f.read(min(chunk_size, 16))
+            _, channels, sample_rate, byte_rate = struct.unpack('<HHII', fmt[:12])
+            f.seek(chunk_size - len(fmt) + (chunk_size & 1), os.SEEK_CUR)
+        elif chunk_id == b'data':
+            # Streaming writers leave 0 or 0xFFFFFFFF; fall back to what's on disk
+            data_size = chunk_size
+            available = file_size - f.tell()
+            if data_size in (0, 0xFFFFFFFF) or data_size > available:
+                data_size = available
+            duration = data_size / byte_rate if byte_rate else None
+            return _result("wav", duration, sample_rate, channels)
+        else:
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+    return _result("wav", None, sample_rate, channels)
+
+
+# --- FLAC ---
+def _probe_flac(head):
+    # STREAMINFO is always the first metadata block: after the 4-byte block
+    # header, 10 bytes of block/frame sizes, then a packed 64-bit field of
+    # sample rate (20 bits), channels - 1 (3), bits per sample - 1 (5) and
+    # total samples (36)
+    if len(head) < 26 or head[4] & 0x7F != 0:
+        return _result("flac")
+    packed = struct.unpack('>Q', head[18:26])[0]
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    # A total of 0 means the encoder didn't know it (streamed output)
+    duration = total_samples / float(sample_rate) if sample_rate and total_samples else None
+    return _result("flac", duration, sample_rate or None, channels)
+
+
+# --- WebM / Matroska (EBML) ---
+EBML_SEGMENT = 0x18538067
+EBML_INFO = 0x1549A966
+EBML_TIMECODE_SCALE = 0x2AD7B1
+EBML_DURATION = 0x4489
+EBML_TRACKS = 0x1654AE6B
+EBML_TRACK_ENTRY = 0xAE
+EBML_AUDIO = 0xE1
+EBML_SAMPLING_FREQUENCY = 0xB5
+EBML_CHANNELS = 0x9F
+EBML_CLUSTER = 0x1F43B675
+EBML_CLUSTER_TIMECODE = 0xE7
+EBML_SIMPLE_BLOCK = 0xA3
+EBML_BLOCK_GROUP = 0xA0
+EBML_BLOCK = 0xA1
+
+# Elements we descend into rather than skip
+EBML_CONTAINERS = {EBML_SEGMENT, EBML_INFO, EBML_TRACKS, EBML_TRACK_ENTRY, EBML_AUDIO}
+
+
+def _read_vint(buf, pos, keep_marker=False):
+    """Decode an EBML variable-length integer. Returns (value, length, unknown)"""
+    first = buf[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8 or pos + length > len(buf):
+        raise ValueError("Invalid EBML vint")
+
+    value = first if keep_marker else first & (mask - 1)
+    for b in buf[pos + 1:pos + length]:
+        value = (value << 8) | b
+
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _ebml_uint(data):
+    return int.from_bytes(data, 'big') if data else 0
+
+
+def _ebml_float(data):
+    if len(data) == 4:
+        return struct.unpack('>f', data)[0]
+    if len(data) == 8:
+        return struct.unpack('>d', data)[0]
+    return None
+
+
+def _probe_matroska(f, head, file_size):
+    timecode_scale = 1000000  # default: milliseconds
+    duration_ticks = None
+    sample_rate = None
+    channels = None
+
+    pos = 0
+    while pos < len(head) - 2:
+        try:
+            element_id, id_len, _ = _read_vint(head, pos, keep_marker=True)
+            size, size_len, unknown = _read_vint(head, pos + id_len)
+        except (ValueError, IndexError):
+            break
+        data_start = pos + id_len + size_len
+
+        if element_id == EBML_CLUSTER:
+            break
+        if element_id in EBML_CONTAINERS:
+            pos = data_start
+            continue
+
+        data = head[data_start:data_start + size] if not unknown else b''
+        if element_id == EBML_TIMECODE_SCALE:
+            timecode_scale = _ebml_uint(data) or timecode_scale
+        elif element_id == EBML_DURATION:
+            duration_ticks = _ebml_float(data)
+        elif element_id == EBML_SAMPLING_FREQUENCY and sample_rate is None:
+            value = _ebml_float(data)
+            sample_rate = int(value) if value else None
+        elif element_id == EBML_CHANNELS and channels is None:
+            channels = _ebml_uint(data)
+
+        if unknown:
+            break
+        pos = data_start + size
+
+    if duration_ticks:
+        duration = duration_ticks * timecode_scale / 1e9
+    else:
+        # MediaRecorder output is written live and carries no Duration;
+        # derive it from the last cluster's timecodes in the file tail
+        last_ticks = _matroska_last_timecode(f, file_size)
+        duration = last_ticks * timecode_scale / 1e9 if last_ticks is not None else None
+
+    return _result("webm", duration, sample_rate, channels)
+
+
+def _matroska_last_timecode(f, file_size):
+    start = max(0, file_size - TAIL_BYTES)
+    f.seek(start)
+    tail = f.read(TAIL_BYTES)
+
+    marker = EBML_CLUSTER.to_bytes(4, 'big')
+    pos = tail.rfind(marker)
+    while pos != -1:
+        ticks = _cluster_last_timecode(tail, pos)
+        if ticks is not None:
+            return ticks
+        pos = tail.rfind(marker, 0, pos)
+    return None
+
+
+def _cluster_last_timecode(buf, pos):
+    try:
+        _, size_len, _ = _read_vint(buf, pos + 4)
+    except (ValueError, IndexError):
+        return None
+    pos += 4 + size_len
+
+    cluster_time = None
+    last_block = 0
+    while pos < len(buf) - 2:
+        try:
+            element_id, id_len, _ = _read_vint(buf, pos, keep_marker=True)
+            size, size_len, unknown = _read_vint(buf, pos + id_len)
+        except (ValueError, IndexError):
+            break
+        data_start = pos + id_len + size_len
+
+        if element_id == EBML_CLUSTER or unknown:
+            break
+        if element_id == EBML_BLOCK_GROUP:
+            pos = data_start
+            continue
+        if data_start + size > len(buf):
+            break
+
+        if element_id == EBML_CLUSTER_TIMECODE:
+            cluster_time = _ebml_uint(buf[data_start:data_start + size])
+        elif element_id in (EBML_SIMPLE_BLOCK, EBML_BLOCK):
+            # Block: track number vint, then a signed 16-bit relative timecode
+            _, track_len, _ = _read_vint(buf, data_start)
+            rel = struct.unpack('>h', buf[data_start + track_len:data_start + track_len + 2])[0]
+            last_block = max(last_block, rel)
+        pos = data_start + size
+
+    if cluster_time is None:
+        return None
+    return cluster_time + last_block
+
+
+# --- Ogg (Opus / Vorbis) ---
+def _probe_ogg(f, head, file_size):
+    # First page carries the codec identification header
+    segments = head[26]
+    packet = head[27 + segments:]
+
+    if packet[:8] == b'OpusHead':
+        channels = packet[9]
+        pre_skip = struct.unpack('<H', packet[10:12])[0]
+        sample_rate = struct.unpack('<I', packet[12:16])[0] or 48000
+        granule_rate, offset, fmt = 48000, pre_skip, "opus"
+    elif packet[:7] == b'\x01vorbis':
+        channels = packet[11]
+        sample_rate = struct.unpack('<I', packet[12:16])[0]
+        granule_rate, offset, fmt = sample_rate, 0, "ogg"
+    else:
+        return _result("ogg")
+
+    # Last page's granule position is the total sample count
+    start = max(0, file_size - TAIL_BYTES)
+    f.seek(start)
+    tail = f.read(TAIL_BYTES)
+    pos = tail.rfind(b'OggS')
+    duration = None
+    while pos != -1:
+        if pos + 14 <= len(tail):
+            granule = struct.unpack('<q', tail[pos + 6:pos + 14])[0]
+            if granule >= 0:
+                duration = max(0, granule - offset) / float(granule_rate)
+                break
+        pos = tail.rfind(b'OggS', 0, pos)
+
+    return _result(fmt, duration, sample_rate, channels)
+
+
+# --- MP3 ---
+MP3_BITRATES = {
+    # (mpeg1?, layer) -> kbps table indexed by the 4-bit bitrate field
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _probe_mp3(f, head, file_size):
+    offset = 0
+    if head[:3] == b'ID3':
+        # ID3v2 size is a 28-bit syncsafe integer
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        offset = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+        if offset + 4 > len(head):
+            f.seek(offset)
+            head = f.read(HEAD_BYTES)
+            base = offset
+        else:
+            base = 0
+    else:
+        base = 0
+
+    # Find the first valid frame header
+    pos = offset - base
+    while pos < len(head) - 4:
+        if head[pos] == 0xFF and head[pos + 1] & 0xE0 == 0xE0:
+            header = struct.unpack('>I', head[pos:pos + 4])[0]
+            version = (header >> 19) & 3
+            layer_bits = (header >> 17) & 3
+            bitrate_index = (header >> 12) & 0xF
+            rate_index = (header >> 10) & 3
+            if version != 1 and layer_bits != 0 and bitrate_index not in (0, 15) and rate_index != 3:
+                break
+        pos += 1
+    else:
+        return _result("mp3")
+
+    mpeg1 = version == 3
+    layer = 4 - layer_bits
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    bitrate = MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    channels = 1 if (header >> 6) & 3 == 3 else 2
+    if layer == 1:
+        samples_per_frame = 384
+    elif layer == 3 and not mpeg1:
+        samples_per_frame = 576
+    else:
+        samples_per_frame = 1152
+
+    # VBR files carry an exact frame count in a Xing/Info or VBRI header
+    side_info = (17 if channels == 1 else 32) if mpeg1 else (9 if channels == 1 else 17)
+    frames = None
+    xing = pos + 4 + side_info
+    if head[xing:xing + 4] in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', head[xing + 4:xing + 8])[0]
+        if flags & 1:
+            frames = struct.unpack('>I', head[xing + 8:xing + 12])[0]
+    elif head[pos + 36:pos + 40] == b'VBRI':
+        frames = struct.unpack('>I', head[pos + 50:pos + 54])[0]
+
+    if frames:
+        duration = frames * samples_per_frame / float(sample_rate)
+    else:
+        audio_bytes = file_size - (base + pos)
+        duration = audio_bytes * 8 / float(bitrate) if bitrate else None
+
+    return _result("mp3", duration, sample_rate, channels)
@@ -0,0 +1,351 @@
+import hashlib
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class AudioNotFound(Exception):
+    pass
+
+
+class AudioRangeNotSatisfiable(Exception):
+    pass
+
+
+class AudioNotModified(Exception):
+    pass
+
+
+class StoredAudio:
+    """A (possibly partial) read of a stored object"""
+
+    def __init__(self, body, content_length, content_range=None, etag=None,
+                 last_modified=None, content_type=None):
+        self.body = body
+        self.content_length = content_length
+        self.content_range = content_range
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_type = content_type
+
+    def iter_chunks(self, chunk_size=READ_CHUNK_SIZE):
+        try:
+            while True:
+                block = self.body.read(chunk_size)
+                if not block:
+                    break
+                yield block
+        finally:
+            self.close()
+
+    def close(self):
+        try:
+            self.body.close()
+        except Exception:
+            pass
+
+
+def file_etag(stat):
+    """Strong ETag (unquoted) from file identity; stored audio is never rewritten in place"""
+    identity = f"{stat.st_dev}-{stat.st_ino}-{stat.st_size}-{stat.st_mtime_ns}"
+    return hashlib.sha1(identity.encode()).hexdigest()
+
+
+def _etag_matches(if_none_match, etag):
+    """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == f'"{etag}"':
+            return True
+    return False
+
+
+def _parse_range(byte_range, size):
+    """
+    (start, end) inclusive for a single "bytes=" range, or None to send the
+    whole object (absent, malformed or multi-range headers, as S3 does).
+    Raises AudioRangeNotSatisfiable for ranges outside the object.
+    """
+    unit, _, spec = (byte_range or "").partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    try:
+        if not dash:
+            return None
+        if not first:
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise AudioRangeNotSatisfiable(byte_range)
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise AudioRangeNotSatisfiable(byte_range)
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+class _BoundedReader:
+    """File-like view of the next `remaining` bytes of an open file"""
+
+    def __init__(self, handle, remaining):
+        self.handle = handle
+        self.remaining = remaining
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        block = self.handle.read(size)
+        self.remaining -= len(block)
+        return block
+
+    def close(self):
+        self.handle.close()
+
+
+def _iter_file(handle, chunk_size):
+    with handle:
+        while True:
+            block = handle.read(chunk_size)
+            if not block:
+                break
+            yield block
+
+
+class FilesystemStorage:
+    """
+    Audio kept on local disk under `root`, keyed "<user_id>/<filename>".
+    The root doubles as the working directory, so saving a file that already
+    lives at its key's path is free.
+    """
+    name = "filesystem"
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise AudioNotFound(key)
+        return path
+
+    def save(self, key, source_path, content_type=None):
+        destination = self._path(key)
+        if os.path.abspath(source_path) == destination:
+            return
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.move(source_path, destination)
+
+    def fetch(self, key, destination_path):
+        source = self._path(key)
+        if not os.path.isfile(source):
+            raise AudioNotFound(key)
+        if os.path.abspath(destination_path) != source:
+            shutil.copyfile(source, destination_path)
+
+    def exists(self, key):
+        return os.path.isfile(self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+            return True
+        except (OSError, AudioNotFound):
+            return False
+
+    def local_path(self, key):
+        """Path to serve directly from disk, or None if the object is absent"""
+        try:
+            path = self._path(key)
+        except AudioNotFound:
+            return None
+        return path if os.path.isfile(path) else None
+
+    def presigned_url(self, key, expires_in, content_type=None):
+        return None
+
+    def get(self, key, byte_range=None, if_none_match=None):
+        """
+        Read an object, optionally a byte range ("bytes=start-end" as sent by
+        the browser), with the same semantics as S3Storage.get. The returned
+        body must be consumed or closed.
+        """
+        path = self.local_path(key)
+        if path is None:
+            raise AudioNotFound(key)
+        handle = open(path, "rb")
+        try:
+            stat = os.fstat(handle.fileno())
+            etag = file_etag(stat)
+            if if_none_match and _etag_matches(if_none_match, etag):
+                raise AudioNotModified(key)
+            span = _parse_range(byte_range, stat.st_size)
+            start, end = span if span else (0, stat.st_size - 1)
+            handle.seek(start)
+        except BaseException:
+            handle.close()
+            raise
+        return StoredAudio(
+            body=_BoundedReader(handle, end - start + 1),
+            content_length=end - start + 1,
+            content_range=f"bytes {start}-{end}/{stat.st_size}" if span else None,
+            etag=f'"{etag}"',
+            last_modified=datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+        )
+
+    def iter_chunks(self, key, chunk_size=READ_CHUNK_SIZE):
+        """Read a whole object in chunks; raises AudioNotFound up front"""
+        path = self.local_path(key)
+        if path is None:
+            raise AudioNotFound(key)
+        return _iter_file(open(path, "rb"), chunk_size)
+
+
+class S3Storage:
+    """
+    Audio in an S3-compatible bucket (AWS S3, MinIO). Uploads go through
+    boto3's managed transfer, which streams the file in multipart chunks
+    above `multipart_threshold`; reads support HTTP byte ranges and can be
+    handed off to clients as presigned URLs.
+    """
+    name = "s3"
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, region=None,
+                 access_key=None, secret_key=None, addressing_style="auto",
+                 multipart_threshold=8 * 1024 * 1024, multipart_chunksize=8 * 1024 * 1024,
+                 max_pool_connections=20):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.endpoint_url = endpoint_url or None
+        self.region = region or None
+        self.access_key = access_key or None
+        self.secret_key = secret_key or None
+        self.addressing_style = addressing_style
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+        self.max_pool_connections = max_pool_connections
+        self._client = None
+        self._transfer_config = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # boto3 is only needed when this backend is configured
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3
+                    from boto3.s3.transfer import TransferConfig
+                    from botocore.config import Config
+                    self._transfer_config = TransferConfig(
+                        multipart_threshold=self.multipart_threshold,
+                        multipart_chunksize=self.multipart_chunksize
+                    )
+                    self._client = boto3.client(
+                        "s3",
+                        endpoint_url=self.endpoint_url,
+                        region_name=self.region,
+                        aws_access_key_id=self.access_key,
+                        aws_secret_access_key=self.secret_key,
+                        config=Config(
+                            s3={"addressing_style": self.addressing_style},
+                            max_pool_connections=self.max_pool_connections,
+                            retries={"max_attempts": 3, "mode": "standard"}
+                        )
+                    )
+        return self._client
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    @staticmethod
+    def _error_code(error):
+        return str(getattr(error, "response", {}).get("Error", {}).get("Code", ""))
+
+    def save(self, key, source_path, content_type=None):
+        """Upload a local file (multipart above the threshold) and remove it"""
+        extra = {"ContentType": content_type} if content_type else None
+        self.client.upload_file(source_path, self.bucket, self._key(key),
+                                ExtraArgs=extra, Config=self._transfer_config)
+        os.remove(source_path)
+
+    def fetch(self, key, destination_path):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.download_file(self.bucket, self._key(key), destination_path,
+                                      Config=self._transfer_config)
+        except ClientError as e:
+            if self._error_code(e) in ("404", "NoSuchKey"):
+                raise AudioNotFound(key)
+            raise
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError as e:
+            if self._error_code(e) in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def delete(self, key):
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception as e:
+            print(f"S3 delete failed for {key}: {e}")
+            return False
+
+    def local_path(self, key):
+        return None
+
+    def presigned_url(self, key, expires_in, content_type=None):
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if content_type:
+            params["ResponseContentType"] = content_type
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=int(expires_in))
+
+    def get(self, key, byte_range=None, if_none_match=None):
+        """
+        Read an object, optionally a byte range ("bytes=start-end" as sent by
+        the browser). The returned body must be consumed or closed.
+        """
+        from botocore.exceptions import ClientError
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if byte_range:
+            params["Range"] = byte_range
+        if if_none_match:
+            params["IfNoneMatch"] = if_none_match
+        try:
+            result = self.client.get_object(**params)
+        except ClientError as e:
+            code = self._error_code(e)
+            if code in ("404", "NoSuchKey"):
+                raise AudioNotFound(key)
+            if code in ("416", "InvalidRange"):
+                raise AudioRangeNotSatisfiable(key)
+            if code in ("304", "NotModified"):
+                raise AudioNotModified(key)
+            raise
+        return StoredAudio(
+            body=result["Body"],
+            content_length=result.get("ContentLength"),
+            content_range=result.get("ContentRange"),
+            etag=result.get("ETag"),
+            last_modified=result.get("LastModified"),
+            content_type=result.get("ContentType")
+        )
+
+    def iter_chunks(self, key, chunk_size=READ_CHUNK_SIZE):
+        """Read a whole object in chunks; raises AudioNotFound up front"""
+        return self.get(key).iter_chunks(chunk_size)
@@ -0,0 +1,56 @@
+"""
+Compare concurrent-upload throughput across serving modes.
+
+    python -m bench.compare_servers --concurrency 64 --latency-ms 1000
+
+Runs the upload scenario once per --servers entry (gunicorn sync vs gevent by
+default, one worker process each) against the same stub Whisper settings and
+prints a JSON summary with req/s, p95 and peak RSS side by side.
+"""
+import argparse
+import json
+import sys
+
+from bench import run
+
+
+def build_parser():
+    parser = run.build_parser()
+    parser.description = __doc__.strip().splitlines()[0]
+    parser.add_argument("--servers", default="sync,gevent",
+                        help=f"Comma-separated subset of: {', '.join(run.SERVERS)}")
+    parser.set_defaults(scenarios="upload", upload_sizes="256k", uploads=128,
+                        concurrency=64, users=4, latency_ms=1000, jitter_ms=100,
+                        unique_uploads=True)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = []
+    for server in [s.strip() for s in args.servers.split(",") if s.strip()]:
+        print(f"--- {server} ---", file=sys.stderr)
+        report = run.run_benchmark(argparse.Namespace(**{**vars(args), "server": server}))
+        for scenario in report["scenarios"]:
+            results.append({
+                "server": server,
+                "scenario": scenario["name"],
+                "requests": scenario.get("requests"),
+                "whisper_requests": report["stub_whisper"]["requests"],
+                "rps": scenario.get("rps"),
+                "p95_ms": scenario.get("latency_ms", {}).get("p95"),
+                "errors": scenario.get("errors"),
+                "peak_rss_mb": scenario.get("peak_rss_mb")
+            })
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "target", "server")}
+    output = json.dumps({"benchmark": "server_modes", "config": config, "results": results}, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,600 @@
+"""
+Reproducible load-test harness for the backend.
+
+    python -m bench.run --concurrency 8 --output bench_output.json
+
+Starts a stub Whisper server and the app (bench.serve, in-memory MongoDB) as a
+subprocess, then runs scripted scenarios and prints a JSON report with
+p50/p95/p99 latency, requests/sec and peak server RSS per scenario.
+Use --target to load an already running server instead (RSS is then omitted).
+
+--server picks how the app is served: werkzeug (threaded dev server, default),
+sync (gunicorn sync workers, as in the Procfile) or gevent (gunicorn gevent
+workers). RSS is summed over the gunicorn master and its workers.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench.stub_whisper import add_stub_arguments, stub_from_args
+
+SCENARIOS = ("auth", "upload", "list", "poll", "audio")
+SERVERS = ("werkzeug", "sync", "gevent")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_local = threading.local()
+
+
+def session():
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+# --- Measurement ---
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class RssSampler:
+    """Samples a local process's resident set size and keeps the peak"""
+
+    def __init__(self, pid, interval=0.02):
+        self.pids = [pid]
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _children(self, pid):
+        try:
+            with open(f"/proc/{pid}/task/{pid}/children") as f:
+                return [int(child) for child in f.read().split()]
+        except OSError:
+            return []
+
+    def _rss_kb(self, pid):
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+    def _read_rss_kb(self):
+        # The server process plus any forked workers (gunicorn)
+        pids = list(self.pids)
+        for pid in self.pids:
+            pids.extend(self._children(pid))
+        return sum(self._rss_kb(pid) for pid in pids)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, self._read_rss_kb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_kb = self._read_rss_kb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+class NullSampler:
+    peak_kb = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def run_load(name, tasks, concurrency, sampler):
+    """
+    Run callables with a bounded pool. Each task receives `record(seconds, ok)`
+    and may record one or more request timings.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def record(seconds, ok):
+        with lock:
+            latencies.append(seconds)
+            if not ok:
+                errors[0] += 1
+
+    def run(task):
+        try:
+            task(record)
+        except Exception as e:
+            print(f"[{name}] task error: {e}", file=sys.stderr)
+            record(0.0, False)
+
+    with sampler:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(run, tasks))
+        elapsed = time.perf_counter() - started
+
+    values = sorted(latencies)
+    to_ms = lambda v: round(v * 1000, 2) if v is not None else None
+    result = {
+        "name": name,
+        "requests": len(values),
+        "errors": errors[0],
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "rps": round(len(values) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": to_ms(percentile(values, 50)),
+            "p95": to_ms(percentile(values, 95)),
+            "p99": to_ms(percentile(values, 99)),
+            "max": to_ms(values[-1] if values else None)
+        },
+        "peak_rss_mb": round(sampler.peak_kb / 1024.0, 1) if sampler.peak_kb else None
+    }
+    print(f"[{name}] {result['requests']} requests, {result['rps']} req/s, "
+          f"p95 {result['latency_ms']['p95']} ms, errors {result['errors']}", file=sys.stderr)
+    return result
+
+
+class HealthProbe:
+    """
+    Polls a cheap route back to back while a burst runs, to show whether the
+    burst starves everything else the server is doing
+    """
+
+    def __init__(self, url, interval=0.05):
+        self.url = url
+        self.interval = interval
+        self.latencies = []
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        probe = requests.Session()
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            try:
+                ok = probe.get(self.url, timeout=60).status_code == 200
+            except requests.RequestException:
+                ok = False
+            self.latencies.append(time.perf_counter() - started)
+            self.errors += 0 if ok else 1
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def result(self, name):
+        values = sorted(self.latencies)
+        to_ms = lambda v: round(v * 1000, 2) if v is not None else None
+        return {
+            "name": name,
+            "requests": len(values),
+            "errors": self.errors,
+            "latency_ms": {
+                "p50": to_ms(percentile(values, 50)),
+                "p95": to_ms(percentile(values, 95)),
+                "p99": to_ms(percentile(values, 99)),
+                "max": to_ms(values[-1] if values else None)
+            }
+        }
+
+
+def timed(record, method, url, ok_status=(200, 201, 202, 206), **kwargs):
+    started = time.perf_counter()
+    response = session().request(method, url, timeout=300, **kwargs)
+    record(time.perf_counter() - started, response.status_code in ok_status)
+    return response
+
+
+# --- Fixtures ---
+def speech_like_samples(frames, sample_rate, silence_fraction, channels=1):
+    """
+    Alternating 1.5-4 s bursts of loud, syllable-modulated noise and quiet
+    gaps, with roughly `silence_fraction` of the frames in the gaps
+    """
+    import numpy as np
+    rng = np.random.default_rng(random.getrandbits(32))
+    parts = []
+    total = 0
+    while total < frames:
+        speech = int(rng.uniform(1.5, 4.0) * sample_rate)
+        t = np.arange(speech) / sample_rate
+        envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4.0 * t)
+        parts.append(rng.normal(0, 6000, speech) * envelope)
+        gap = int(speech * silence_fraction / max(1e-6, 1 - silence_fraction))
+        parts.append(rng.normal(0, 20, gap))
+        total += speech + gap
+    samples = np.clip(np.concatenate(parts)[:frames], -32768, 32767)
+    return np.repeat(samples, channels).astype("<i2").tobytes()
+
+
+def make_wav(size_bytes, sample_rate=16000, silence_fraction=None, channels=1):
+    """
+    16-bit PCM WAV of roughly `size_bytes` filled with low-level noise, or
+    speech-like bursts separated by silence when silence_fraction is given
+    """
+    frame_bytes = 2 * channels
+    frames = max(1, (size_bytes - 44) // frame_bytes)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        if silence_fraction is not None:
+            wav.writeframes(speech_like_samples(frames, sample_rate, silence_fraction, channels))
+        else:
+            block = bytes(random.getrandbits(8) & 0x0F for _ in range(64 * 1024 // frame_bytes * frame_bytes))
+            written = 0
+            while written < frames:
+                count = min(frames - written, len(block) // frame_bytes)
+                wav.writeframes(block[:count * frame_bytes])
+                written += count
+    return buffer.getvalue()
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    units = {"k": 1024, "m": 1024 * 1024}
+    if text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+# --- Scenarios ---
+class BenchState:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.users = []          # (email, password, token)
+        self.audio_urls = []
+
+    def url(self, path):
+        return self.base_url + path
+
+
+def scenario_auth(state, args, sampler):
+    prefix = uuid.uuid4().hex[:8]
+    lock = threading.Lock()
+    credentials = [(f"bench_{prefix}_{i}@example.com", "bench-password") for i in range(args.users)]
+
+    def signup(email, password):
+        return lambda record: timed(record, "POST", state.url("/api/signup"),
+                                    json={"email": email, "password": password})
+
+    def login(email, password):
+        def task(record):
+            response = timed(record, "POST", state.url("/api/login"),
+                             json={"email": email, "password": password})
+            if response.status_code == 200:
+                with lock:
+                    state.users.append((email, password, response.json()["access_token"]))
+        return task
+
+    results = [run_load("signup_burst", [signup(*c) for c in credentials], args.concurrency, sampler)]
+
+    logins = [login(*c) for c in credentials for _ in range(args.logins_per_user)]
+    with HealthProbe(state.url("/api/health")) as probe:
+        results.append(run_load("login_burst", logins, args.concurrency, sampler))
+    results.append(probe.result("health_during_login"))
+
+    # Keep one token per user for later scenarios
+    seen = {}
+    for user in state.users:
+        seen[user[0]] = user
+    state.users = list(seen.values())
+    return results
+
+
+def ensure_users(state, args):
+    if state.users:
+        return
+    scenario_auth(state, argparse.Namespace(**{**vars(args), "logins_per_user": 1}), NullSampler())
+
+
+def scenario_upload(state, args, sampler):
+    ensure_users(state, args)
+    results = []
+    lock = threading.Lock()
+
+    for size_text in args.upload_sizes.split(","):
+        payload = make_wav(parse_size(size_text), sample_rate=args.fixture_rate,
+                           silence_fraction=args.silence_fraction, channels=args.fixture_channels)
+
+        def upload(user, index, payload=payload):
+            def task(record):
+                body = payload
+                if args.unique_uploads:
+                    # Vary the first samples (never trimmed as silence) so the
+                    # transcription cache never hits
+                    body = payload[:44] + index.to_bytes(8, "little") + payload[52:]
+                response = timed(record, "POST", state.url("/api/transcribe"),
+                                 headers={"Authorization": f"Bearer {user[2]}"},
+                                 files={"audio": ("bench.wav", body, "audio/wav")})
+                if response.status_code == 201 and response.json().get("audioUrl"):
+                    with lock:
+                        state.audio_urls.append(response.json()["audioUrl"])
+            return task
+
+        tasks = [upload(state.users[i % len(state.users)], i) for i in range(args.uploads)]
+        result = run_load(f"upload_{size_text.strip()}", tasks, args.concurrency, sampler)
+        result["payload_bytes"] = len(payload)
+        results.append(result)
+
+    return results
+
+
+def scenario_list(state, args, sampler):
+    ensure_users(state, args)
+
+    def walk(user):
+        def task(record):
+            cursor = None
+            while True:
+                params = {"limit": args.page_size}
+                if args.list_summary:
+                    params["summary"] = 1
+                if cursor:
+                    params["cursor"] = cursor
+                response = timed(record, "GET", state.url("/api/transcripts"), params=params,
+                                 headers={"Authorization": f"Bearer {user[2]}"})
+                if response.status_code != 200:
+                    return
+                cursor = response.json().get("next_cursor")
+                if not cursor:
+                    return
+        return task
+
+    tasks = [walk(state.users[i % len(state.users)]) for i in range(args.list_walks)]
+    return [run_load("list_paging", tasks, args.concurrency, sampler)]
+
+
+def scenario_poll(state, args, sampler):
+    """The frontend's idle polling of the full list, revalidating with If-None-Match"""
+    ensure_users(state, args)
+    lock = threading.Lock()
+    totals = {"bytes": 0, "not_modified": 0}
+    etags = {}
+
+    def poll(user):
+        def task(record):
+            headers = {"Authorization": f"Bearer {user[2]}", "Accept-Encoding": "gzip, br"}
+            if not args.no_etag and user[0] in etags:
+                headers["If-None-Match"] = etags[user[0]]
+            response = timed(record, "GET", state.url("/api/transcripts"), ok_status=(200, 304),
+                             headers=headers, stream=True)
+            size = len(response.raw.read(decode_content=False))
+            with lock:
+                totals["bytes"] += size
+                totals["not_modified"] += response.status_code == 304
+                if response.headers.get("ETag"):
+                    etags[user[0]] = response.headers["ETag"]
+        return task
+
+    tasks = [poll(state.users[i % len(state.users)]) for i in range(args.polls)]
+    result = run_load("list_poll", tasks, args.concurrency, sampler)
+    result["wire_bytes_per_poll"] = round(totals["bytes"] / max(1, args.polls), 1)
+    result["not_modified"] = totals["not_modified"]
+    return [result]
+
+
+def scenario_audio(state, args, sampler):
+    if not state.audio_urls:
+        scenario_upload(state, argparse.Namespace(**{**vars(args), "upload_sizes": "1m"}), NullSampler())
+    if not state.audio_urls:
+        return [{"name": "audio_range", "skipped": "no audio available"}]
+
+    # Stored audio is compact (often under 32 KiB), so ranges are drawn within
+    # each object's real size; a HEAD per object, outside the timed load
+    def object_size(url):
+        response = session().head(state.url(url), allow_redirects=True, timeout=30)
+        return int(response.headers.get("Content-Length") or 0)
+
+    sizes = {url: object_size(url) for url in set(state.audio_urls)}
+    urls = [url for url in state.audio_urls if sizes[url] > 0]
+    if not urls:
+        return [{"name": "audio_range", "skipped": "no audio available"}]
+
+    def read_range(url):
+        size = sizes[url]
+
+        def task(record):
+            start = random.randint(0, max(0, size - args.range_bytes))
+            end = min(size, start + args.range_bytes) - 1
+            timed(record, "GET", state.url(url), headers={"Range": f"bytes={start}-{end}"})
+        return task
+
+    tasks = [read_range(random.choice(urls)) for _ in range(args.range_reads)]
+    return [run_load("audio_range", tasks, args.concurrency, sampler)]
+
+
+SCENARIO_FUNCTIONS = {
+    "auth": scenario_auth,
+    "upload": scenario_upload,
+    "list": scenario_list,
+    "poll": scenario_poll,
+    "audio": scenario_audio,
+}
+
+
+# --- Orchestration ---
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_health(base_url, process=None, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("Benchmark server exited during startup")
+        try:
+            if requests.get(base_url + "/api/health", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy")
+
+
+def start_server(args, whisper_url):
+    port = free_port()
+    env = dict(os.environ)
+    if args.silence_trim:
+        env["SILENCE_TRIM_ENABLED"] = "true"
+    if args.no_normalize:
+        env["AUDIO_NORMALIZE_ENABLED"] = "false"
+    if args.server == "werkzeug":
+        command = [sys.executable, "-m", "bench.serve", "--port", str(port), "--whisper-url", whisper_url]
+        if args.mongodb_uri:
+            command += ["--mongodb-uri", args.mongodb_uri]
+    else:
+        command = [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py",
+                   "--bind", f"127.0.0.1:{port}", "--worker-class", args.server,
+                   "--workers", str(args.workers),
+                   "--worker-connections", str(args.worker_connections),
+                   "bench.serve:bench_app()"]
+        env.update(BENCH_WHISPER_URL=whisper_url, BENCH_MONGODB_URI=args.mongodb_uri or "")
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for_health(base_url, process)
+    except Exception:
+        process.kill()
+        raise
+    return process, base_url
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--target", help="Benchmark an already running server at this URL")
+    parser.add_argument("--mongodb-uri", help="Use a real MongoDB instead of the in-memory stand-in")
+    parser.add_argument("--server", choices=SERVERS, default="werkzeug",
+                        help="How to serve the app when --target is not given")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Gunicorn worker processes (more than 1 needs --mongodb-uri)")
+    parser.add_argument("--worker-connections", type=int, default=1000,
+                        help="Concurrent requests per gevent worker")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins-per-user", type=int, default=3)
+    parser.add_argument("--uploads", type=int, default=24, help="Uploads per size")
+    parser.add_argument("--upload-sizes", default="64k,1m,8m")
+    parser.add_argument("--silence-fraction", type=float, default=None,
+                        help="Upload speech-like audio with this fraction of silence (e.g. 0.4)")
+    parser.add_argument("--silence-trim", action="store_true",
+                        help="Start the server with SILENCE_TRIM_ENABLED")
+    parser.add_argument("--no-normalize", action="store_true",
+                        help="Start the server with AUDIO_NORMALIZE_ENABLED=false")
+    parser.add_argument("--fixture-rate", type=int, default=16000, help="Sample rate of uploaded WAVs")
+    parser.add_argument("--fixture-channels", type=int, default=1, help="Channels of uploaded WAVs")
+    parser.add_argument("--unique-uploads", action="store_true",
+                        help="Make every upload distinct so each one reaches the Whisper stub")
+    parser.add_argument("--list-walks", type=int, default=40)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--list-summary", action="store_true",
+                        help="Page with summary=1 ($substrCP projection; needs a real MongoDB)")
+    parser.add_argument("--polls", type=int, default=400, help="Full-list polls in the poll scenario")
+    parser.add_argument("--no-etag", action="store_true",
+                        help="Poll without If-None-Match (every poll gets the full list)")
+    parser.add_argument("--range-reads", type=int, default=200)
+    parser.add_argument("--range-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    add_stub_arguments(parser)
+    parser.set_defaults(latency_ms=200, jitter_ms=50)
+    return parser
+
+
+def run_benchmark(args):
+    random.seed(args.seed)
+
+    stub = stub_from_args(args).start()
+    process = None
+    try:
+        if args.target:
+            base_url = args.target.rstrip("/")
+            wait_for_health(base_url)
+        else:
+            process, base_url = start_server(args, stub.base_url)
+
+        state = BenchState(base_url)
+        results = []
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            if name not in SCENARIO_FUNCTIONS:
+                raise SystemExit(f"Unknown scenario: {name}")
+            sampler = RssSampler(process.pid) if process else NullSampler()
+            results.extend(SCENARIO_FUNCTIONS[name](state, args, sampler))
+
+        report = {
+            "benchmark": "backend_load",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "target": args.target or "local",
+            "server": None if args.target else args.server,
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "target")},
+            "stub_whisper": {"requests": stub.requests, "bytes_received": stub.bytes_received},
+            "scenarios": results
+        }
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+        stub.shutdown()
+    return report
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = run_benchmark(args)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Run the Flask app against local stand-ins for benchmarking.
+
+    python -m bench.serve --port 5055 --whisper-url http://127.0.0.1:8765
+
+Transcription goes to the given stub Whisper server. MongoDB is an in-memory
+mongomock database unless --mongodb-uri points at a real (local) instance.
+
+Under gunicorn, use the factory with the same settings passed via environment:
+
+    BENCH_WHISPER_URL=http://127.0.0.1:8765 gunicorn -c gunicorn.conf.py -k gevent "bench.serve:bench_app()"
+
+Each gunicorn worker gets its own in-memory database, so use one worker (or a
+real --mongodb-uri) when the load logs in and then reuses the token.
+"""
+import argparse
+import os
+import tempfile
+
+
+def configure_environment(whisper_url, mongodb_uri=None):
+    """Must run before the app module is imported (it reads config at import)"""
+    os.environ["HF_API_BASE_URL"] = whisper_url
+    os.environ["HUGGINGFACE_API_KEY"] = "bench"
+    # Empty values stop load_dotenv() from pulling real credentials from .env
+    os.environ["OPENAI_API_KEY"] = ""
+    os.environ["MONGODB_URI"] = mongodb_uri or ""
+
+
+def load_app(whisper_url, mongodb_uri=None, upload_folder=None):
+    configure_environment(whisper_url, mongodb_uri)
+    import app as application
+
+    if not mongodb_uri:
+        import mongomock
+        from database import LazyDatabase
+        application.db = LazyDatabase(lambda: mongomock.MongoClient().get_database("transcribed_ai_bench"))
+
+    application.app.config['UPLOAD_FOLDER'] = upload_folder or tempfile.mkdtemp(prefix="bench_audio_")
+    application.audio_storage = application.create_audio_storage()
+    return application
+
+
+def bench_app():
+    """Gunicorn app factory; reads BENCH_WHISPER_URL and BENCH_MONGODB_URI"""
+    application = load_app(os.environ["BENCH_WHISPER_URL"], os.environ.get("BENCH_MONGODB_URI") or None)
+    return application.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--whisper-url", required=True)
+    parser.add_argument("--mongodb-uri", default=None)
+    args = parser.parse_args()
+
+    application = load_app(args.whisper_url, args.mongodb_uri)
+
+    from werkzeug.serving import make_server
+    server = make_server(args.host, args.port, application.app, threaded=True)
+    print(f"Benchmark app listening on http://{args.host}:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
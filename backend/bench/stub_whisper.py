@@ -0,0 +1,137 @@
+"""
+Local stand-in for the Hugging Face Whisper inference endpoint.
+
+    python -m bench.stub_whisper --port 8765 --latency-ms 800 --error-rate 0.05
+
+Point the app at it with HF_API_BASE_URL=http://127.0.0.1:8765
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+READ_BLOCK_SIZE = 64 * 1024
+
+WORDS = ("the", "lecture", "covers", "signal", "processing", "and", "speech", "models",
+         "today", "we", "review", "examples", "from", "last", "week")
+
+
+class StubWhisperHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _drain_body(self):
+        # Consume the upload in blocks so the stub itself never buffers it
+        received = 0
+        length = self.headers.get("Content-Length")
+        if length is not None:
+            remaining = int(length)
+            while remaining > 0:
+                block = self.rfile.read(min(READ_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                received += len(block)
+                remaining -= len(block)
+        elif self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().strip() or b"0", 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                received += len(self.rfile.read(size))
+                self.rfile.readline()
+        return received
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        received = self._drain_body()
+        server.record(received)
+
+        # Optional size-proportional part models upload bandwidth / inference time
+        delay = (server.latency + random.uniform(-server.jitter, server.jitter) +
+                 server.seconds_per_mb * received / (1024 * 1024))
+        if delay > 0:
+            time.sleep(delay)
+
+        if server.error_rate and random.random() < server.error_rate:
+            self._send_json(503, {
+                "error": "Model openai/whisper-large-v3 is currently loading",
+                "estimated_time": server.estimated_time
+            })
+            return
+
+        text = " ".join(random.choice(WORDS) for _ in range(server.words)) + "."
+        self._send_json(200, {"text": text})
+
+
+class StubWhisperServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency_ms=0, jitter_ms=0,
+                 error_rate=0.0, estimated_time=1.0, words=50, ms_per_mb=0):
+        super().__init__(address, StubWhisperHandler)
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.seconds_per_mb = ms_per_mb / 1000.0
+        self.error_rate = error_rate
+        self.estimated_time = estimated_time
+        self.words = words
+        self.requests = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+
+    def record(self, received):
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += received
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def add_stub_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=0, help="Base response latency")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform +/- latency jitter")
+    parser.add_argument("--ms-per-mb", type=float, default=0, help="Extra latency per MB of upload")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 503 responses")
+    parser.add_argument("--estimated-time", type=float, default=1.0, help="estimated_time in 503 bodies")
+    parser.add_argument("--words", type=int, default=50, help="Words per transcription (response size)")
+
+
+def stub_from_args(args, address=("127.0.0.1", 0)):
+    return StubWhisperServer(address, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                             error_rate=args.error_rate, estimated_time=args.estimated_time,
+                             words=args.words, ms_per_mb=args.ms_per_mb)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = stub_from_args(args, (args.host, args.port))
+    print(f"Stub Whisper listening on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
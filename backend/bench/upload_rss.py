@@ -0,0 +1,88 @@
+"""
+Peak-RSS regression benchmark for provider uploads.
+
+    python -m bench.upload_rss --size-mb 50
+
+Each mode runs in a fresh interpreter so ru_maxrss reflects that upload only.
+"streaming" uses HuggingFaceWhisper as the app does; "buffered" reproduces the
+old read-whole-file-then-post behaviour for comparison.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("streaming", "buffered")
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_upload(mode, audio_path):
+    import requests
+    from bench.stub_whisper import StubWhisperServer
+    from providers import HuggingFaceWhisper
+
+    server = StubWhisperServer().start()
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+
+    if mode == "streaming":
+        client = HuggingFaceWhisper("bench-key", "whisper-stub", base_url=server.base_url)
+        client.transcribe(audio_path)
+    else:
+        with open(audio_path, "rb") as f:
+            audio_data = f.read()
+        requests.post(f"{server.base_url}/whisper-stub", data=audio_data,
+                      headers={"Content-Type": "audio/wav"}, timeout=120)
+
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    return {
+        "mode": mode,
+        "bytes_sent": server.bytes_received,
+        "seconds": round(elapsed, 3),
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_rss_delta_mb": round(peak_rss_mb() - baseline, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_upload(args.mode, args.file)))
+        return
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    with tempfile.NamedTemporaryFile(suffix=".wav") as audio:
+        block = os.urandom(1024 * 1024)
+        for _ in range(args.size_mb):
+            audio.write(block)
+        audio.flush()
+
+        for mode in MODES:
+            output = subprocess.check_output(
+                [sys.executable, "-m", "bench.upload_rss", "--mode", mode, "--file", audio.name],
+                cwd=backend_dir
+            )
+            results.append(json.loads(output.decode().strip().splitlines()[-1]))
+
+    print(json.dumps({"benchmark": "upload_rss", "size_mb": args.size_mb, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
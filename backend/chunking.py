@@ -0,0 +1,129 @@
+import os
+import re
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+# Error markers returned by the transcription functions look like "[API Error: 503]"
+ERROR_MARKER = re.compile(r'^\[.*\]$')
+# A silent window is a valid (empty) result, not a failure
+NO_SPEECH = "[No speech detected]"
+
+
+def wav_duration(audio_path):
+    """
+    Return the duration in seconds of a PCM WAV file, or None if the file
+    can't be read by the wave module (compressed containers etc.)
+    """
+    try:
+        with wave.open(audio_path, 'rb') as wav:
+            rate = wav.getframerate()
+            if not rate:
+                return None
+            return wav.getnframes() / float(rate)
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
+def split_wav(audio_path, output_dir, window_seconds=30.0, overlap_seconds=2.0):
+    """
+    Split a PCM WAV file into fixed-length overlapping windows.
+    Frames are read window by window so the whole file is never held in memory.
+    Returns the list of chunk file paths in playback order.
+    """
+    chunk_paths = []
+
+    with wave.open(audio_path, 'rb') as wav:
+        params = wav.getparams()
+        rate = wav.getframerate()
+        total_frames = wav.getnframes()
+
+        window_frames = max(1, int(window_seconds * rate))
+        step_frames = max(1, window_frames - int(overlap_seconds * rate))
+
+        start = 0
+        index = 0
+        while start < total_frames:
+            wav.setpos(start)
+            frames = wav.readframes(window_frames)
+
+            chunk_path = os.path.join(output_dir, f"chunk_{index:04d}.wav")
+            with wave.open(chunk_path, 'wb') as out:
+                out.setparams(params)
+                out.writeframes(frames)
+            chunk_paths.append(chunk_path)
+
+            if start + window_frames >= total_frames:
+                break
+            start += step_frames
+            index += 1
+
+    return chunk_paths
+
+
+def _normalize(word):
+    return re.sub(r'[^\w]', '', word.lower())
+
+
+def stitch_transcripts(texts, max_overlap_words=25):
+    """
+    Join partial transcripts of overlapping windows, dropping the words that
+    were transcribed twice at each overlap. The longest run of words that ends
+    the text so far and starts the next piece is treated as the duplicate.
+    """
+    words = []
+
+    for text in texts:
+        next_words = text.split()
+        if not next_words:
+            continue
+
+        limit = min(max_overlap_words, len(words), len(next_words))
+        tail = [_normalize(w) for w in words[-limit:]] if limit else []
+        head = [_normalize(w) for w in next_words[:limit]]
+
+        overlap = 0
+        for size in range(limit, 0, -1):
+            if tail[-size:] == head[:size] and any(head[:size]):
+                overlap = size
+                break
+
+        words.extend(next_words[overlap:])
+
+    return " ".join(words)
+
+
+def transcribe_chunked(audio_path, transcribe_fn, output_dir, window_seconds=30.0,
+                       overlap_seconds=2.0, max_workers=4, retries=1):
+    """
+    Transcribe a long WAV file as concurrent overlapping windows.
+    Latency is bounded by the slowest chunk rather than the whole file.
+    Failed windows are retried up to `retries` times; if any still fails the
+    whole file is reported as an error marker rather than stitched with a gap.
+    """
+    chunk_paths = split_wav(audio_path, output_dir, window_seconds, overlap_seconds)
+    print(f"Transcribing {len(chunk_paths)} chunks with {max_workers} workers")
+
+    def failed(text):
+        text = (text or "").strip()
+        return text != NO_SPEECH and (not text or bool(ERROR_MARKER.match(text)))
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = list(executor.map(transcribe_fn, chunk_paths))
+        for attempt in range(retries):
+            pending = [i for i, text in enumerate(results) if failed(text)]
+            if not pending:
+                break
+            print(f"Retrying {len(pending)} of {len(results)} chunks (attempt {attempt + 2})")
+            for i, text in zip(pending, executor.map(transcribe_fn, [chunk_paths[i] for i in pending])):
+                results[i] = text
+
+    errors = [text for text in results if failed(text)]
+    if errors and len(errors) == len(results):
+        # Every chunk failed - surface the first error unchanged
+        return errors[0] or "[Transcription Error: empty response]"
+    if errors:
+        print(f"{len(errors)} of {len(results)} chunks failed to transcribe: {errors[0]}")
+        return f"[ERROR: {len(errors)} of {len(results)} chunks failed to transcribe]"
+
+    speech = [text for text in results if text.strip() != NO_SPEECH]
+    return stitch_transcripts(speech) if speech else NO_SPEECH
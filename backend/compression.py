@@ -0,0 +1,44 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Below this the headers outweigh the savings
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 5
+# Mid-range levels: responses are compressed per request, not ahead of time
+BROTLI_QUALITY = 5
+
+
+def negotiate(accept_encoding):
+    """Pick 'br', 'gzip' or None from an Accept-Encoding header, honouring q-values"""
+    offered = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            offered[coding.strip().lower()] = q
+
+    def quality(coding):
+        return offered.get(coding, offered.get("*", 0.0))
+
+    choices = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(choices, key=quality)
+    return best if quality(best) > 0 else None
+
+
+def compress(body, encoding):
+    """Encode `body` (bytes) with the negotiated coding; None leaves it as-is"""
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
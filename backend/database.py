@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure
+from pymongo.topology_description import TopologyDescription
+
+
+class DatabaseUnavailable(ConnectionFailure):
+    """No client could be created yet; a background thread keeps retrying"""
+
+
+class LazyDatabase:
+    """
+    Stands in for a pymongo Database. Nothing touches the network at import:
+    the client is built on first use, once per process (so it is created
+    after gunicorn forks, even with --preload). If building it fails (e.g.
+    the mongodb+srv DNS lookup), callers fail fast with DatabaseUnavailable
+    while a background thread retries with backoff. Once a client exists,
+    pymongo's own monitors reconnect to the servers as they come back.
+    """
+
+    def __init__(self, connect, retry_min_seconds=1.0, retry_max_seconds=30.0):
+        self._connect = connect
+        self.retry_min_seconds = retry_min_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._database = None
+        self._pid = None
+        self._error = None
+        self._retrying = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_uri(cls, uri, **client_options):
+        return cls(lambda: MongoClient(uri, **client_options).get_database())
+
+    def _current(self):
+        database = self._database
+        if database is not None and self._pid == os.getpid():
+            return database
+        with self._lock:
+            if self._pid != os.getpid():
+                # Inherited across fork: pymongo clients must not be shared
+                self._database = None
+                self._error = None
+                self._retrying = False
+                self._pid = os.getpid()
+            if self._database is None and not self._retrying:
+                try:
+                    self._database = self._connect()
+                except Exception as e:
+                    self._error = e
+                    self._retrying = True
+                    print(f"MongoDB client setup failed, retrying in the background: {e}")
+                    threading.Thread(target=self._retry, name="mongodb-reconnect", daemon=True).start()
+            if self._database is None:
+                raise DatabaseUnavailable(f"MongoDB unavailable: {self._error}")
+            return self._database
+
+    def _retry(self):
+        delay = self.retry_min_seconds
+        while True:
+            time.sleep(delay)
+            try:
+                database = self._connect()
+            except Exception as e:
+                with self._lock:
+                    self._error = e
+                delay = min(delay * 2, self.retry_max_seconds)
+                continue
+            with self._lock:
+                self._database = database
+                self._error = None
+                self._retrying = False
+            print("MongoDB client setup succeeded")
+            return
+
+    def __getattr__(self, name):
+        return getattr(self._current(), name)
+
+    def __getitem__(self, name):
+        return self._current()[name]
+
+    def status(self):
+        """
+        'connected', 'connecting' (servers not reached yet) or 'unavailable',
+        from the client's monitors rather than a round trip
+        """
+        try:
+            database = self._current()
+        except DatabaseUnavailable:
+            return "unavailable"
+        topology = getattr(database.client, "topology_description", None)
+        if not isinstance(topology, TopologyDescription) or topology.has_readable_server():
+            return "connected"
+        # Monitors record an error once a server check has failed
+        if any(server.error for server in topology.server_descriptions().values()):
+            return "unavailable"
+        return "connecting"
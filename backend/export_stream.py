@@ -0,0 +1,65 @@
+import json
+import time
+import zipfile
+
+
+class _StreamSink:
+    """
+    Write-only, unseekable file object for ZipFile. Written bytes are held
+    until drained, so the archive can be yielded piece by piece as it is
+    built; ZipFile falls back to data descriptors since it cannot seek.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Bytes written since the last drain (possibly empty)"""
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def ndjson_lines(records, batch=100):
+    """Encode dicts as newline-delimited JSON, yielding every `batch` records"""
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record, separators=(",", ":"), default=str))
+        if len(lines) >= batch:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def zip_stream(entries):
+    """
+    Build a ZIP archive on the fly. `entries` yields (name, chunks, compress,
+    modified) with `chunks` an iterable of bytes and `modified` a datetime
+    or None. Only the bytes of the chunk being written are held in memory.
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, "w") as archive:
+        for name, chunks, compress, modified in entries:
+            info = zipfile.ZipInfo(name, date_time=(modified.timetuple() if modified else time.localtime())[:6])
+            # Recordings are already compressed; deflating them again only costs CPU
+            info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            # Sizes are unknown up front, so always leave room for ZIP64 sizes
+            with archive.open(info, "w", force_zip64=True) as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
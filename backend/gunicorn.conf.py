@@ -0,0 +1,58 @@
+"""
+Gunicorn settings, read from the environment so Procfile/railway.json stay short.
+
+GUNICORN_WORKER_CLASS=sync    one request per worker process (default)
+GUNICORN_WORKER_CLASS=gevent  cooperative workers: each process serves up to
+                              GUNICORN_WORKER_CONNECTIONS requests at once while
+                              they wait on Hugging Face/OpenAI and MongoDB
+"""
+import multiprocessing
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+workers = int(os.getenv('WEB_CONCURRENCY', min(4, multiprocessing.cpu_count())))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+# Uploads wait on the provider (and its retries), so keep the sync timeout generous
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+
+# Workers write metric samples here so /metrics can sum them across processes.
+# Set when the config is first read, before the app (even with preload) or
+# prometheus_client is imported. This file is read again on every HUP reload,
+# so samples from a previous run are only cleared in on_starting.
+if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = os.path.join(tempfile.gettempdir(), 'prometheus_multiproc')
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+
+if worker_class == 'gevent' and preload_app:
+    # The gevent worker patches in each worker after fork; with preload the app
+    # (pymongo, requests, threading) is imported in the master first, so patch
+    # before that happens or those modules keep blocking primitives.
+    from gevent import monkey
+    monkey.patch_all()
+
+
+def on_starting(server):
+    # Once per master start: drop sample files left by the previous run's workers
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    for name in os.listdir(metrics_dir):
+        if name.endswith('.db'):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def post_worker_init(worker):
+    # Each web process runs TRANSCRIBE_WORKERS job threads once the app is loaded
+    # (set it to 0 to leave jobs to `flask --app app run-workers` instead)
+    from app import start_job_workers
+    start_job_workers()
+
+
+def child_exit(server, worker):
+    # Keep the dead worker's counters but drop its live gauges
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
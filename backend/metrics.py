@@ -0,0 +1,76 @@
+"""
+Application metrics, exposed in the Prometheus text format by /metrics.
+
+Gunicorn runs several worker processes; with PROMETHEUS_MULTIPROC_DIR set
+(gunicorn.conf.py sets it) every process writes its samples to files there
+and a scrape of any worker renders the totals across all of them.
+"""
+import os
+
+from prometheus_client import (CollectorRegistry, Counter, Histogram, REGISTRY,
+                               CONTENT_TYPE_LATEST, generate_latest)
+from prometheus_client import multiprocess
+
+# Latency buckets (seconds) covering fast routes up to long provider calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+def multiprocess_dir():
+    return os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+
+
+def render():
+    """Exposition text for all worker processes (or just this one outside gunicorn)"""
+    if multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+# --- Shared application metrics ---
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by route",
+    ("method", "route", "status"), buckets=DEFAULT_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "transcribe_stage_duration_seconds", "Latency of each transcription pipeline stage",
+    ("stage",), buckets=DEFAULT_BUCKETS
+)
+PROVIDER_RESPONSES = Counter(
+    "provider_responses_total", "Transcription provider responses by status code",
+    ("provider", "status")
+)
+PROVIDER_RETRIES = Counter(
+    "provider_retries_total", "Transcription provider retries",
+    ("provider", "reason")
+)
+PROVIDER_FALLBACKS = Counter(
+    "provider_fallbacks_total", "Fallbacks from Hugging Face to OpenAI",
+    ("reason",)
+)
+PROVIDER_UPLOAD_BYTES = Counter(
+    "provider_upload_bytes_total", "Audio bytes sent to transcription providers",
+    ("provider",)
+)
+PROVIDER_HEDGES = Counter(
+    "provider_hedges_total", "Hedged transcription requests by outcome",
+    ("outcome",)
+)
+AUDIO_INGEST_BYTES = Counter(
+    "audio_ingest_bytes_total", "Uploaded audio bytes by container format",
+    ("format",)
+)
+AUDIO_STORED_BYTES = Counter(
+    "audio_stored_bytes_total", "Audio bytes kept in storage by stored format",
+    ("format",)
+)
+AUDIO_STORED_SECONDS = Counter(
+    "audio_stored_seconds_total", "Seconds of audio kept in storage by stored format",
+    ("format",)
+)
+SILENCE_TRIMMED_SECONDS = Counter(
+    "audio_silence_trimmed_seconds_total", "Seconds of silence cut before transcription"
+)
@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check_password(password_hash, password):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:  # malformed stored hash
+        return False
+
+
+class PasswordHasher:
+    """
+    bcrypt hashing/verification on a bounded process pool, so the CPU-bound
+    work neither holds the GIL nor pins request threads (or, under gevent,
+    the whole worker). Hashes are interchangeable with Flask-Bcrypt's.
+    The pool is created lazily per process, so forked workers get their own,
+    and its processes are spawned rather than forked: forking a worker that
+    already runs threads (or gevent hubs) can copy held locks into the child.
+    """
+
+    def __init__(self, rounds=12, max_workers=None, timeout=30):
+        self.rounds = rounds
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if self.max_workers <= 0:
+            return fn(*args)
+        try:
+            return self._pool().submit(fn, *args).result(timeout=self.timeout)
+        except BrokenProcessPool:
+            # A pool process died; start a fresh pool next time and answer inline now
+            with self._lock:
+                self._executor = None
+            return fn(*args)
+
+    def hash(self, password):
+        if not password:
+            raise ValueError('Password must be non-empty.')
+        return self._run(_hash_password, password, self.rounds)
+
+    def check(self, password_hash, password):
+        if not password_hash or not password:
+            return False
+        return self._run(_check_password, password_hash, password)
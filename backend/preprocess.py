@@ -0,0 +1,241 @@
+import wave
+
+import numpy as np
+
+# Frames read per block; bounds memory to a few MB regardless of file length
+BLOCK_FRAMES = 256 * 1024
+
+_SAMPLE_DTYPES = {1: np.uint8, 2: np.dtype('<i2'), 4: np.dtype('<i4')}
+_FULL_SCALE = {1: 128.0, 2: 32768.0, 3: 8388608.0, 4: 2147483648.0}
+
+
+def pcm_to_float(frames, sample_width, channels):
+    """Decode little-endian PCM bytes to a float32 (n, channels) array in [-1, 1)"""
+    if sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        samples = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) |
+                   (raw[:, 2].astype(np.int32) << 16))
+        samples = np.where(samples >= 1 << 23, samples - (1 << 24), samples)
+    else:
+        samples = np.frombuffer(frames, dtype=_SAMPLE_DTYPES[sample_width]).astype(np.int32)
+        if sample_width == 1:
+            samples = samples - 128
+    return (samples.astype(np.float32) / _FULL_SCALE[sample_width]).reshape(-1, channels)
+
+
+class SpeechMap:
+    """
+    Result of a voice-activity pass: the kept segments as (start, end) seconds
+    on the original timeline, in order.
+    """
+
+    def __init__(self, segments, duration):
+        self.segments = segments
+        self.duration = duration
+        # Set once the audio has actually been cut down to `segments`
+        self.applied = False
+
+    @property
+    def speech_seconds(self):
+        return sum(end - start for start, end in self.segments)
+
+    @property
+    def trimmed_seconds(self):
+        return max(0.0, self.duration - self.speech_seconds)
+
+    def to_original(self, seconds):
+        """Map a time in the trimmed audio back to the original recording"""
+        elapsed = 0.0
+        for start, end in self.segments:
+            if seconds <= elapsed + (end - start):
+                return start + (seconds - elapsed)
+            elapsed += end - start
+        return self.segments[-1][1] if self.segments else seconds
+
+    def to_list(self):
+        return [[round(start, 3), round(end, 3)] for start, end in self.segments]
+
+    def to_dict(self):
+        return {"segments": self.to_list(), "duration": self.duration, "applied": self.applied}
+
+    @classmethod
+    def from_dict(cls, data):
+        speech = cls([tuple(segment) for segment in data["segments"]], data["duration"])
+        speech.applied = data.get("applied", False)
+        return speech
+
+
+def frame_energies(wav_path, frame_ms=30):
+    """
+    Per-frame RMS level in dBFS of a PCM WAV (all channels mixed), computed
+    block by block. Returns (levels, frame_seconds, duration_seconds).
+    """
+    with wave.open(wav_path, 'rb') as wav:
+        rate = wav.getframerate()
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        total = wav.getnframes()
+        frame_len = max(1, int(rate * frame_ms / 1000))
+        # Whole analysis frames per block so no frame straddles two blocks
+        block = max(frame_len, (BLOCK_FRAMES // frame_len) * frame_len)
+
+        levels = []
+        while True:
+            frames = wav.readframes(block)
+            if not frames:
+                break
+            mono = pcm_to_float(frames, width, channels).mean(axis=1)
+            usable = (len(mono) // frame_len) * frame_len
+            if usable == 0:
+                break
+            power = np.square(mono[:usable], dtype=np.float64).reshape(-1, frame_len).mean(axis=1)
+            levels.append(10.0 * np.log10(np.maximum(power, 1e-10)))
+
+    levels = np.concatenate(levels) if levels else np.zeros(0)
+    return levels, frame_len / float(rate), total / float(rate) if rate else 0.0
+
+
+def _runs(mask):
+    """(start, end) index pairs of the True runs in a boolean array"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[0::2], edges[1::2]
+
+
+def detect_speech(wav_path, frame_ms=30, margin_db=12.0, floor_db=-60.0,
+                  min_silence_ms=700, pad_ms=200):
+    """
+    Energy-based voice activity detection. A frame is speech when its level
+    is `margin_db` above the recording's noise floor (10th percentile) and
+    above `floor_db`. Only silent runs longer than `min_silence_ms` are cut,
+    and `pad_ms` is kept on either side of speech so words aren't clipped.
+    """
+    levels, frame_seconds, duration = frame_energies(wav_path, frame_ms)
+    if not len(levels):
+        return SpeechMap([], duration)
+
+    noise = np.percentile(levels, 10)
+    peak = np.percentile(levels, 99)
+    threshold = max(min(noise + margin_db, peak - 6.0), floor_db)
+    speech = levels > threshold
+
+    # Short pauses are part of speaking; only long gaps count as silence
+    min_silence = max(1, int(round(min_silence_ms / 1000.0 / frame_seconds)))
+    starts, ends = _runs(~speech)
+    for start, end in zip(starts, ends):
+        if end - start < min_silence and start > 0 and end < len(speech):
+            speech[start:end] = True
+
+    # Pad each speech run (vectorized dilation)
+    pad = int(round(pad_ms / 1000.0 / frame_seconds))
+    if pad:
+        kernel = np.ones(2 * pad + 1)
+        speech = np.convolve(speech.astype(np.float32), kernel, mode='same') > 0
+
+    starts, ends = _runs(speech)
+    # A run reaching the last frame also covers the partial frame after it
+    segments = [(float(s * frame_seconds), float(duration if e == len(speech) else min(e * frame_seconds, duration)))
+                for s, e in zip(starts, ends)]
+    return SpeechMap(segments, duration)
+
+
+def write_segments(wav_path, output_path, segments):
+    """Copy only the given (start, end) second ranges of a WAV into a new WAV"""
+    with wave.open(wav_path, 'rb') as source:
+        params = source.getparams()
+        rate = source.getframerate()
+        with wave.open(output_path, 'wb') as target:
+            target.setparams(params)
+            for start, end in segments:
+                first = int(start * rate)
+                remaining = int(end * rate) - first
+                source.setpos(first)
+                while remaining > 0:
+                    frames = source.readframes(min(BLOCK_FRAMES, remaining))
+                    if not frames:
+                        break
+                    target.writeframes(frames)
+                    remaining -= len(frames) // params.sampwidth // params.nchannels
+
+
+def lowpass_kernel(ratio, taps_per_ratio=16):
+    """
+    Windowed-sinc anti-aliasing filter for decimating by `ratio`, cutting off
+    a little below the target Nyquist frequency
+    """
+    taps = int(taps_per_ratio * ratio) | 1
+    cutoff = 0.45 / ratio  # cycles per source sample
+    n = np.arange(taps) - (taps - 1) / 2.0
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(taps)
+    return kernel / kernel.sum()
+
+
+def normalize_wav(input_path, output_path, target_rate=16000):
+    """
+    Downmix to mono and resample down to `target_rate` as 16-bit PCM,
+    block by block: each block is low-pass filtered (overlap-save, with the
+    filter history carried across blocks) and linearly interpolated at the
+    output sample positions. Lower-rate input keeps its rate. Returns False,
+    writing nothing, when the input is already mono 16-bit at or below the
+    target rate.
+    """
+    with wave.open(input_path, 'rb') as source:
+        rate = source.getframerate()
+        channels = source.getnchannels()
+        width = source.getsampwidth()
+        total = source.getnframes()
+        if channels == 1 and width == 2 and rate <= target_rate:
+            return False
+
+        out_rate = min(rate, target_rate)
+        ratio = rate / float(out_rate)
+        kernel = lowpass_kernel(ratio) if ratio > 1 else np.ones(1)
+        delay = (len(kernel) - 1) // 2
+        expected = int(round(total / ratio))
+
+        history = np.zeros(len(kernel) - 1)
+        carry = np.zeros(0)      # filtered samples still needed for interpolation
+        carry_start = 0          # global index of carry[0]
+        written = 0              # output samples emitted so far
+
+        with wave.open(output_path, 'wb') as target:
+            target.setnchannels(1)
+            target.setsampwidth(2)
+            target.setframerate(out_rate)
+
+            def emit(filtered):
+                nonlocal carry, carry_start, written
+                buffer = np.concatenate((carry, filtered))
+                last = carry_start + len(buffer) - 1
+                # Output k sits at filtered position k * ratio + delay and needs
+                # the samples on both sides of it
+                end = int(np.ceil((last - delay) / ratio)) if last > delay else 0
+                end = min(expected, max(end, written))
+                if end > written:
+                    positions = np.arange(written, end) * ratio + delay - carry_start
+                    index = np.floor(positions).astype(np.int64)
+                    frac = positions - index
+                    upper = np.minimum(index + 1, len(buffer) - 1)
+                    samples = buffer[index] * (1.0 - frac) + buffer[upper] * frac
+                    pcm = np.clip(np.round(samples * 32767.0), -32768, 32767).astype('<i2')
+                    target.writeframes(pcm.tobytes())
+                    written = end
+                keep = max(0, min(int(np.floor(written * ratio + delay)) - carry_start, len(buffer)))
+                carry = buffer[keep:]
+                carry_start += keep
+
+            while True:
+                frames = source.readframes(BLOCK_FRAMES)
+                if not frames:
+                    break
+                mono = pcm_to_float(frames, width, channels).mean(axis=1, dtype=np.float64)
+                padded = np.concatenate((history, mono))
+                history = padded[len(padded) - len(history):] if len(history) else history
+                emit(np.convolve(padded, kernel, mode='valid'))
+
+            # Flush the filter delay so the tail isn't lost
+            tail = np.concatenate((history, np.zeros(delay + int(np.ceil(ratio)) + 1)))
+            emit(np.convolve(tail, kernel, mode='valid'))
+            if written < expected:
+                target.writeframes(np.zeros(expected - written, dtype='<i2').tobytes())
+    return True
@@ -0,0 +1,328 @@
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import PROVIDER_RESPONSES, PROVIDER_RETRIES, PROVIDER_UPLOAD_BYTES
+
+# Status codes worth retrying: rate limits and transient server-side errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class ProviderError(Exception):
+    """Non-success response from a transcription provider"""
+
+    def __init__(self, status_code, message=""):
+        super().__init__(f"{status_code} - {message}")
+        self.status_code = status_code
+        self.message = message
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider while its circuit is open"""
+
+
+class RequestCancelled(Exception):
+    """Raised when a caller gave up on a request (e.g. the hedge won)"""
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies"""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct):
+        with self._lock:
+            values = sorted(self._samples)
+        if not values:
+            return None
+        rank = max(1, math.ceil(pct / 100.0 * len(values)))
+        return values[rank - 1]
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    closed -> open after `failure_threshold` failures in a row; after
+    `reset_timeout` seconds one trial call is let through (half-open) and its
+    outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def admit(self):
+        """An _Admission for one call, or None while the circuit is open"""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return _Admission(self, trial=False)
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return _Admission(self, trial=True)
+            return None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        """Give back a half-open trial slot without recording an outcome"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class _Admission:
+    """
+    One call let through by a CircuitBreaker. Settles exactly once, so a
+    half-open trial slot can't leak on an unexpected exception path.
+    """
+
+    def __init__(self, breaker, trial):
+        self.breaker = breaker
+        self.trial = trial
+        self.settled = False
+
+    def _settle(self, outcome):
+        if not self.settled:
+            self.settled = True
+            outcome()
+
+    def success(self):
+        self._settle(self.breaker.record_success)
+
+    def failure(self):
+        self._settle(self.breaker.record_failure)
+
+    def release(self):
+        # Only the half-open trial holds a slot; a closed-state call must not
+        # free the slot of a trial that started after it
+        self._settle(self.breaker.release if self.trial else lambda: None)
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0, hint=None):
+    """
+    Exponential backoff with full jitter. A server-provided wait hint (HF's
+    estimated_time) acts as a floor, still bounded by `cap`.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if hint:
+        delay = max(delay, hint)
+    return min(delay, cap)
+
+
+def make_session(pool_size=10):
+    """requests.Session with a keep-alive pool; retries are handled by the caller"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _parse_text(result):
+    # Handle different response formats
+    if isinstance(result, dict):
+        return str(result.get('text', '')).strip()
+    if isinstance(result, str):
+        return result.strip()
+    return str(result).strip()
+
+
+def _estimated_time(response):
+    try:
+        body = response.json()
+        if isinstance(body, dict) and body.get("estimated_time") is not None:
+            return float(body["estimated_time"])
+    except ValueError:
+        pass
+    return None
+
+
+class HuggingFaceWhisper:
+    """Hugging Face Inference API client sharing one connection pool per process"""
+
+    name = "huggingface"
+
+    def __init__(self, api_key, model, base_url="https://api-inference.huggingface.co/models",
+                 timeout=120, max_retries=3, backoff_base=1.0, backoff_cap=30.0,
+                 pool_size=10, breaker=None):
+        self.api_key = api_key
+        self.model = model
+        self.url = f"{base_url.rstrip('/')}/{model}"
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.session = make_session(pool_size)
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+
+    def transcribe(self, audio_file_path, cancel_event=None):
+        """
+        Transcribe one file. `cancel_event` stops further retries once set;
+        an in-flight HTTP request can't be interrupted and its result is dropped.
+        """
+        admission = self.breaker.admit()
+        if admission is None:
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        try:
+            audio_format = audio_file_path.split('.')[-1]
+            size = os.path.getsize(audio_file_path)
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": f"audio/{audio_format}",
+                "Content-Length": str(size)
+            }
+
+            # The file object is streamed from disk in blocks, so memory use stays
+            # flat regardless of upload size; retries just rewind it
+            with open(audio_file_path, "rb") as audio_file:
+                return self._post_with_retries(audio_file, headers, cancel_event or threading.Event(),
+                                               admission)
+        finally:
+            # Local failures (missing file, parse errors) say nothing about the
+            # provider: hand the slot back without recording an outcome
+            admission.release()
+
+    def _post_with_retries(self, audio_file, headers, cancel_event, admission):
+        attempt = 0
+        size = int(headers["Content-Length"])
+        while True:
+            if cancel_event.is_set():
+                admission.release()
+                raise RequestCancelled(f"{self.name} request cancelled")
+            audio_file.seek(0)
+            started = time.perf_counter()
+            PROVIDER_UPLOAD_BYTES.labels(self.name).inc(size)
+            try:
+                response = self.session.post(
+                    self.url, headers=headers, data=audio_file, timeout=self.timeout
+                )
+            except requests.exceptions.Timeout:
+                PROVIDER_RESPONSES.labels(self.name, "timeout").inc()
+                admission.failure()
+                raise
+            except requests.exceptions.RequestException:
+                # Connection resets, truncated (chunked) bodies and the like
+                PROVIDER_RESPONSES.labels(self.name, "connection_error").inc()
+                if attempt >= self.max_retries:
+                    admission.failure()
+                    raise
+                PROVIDER_RETRIES.labels(self.name, "connection_error").inc()
+                cancel_event.wait(backoff_delay(attempt, self.backoff_base, self.backoff_cap))
+                attempt += 1
+                continue
+
+            print(f"Hugging Face API Status: {response.status_code}")
+            PROVIDER_RESPONSES.labels(self.name, response.status_code).inc()
+
+            if response.status_code == 200:
+                admission.success()
+                self.latency.observe(time.perf_counter() - started)
+                return _parse_text(response.json())
+
+            if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                hint = _estimated_time(response) if response.status_code == 503 else None
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap, hint)
+                print(f"Hugging Face returned {response.status_code}, retrying in {delay:.1f}s")
+                PROVIDER_RETRIES.labels(self.name, response.status_code).inc()
+                cancel_event.wait(delay)
+                attempt += 1
+                continue
+
+            if response.status_code in RETRYABLE_STATUS:
+                admission.failure()
+            else:
+                # Client errors say nothing about provider health
+                admission.success()
+            raise ProviderError(response.status_code, response.text)
+
+
+class OpenAIWhisper:
+    """OpenAI transcription client; the SDK client (and its pool) is built once"""
+
+    name = "openai"
+
+    def __init__(self, api_key, model, base_url=None, timeout=120, max_retries=2):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import openai
+                    self._client = openai.OpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        timeout=self.timeout,
+                        max_retries=self.max_retries
+                    )
+        return self._client
+
+    def transcribe(self, audio_file_path):
+        PROVIDER_UPLOAD_BYTES.labels(self.name).inc(os.path.getsize(audio_file_path))
+        try:
+            with open(audio_file_path, 'rb') as audio_file:
+                response = self.client.audio.transcriptions.create(
+                    model=self.model,
+                    file=audio_file,
+                    response_format="text"
+                )
+        except Exception as e:
+            PROVIDER_RESPONSES.labels(self.name, getattr(e, "status_code", None) or "error").inc()
+            raise
+        PROVIDER_RESPONSES.labels(self.name, 200).inc()
+        return _parse_text(response) if response else ""
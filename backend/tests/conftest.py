@@ -0,0 +1,10 @@
+import os
+import sys
+
+# app.py reads its configuration at import time
+os.environ.setdefault("HUGGINGFACE_API_KEY", "test")
+os.environ["OPENAI_API_KEY"] = ""
+os.environ["MONGODB_URI"] = ""
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-of-at-least-32-bytes!")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,93 @@
+import struct
+
+import numpy as np
+import pytest
+import soundfile
+
+from audio_metadata import probe_audio
+from test_chunking import write_wav
+
+
+def ebml(element_id, data=b"", unknown_size=False):
+    size = b"\x01\xff\xff\xff\xff\xff\xff\xff" if unknown_size else bytes([0x80 | len(data)])
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + size + data
+
+
+def webm_header(duration_ms=None):
+    info = ebml(0x2AD7B1, (1000000).to_bytes(3, "big"))
+    if duration_ms is not None:
+        info += ebml(0x4489, struct.pack(">d", duration_ms))
+    audio = ebml(0xB5, struct.pack(">d", 48000.0)) + ebml(0x9F, b"\x01")
+    tracks = ebml(0x1654AE6B, ebml(0xAE, ebml(0xE1, audio)))
+    return ebml(0x1A45DFA3, ebml(0x4282, b"webm")) + ebml(0x18538067, ebml(0x1549A966, info) + tracks,
+                                                          unknown_size=True)
+
+
+def mp3_frame_header(bitrate_index=9, rate_index=0, mono=False):
+    # MPEG-1 Layer III without CRC
+    return bytes([0xFF, 0xFB, (bitrate_index << 4) | (rate_index << 2), 0xC0 if mono else 0x00])
+
+
+def test_wav(tmp_path):
+    path = tmp_path / "a.wav"
+    write_wav(path, 2.5, 22050, channels=2)
+    assert probe_audio(str(path)) == {"format": "wav", "duration": 2.5, "sample_rate": 22050, "channels": 2}
+
+
+def test_streamed_wav_uses_the_bytes_on_disk(tmp_path):
+    path = tmp_path / "a.wav"
+    write_wav(path, 1.0, 16000)
+    data = bytearray(path.read_bytes())
+    data[40:44] = struct.pack("<I", 0xFFFFFFFF)
+    path.write_bytes(bytes(data))
+    assert probe_audio(str(path))["duration"] == 1.0
+
+
+@pytest.mark.parametrize("subtype, fmt", [("OPUS", "opus"), ("VORBIS", "ogg")])
+def test_ogg(tmp_path, subtype, fmt):
+    path = tmp_path / "a.ogg"
+    samples = np.random.default_rng(0).normal(0, 0.1, 48000 * 3).astype("float32")
+    soundfile.write(str(path), samples, 48000, format="OGG", subtype=subtype)
+    metadata = probe_audio(str(path))
+    assert (metadata["format"], metadata["sample_rate"], metadata["channels"]) == (fmt, 48000, 1)
+    assert metadata["duration"] == pytest.approx(3.0, abs=0.05)
+
+
+def test_webm_with_duration(tmp_path):
+    path = tmp_path / "a.webm"
+    path.write_bytes(webm_header(duration_ms=4250.0) + ebml(0x1F43B675, ebml(0xE7, b"\x00")))
+    assert probe_audio(str(path)) == {"format": "webm", "duration": 4.25, "sample_rate": 48000, "channels": 1}
+
+
+def test_live_webm_duration_comes_from_the_last_cluster(tmp_path):
+    # MediaRecorder output: no Duration element; last cluster at 5000 ms, last block +200 ms
+    block = ebml(0xA3, b"\x81" + struct.pack(">h", 200) + b"\x80" + b"\x00" * 8)
+    clusters = (ebml(0x1F43B675, ebml(0xE7, (0).to_bytes(2, "big")) + block)
+                + ebml(0x1F43B675, ebml(0xE7, (5000).to_bytes(2, "big")) + block))
+    path = tmp_path / "a.webm"
+    path.write_bytes(webm_header() + clusters)
+    assert probe_audio(str(path))["duration"] == 5.2
+
+
+def test_cbr_mp3_duration_from_bitrate(tmp_path):
+    path = tmp_path / "a.mp3"
+    # 128 kbps for two seconds
+    path.write_bytes(mp3_frame_header() + b"\x00" * (32000 - 4))
+    assert probe_audio(str(path)) == {"format": "mp3", "duration": 2.0, "sample_rate": 44100, "channels": 2}
+
+
+def test_vbr_mp3_behind_id3_uses_the_xing_frame_count(tmp_path):
+    tag = b"ID3\x03\x00\x00" + bytes([0, 0, 0, 20]) + b"\x00" * 20
+    xing = b"Xing" + struct.pack(">II", 1, 100)
+    frame = mp3_frame_header(mono=True) + b"\x00" * 17 + xing
+    path = tmp_path / "a.mp3"
+    path.write_bytes(tag + frame + b"\x00" * 4000)
+    metadata = probe_audio(str(path))
+    assert metadata["channels"] == 1
+    assert metadata["duration"] == round(100 * 1152 / 44100, 3)
+
+
+def test_unknown_format(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"not audio at all")
+    assert probe_audio(str(path)) is None
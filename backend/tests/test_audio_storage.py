@@ -0,0 +1,55 @@
+import pytest
+
+from audio_storage import (FilesystemStorage, AudioNotFound, AudioNotModified,
+                           AudioRangeNotSatisfiable)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = FilesystemStorage(str(tmp_path))
+    source = tmp_path / "upload.ogg"
+    source.write_bytes(bytes(range(100)))
+    storage.save("user/a.ogg", str(source))
+    return storage
+
+
+def read(stored):
+    return b"".join(stored.iter_chunks(chunk_size=7))
+
+
+def test_get_whole_object(storage):
+    stored = storage.get("user/a.ogg")
+    assert read(stored) == bytes(range(100))
+    assert stored.content_length == 100
+    assert stored.content_range is None
+    assert stored.etag.startswith('"')
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=10-19", 10, 19),
+    ("bytes=90-", 90, 99),
+    ("bytes=-5", 95, 99),
+    ("bytes=95-500", 95, 99),
+])
+def test_get_byte_range(storage, header, start, end):
+    stored = storage.get("user/a.ogg", byte_range=header)
+    assert read(stored) == bytes(range(start, end + 1))
+    assert stored.content_length == end - start + 1
+    assert stored.content_range == f"bytes {start}-{end}/100"
+
+
+def test_get_range_past_the_end(storage):
+    with pytest.raises(AudioRangeNotSatisfiable):
+        storage.get("user/a.ogg", byte_range="bytes=100-")
+
+
+def test_get_if_none_match(storage):
+    etag = storage.get("user/a.ogg").etag
+    with pytest.raises(AudioNotModified):
+        storage.get("user/a.ogg", if_none_match=f"W/{etag}")
+    assert read(storage.get("user/a.ogg", if_none_match='"other"')) == bytes(range(100))
+
+
+def test_get_missing(storage):
+    with pytest.raises(AudioNotFound):
+        storage.get("user/missing.ogg")
@@ -0,0 +1,62 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import app
+from audio_storage import FilesystemStorage
+
+USER = "64b000000000000000000001"
+OTHER = "64b000000000000000000002"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    storage = FilesystemStorage(str(tmp_path))
+    for user in (USER, OTHER):
+        (tmp_path / user).mkdir()
+        (tmp_path / user / "a.ogg").write_bytes(b"OggS" + bytes(100))
+    monkeypatch.setattr(app, "audio_storage", storage)
+    return app.app.test_client()
+
+
+def with_query(url, **changes):
+    parts = urlsplit(url)
+    query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+    query.update(changes)
+    return parts.path + "?" + "&".join(f"{key}={value}" for key, value in query.items())
+
+
+def test_signed_url_serves_the_file(client):
+    response = client.get(app.sign_audio_url(USER, "a.ogg"))
+    assert response.status_code == 200
+    assert response.data.startswith(b"OggS")
+    assert "private" in response.headers["Cache-Control"]
+
+
+def test_unsigned_url_is_rejected(client):
+    assert client.get(f"/audio/{USER}/a.ogg").status_code == 401
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda url: with_query(url, sig="0" * 64),
+    lambda url: with_query(url, expires=int(parse_qs(urlsplit(url).query)["expires"][0]) + 3600),
+    lambda url: url.replace(USER, OTHER),
+    lambda url: url.replace("a.ogg", "b.ogg"),
+])
+def test_tampered_url_is_rejected(client, tamper):
+    assert client.get(tamper(app.sign_audio_url(USER, "a.ogg"))).status_code == 403
+
+
+def test_expired_url_is_rejected(client, monkeypatch):
+    url = app.sign_audio_url(USER, "a.ogg")
+    expires = int(parse_qs(urlsplit(url).query)["expires"][0])
+    monkeypatch.setattr(app.time, "time", lambda: expires + 1)
+    assert client.get(url).status_code == 403
+
+
+def test_expiry_is_stable_within_a_bucket(monkeypatch):
+    bucket = app.AUDIO_URL_BUCKET
+    monkeypatch.setattr(app.time, "time", lambda: bucket * 1000 + 1)
+    first = app.sign_audio_url(USER, "a.ogg")
+    monkeypatch.setattr(app.time, "time", lambda: bucket * 1000 + bucket - 1)
+    assert app.sign_audio_url(USER, "a.ogg") == first
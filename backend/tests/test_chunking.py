@@ -0,0 +1,104 @@
+import threading
+import wave
+
+import numpy as np
+import pytest
+
+import app
+from audio_metadata import probe_audio
+from transcription_cache import is_cacheable
+
+
+def write_wav(path, seconds, sample_rate, channels=1):
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 3000, (int(seconds * sample_rate), channels)).astype("<i2")
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+
+
+@pytest.fixture
+def provider_calls(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def transcribe(path, cancel_event=None):
+        with lock:
+            calls.append(path)
+        return f"chunk {len(calls)}"
+
+    monkeypatch.setattr(app, "HEDGE_ENABLED", False)
+    monkeypatch.setattr(app.huggingface_whisper, "transcribe", transcribe)
+    return calls
+
+
+@pytest.mark.parametrize("sample_rate, codec, extension", [
+    (44100, "opus", ".flac"),   # not an Opus rate: stored as FLAC
+    (48000, "opus", ".ogg"),
+    (44100, "flac", ".flac"),
+])
+def test_long_stored_audio_is_chunked(tmp_path, monkeypatch, provider_calls, sample_rate, codec, extension):
+    seconds = 3 * app.CHUNK_SECONDS
+    source = tmp_path / "upload.wav"
+    write_wav(source, seconds, sample_rate, channels=2)
+
+    monkeypatch.setattr(app, "AUDIO_STORAGE_CODEC", codec)
+    stored = app.encode_for_storage(str(source), str(tmp_path))
+    assert stored.endswith(extension)
+
+    metadata = probe_audio(stored)
+    assert metadata["sample_rate"] == sample_rate
+    assert metadata["duration"] == pytest.approx(seconds, abs=0.1)
+
+    app.transcribe_with_whisper_large_v3(stored)
+    assert len(provider_calls) > 1
+
+
+def test_flac_probe_reads_streaminfo(tmp_path):
+    source = tmp_path / "upload.wav"
+    write_wav(source, 2.5, 44100, channels=2)
+    encoded = tmp_path / "upload.flac"
+    app.encode(str(source), str(encoded), "FLAC")
+
+    assert probe_audio(str(encoded)) == {
+        "format": "flac", "duration": 2.5, "sample_rate": 44100, "channels": 2
+    }
+
+
+def test_failed_chunk_is_retried(tmp_path, monkeypatch):
+    source = tmp_path / "long.wav"
+    write_wav(source, 3 * app.CHUNK_SECONDS, 16000)
+    attempts = {}
+    lock = threading.Lock()
+
+    def transcribe(path, cancel_event=None):
+        with lock:
+            attempts[path] = attempts.get(path, 0) + 1
+            first_try = attempts[path] == 1
+        # One window fails once, then succeeds
+        if path.endswith("chunk_0001.wav") and first_try:
+            raise app.ProviderError(503, "busy")
+        return "words"
+
+    monkeypatch.setattr(app, "HEDGE_ENABLED", False)
+    monkeypatch.setattr(app.huggingface_whisper, "transcribe", transcribe)
+    text = app.transcribe_with_whisper_large_v3(str(source))
+    assert not text.startswith("[")
+
+
+def test_chunk_that_keeps_failing_fails_the_file(tmp_path, monkeypatch):
+    source = tmp_path / "long.wav"
+    write_wav(source, 3 * app.CHUNK_SECONDS, 16000)
+
+    def transcribe(path, cancel_event=None):
+        if path.endswith("chunk_0001.wav"):
+            raise app.ProviderError(503, "busy")
+        return "words"
+
+    monkeypatch.setattr(app, "HEDGE_ENABLED", False)
+    monkeypatch.setattr(app.huggingface_whisper, "transcribe", transcribe)
+    text = app.transcribe_with_whisper_large_v3(str(source))
+    assert text.startswith("[ERROR:")
+    assert not is_cacheable(text)
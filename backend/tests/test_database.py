@@ -0,0 +1,63 @@
+import threading
+
+import mongomock
+import pytest
+
+import database
+from database import DatabaseUnavailable, LazyDatabase
+
+
+class FlakyConnect:
+    """Fails the first `failures` calls, then returns a mongomock database"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.connected = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OSError("DNS lookup failed")
+        self.connected.set()
+        return mongomock.MongoClient().get_database("test")
+
+
+def test_connects_lazily_on_first_use():
+    connect = FlakyConnect(failures=0)
+    db = LazyDatabase(connect)
+    assert connect.calls == 0
+
+    db.items.insert_one({"a": 1})
+    assert db["items"].count_documents({}) == 1
+    assert connect.calls == 1
+    assert db.status() == "connected"
+
+
+def test_failed_connect_fails_fast_then_recovers_in_background():
+    connect = FlakyConnect(failures=2)
+    db = LazyDatabase(connect, retry_min_seconds=0.01, retry_max_seconds=0.02)
+
+    with pytest.raises(DatabaseUnavailable, match="DNS lookup failed"):
+        db.items.find_one()
+    # Callers don't pile up connection attempts while the retry thread runs
+    with pytest.raises(DatabaseUnavailable):
+        db.items.find_one()
+    assert db.status() == "unavailable"
+
+    assert connect.connected.wait(5)
+    assert connect.calls == 3
+    assert db.items.find_one() is None
+    assert db.status() == "connected"
+
+
+def test_forked_process_builds_its_own_client(monkeypatch):
+    connect = FlakyConnect(failures=0)
+    db = LazyDatabase(connect)
+    parent = db.items
+    assert connect.calls == 1
+
+    monkeypatch.setattr(database.os, "getpid", lambda: -1)
+    child = db.items
+    assert connect.calls == 2
+    assert child.database is not parent.database
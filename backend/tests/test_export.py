@@ -0,0 +1,71 @@
+import io
+import json
+import zipfile
+
+import mongomock
+import pytest
+from flask_jwt_extended import create_access_token
+
+import app
+from audio_storage import FilesystemStorage
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, "db", mongomock.MongoClient().get_database("test"))
+    monkeypatch.setattr(app, "audio_storage", FilesystemStorage(str(tmp_path)))
+    user_id = str(app.db.users.insert_one({"email": "user@example.com"}).inserted_id)
+    with app.app.app_context():
+        token = create_access_token(identity=user_id)
+    client = app.app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    client.user_id = user_id
+    client.storage_root = tmp_path
+    return client
+
+
+def add_transcript(client, title, audio_filename=None, audio=None):
+    doc = app.TranscriptDocument.create(client.user_id, title, "Some words here.", audio_filename,
+                                        app.analyze_transcript("Some words here.", 5.0))
+    doc["_id"] = app.TranscriptDocument.insert(doc)
+    if audio is not None:
+        path = client.storage_root / client.user_id / audio_filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(audio)
+    return doc
+
+
+def test_zip_export_lists_transcripts_before_audio(client):
+    add_transcript(client, "first", "one.ogg", b"OggS" + b"\x01" * 5000)
+    add_transcript(client, "second", "two.ogg", b"OggS" + b"\x02" * 3000)
+    add_transcript(client, "no audio")
+
+    response = client.get("/api/export?format=zip")
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+
+    archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+    assert archive.testzip() is None
+    names = archive.namelist()
+    assert names[0] == "transcripts.ndjson"
+    assert sorted(names[1:]) == ["audio/one.ogg", "audio/two.ogg"]
+
+    records = [json.loads(line) for line in archive.read("transcripts.ndjson").splitlines()]
+    assert sorted(r.get("audioFile") or "" for r in records) == ["", "audio/one.ogg", "audio/two.ogg"]
+    assert archive.read("audio/one.ogg") == b"OggS" + b"\x01" * 5000
+    # Recordings are stored as-is; only the transcript listing is deflated
+    assert archive.getinfo("audio/two.ogg").compress_type == zipfile.ZIP_STORED
+    assert archive.getinfo("transcripts.ndjson").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_zip_export_skips_missing_audio_and_honours_audio_flag(client):
+    add_transcript(client, "kept", "kept.ogg", b"OggS kept")
+    add_transcript(client, "lost", "lost.ogg")
+
+    archive = zipfile.ZipFile(io.BytesIO(client.get("/api/export?format=zip").get_data()))
+    assert archive.namelist() == ["transcripts.ndjson", "audio/kept.ogg"]
+
+    archive = zipfile.ZipFile(io.BytesIO(client.get("/api/export?format=zip&audio=0").get_data()))
+    assert archive.namelist() == ["transcripts.ndjson"]
+    records = [json.loads(line) for line in archive.read("transcripts.ndjson").splitlines()]
+    assert len(records) == 2 and not any("audioFile" in r for r in records)
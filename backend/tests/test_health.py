@@ -0,0 +1,7 @@
+import app
+
+
+def test_health_reports_ffmpeg(monkeypatch):
+    monkeypatch.setattr(app, "ffmpeg_path", lambda: None)
+    response = app.app.test_client().get("/api/health")
+    assert response.get_json()["services"]["ffmpeg"] == "missing"
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def hedge(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(app, "hedge_deadline", lambda: 0.05)
+    path = tmp_path / "clip.flac"
+    path.write_bytes(b"audio")
+    return str(path)
+
+
+def test_slow_huggingface_is_cancelled_when_openai_wins(hedge, monkeypatch):
+    hf_cancelled = threading.Event()
+
+    def slow_huggingface(path, cancel_event=None):
+        # Stands in for the retry loop, which checks the event between attempts
+        if cancel_event.wait(5):
+            hf_cancelled.set()
+            raise RuntimeError("cancelled")
+        return "from huggingface"
+
+    monkeypatch.setattr(app.huggingface_whisper, "transcribe", slow_huggingface)
+    monkeypatch.setattr(app.openai_whisper, "transcribe", lambda path: "from openai")
+
+    assert app.transcribe_hedged(hedge) == ("from openai", "openai")
+    assert hf_cancelled.wait(1)
+
+
+def test_fast_huggingface_never_starts_openai(hedge, monkeypatch):
+    openai_calls = []
+    monkeypatch.setattr(app.huggingface_whisper, "transcribe", lambda path, cancel_event=None: "from huggingface")
+    monkeypatch.setattr(app.openai_whisper, "transcribe", lambda path: openai_calls.append(path))
+
+    assert app.transcribe_hedged(hedge) == ("from huggingface", "huggingface")
+    assert openai_calls == []
+
+
+def test_hedge_falls_back_to_the_slow_request_when_openai_fails(hedge, monkeypatch):
+    release = threading.Event()
+
+    def slow_huggingface(path, cancel_event=None):
+        release.wait(5)
+        return "from huggingface"
+
+    def failing_openai(path):
+        release.set()
+        raise RuntimeError("openai down")
+
+    monkeypatch.setattr(app.huggingface_whisper, "transcribe", slow_huggingface)
+    monkeypatch.setattr(app.openai_whisper, "transcribe", failing_openai)
+
+    assert app.transcribe_hedged(hedge) == ("from huggingface", "huggingface")
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+import app
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock.MongoClient().get_database("test")
+    monkeypatch.setattr(app, "db", database)
+    return database
+
+
+def queue_job(db):
+    job = app.JobDocument.create(str(ObjectId()), "recording.wav", "20260101_000000")
+    db.jobs.insert_one(job)
+    return job
+
+
+def expire_lease(db, job_id):
+    db.jobs.update_one({"_id": job_id}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+
+
+def test_stale_owner_cannot_renew_or_finish(db):
+    queued = queue_job(db)
+    first = app.JobDocument.claim_next()
+    assert app.JobDocument.renew_lease(first)
+
+    expire_lease(db, queued["_id"])
+    second = app.JobDocument.claim_next()
+    assert second["lease_owner"] != first["lease_owner"]
+
+    assert not app.JobDocument.renew_lease(first)
+    assert not app.JobDocument.finish(first["_id"], app.JobDocument.FAILED, error="late",
+                                      lease_owner=first["lease_owner"])
+    assert app.JobDocument.finish(second["_id"], app.JobDocument.DONE, transcript_id=second["_id"],
+                                  lease_owner=second["lease_owner"])
+    assert db.jobs.find_one({"_id": queued["_id"]})["status"] == app.JobDocument.DONE
+
+
+def test_job_finishes_when_another_attempt_stored_the_transcript(db, monkeypatch, tmp_path):
+    queue_job(db)
+    job = app.JobDocument.claim_next()
+    monkeypatch.setitem(app.app.config, "UPLOAD_FOLDER", str(tmp_path))
+    upload = tmp_path / str(job["user_id"]) / job["audio_filename"]
+    upload.parent.mkdir()
+    upload.write_bytes(b"")
+
+    def already_stored(*args, **kwargs):
+        raise DuplicateKeyError("duplicate _id")
+
+    monkeypatch.setattr(app, "process_transcription", already_stored)
+    app.run_transcription_job(job)
+
+    finished = db.jobs.find_one({"_id": job["_id"]})
+    assert finished["status"] == app.JobDocument.DONE
+    assert finished["transcript_id"] == job["_id"]
+    assert "lease_owner" not in finished
@@ -0,0 +1,125 @@
+import gzip
+import json
+
+import mongomock
+import pytest
+from flask_jwt_extended import create_access_token
+
+import app
+import compression
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, "db", mongomock.MongoClient().get_database("test"))
+    user_id = str(app.db.users.insert_one({"email": "user@example.com"}).inserted_id)
+    with app.app.app_context():
+        token = create_access_token(identity=user_id)
+    client = app.app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    client.user_id = user_id
+    return client
+
+
+def add_transcript(user_id, text="Some words. More words here."):
+    doc = app.TranscriptDocument.create(user_id, "t", text, None, app.analyze_transcript(text, 60.0))
+    doc["_id"] = app.TranscriptDocument.insert(doc)
+    app.UserStatsDocument.record_insert(doc)
+    return doc
+
+
+def list_etag(client, path="/api/transcripts?limit=10"):
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.headers["ETag"]
+
+
+def test_unchanged_list_revalidates_with_304(client):
+    add_transcript(client.user_id)
+    etag = list_etag(client)
+
+    response = client.get("/api/transcripts?limit=10", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert response.headers["ETag"] == etag
+    # A different query is a different representation
+    assert list_etag(client, "/api/transcripts?limit=5") != etag
+
+
+def test_every_kind_of_write_changes_the_etag(client):
+    doc = add_transcript(client.user_id)
+    seen = [list_etag(client)]
+
+    add_transcript(client.user_id)
+    seen.append(list_etag(client))
+
+    assert client.put(f"/api/transcripts/{doc['_id']}", json={"name": "renamed"}).status_code == 200
+    seen.append(list_etag(client))
+
+    assert client.post("/api/transcripts/bulk", json={"rename": {str(doc["_id"]): "again"}}).status_code == 200
+    seen.append(list_etag(client))
+
+    assert client.delete(f"/api/transcripts/{doc['_id']}").status_code == 200
+    seen.append(list_etag(client))
+
+    assert len(set(seen)) == len(seen)
+
+
+def test_version_reads_only_the_stats_document(client, monkeypatch):
+    add_transcript(client.user_id)
+    add_transcript(client.user_id)
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError("version must not query transcripts")
+
+    monkeypatch.setattr(app.db.transcripts, "aggregate", no_scan)
+    monkeypatch.setattr(app.db.transcripts, "find", no_scan)
+    count, revision, updated_at = app.UserStatsDocument.version(client.user_id)
+    assert (count, revision) == (2, 2)
+    assert updated_at is not None
+
+
+def test_list_is_compressed_when_accepted(client):
+    for _ in range(10):
+        add_transcript(client.user_id, "Long enough to compress. " * 20)
+
+    response = client.get("/api/transcripts?limit=10", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(json.loads(gzip.decompress(response.get_data()))["items"]) == 10
+
+    response = client.get("/api/transcripts?limit=10", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert len(response.get_json()["items"]) == 10
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("GZIP;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "br" if compression.brotli else "gzip"),
+    ("br, gzip;q=0.8", "br" if compression.brotli else "gzip"),
+    ("br;q=0.1, gzip", "gzip"),
+    ("gzip;q=bogus, deflate", None),
+])
+def test_negotiate_honours_q_values(header, expected):
+    assert compression.negotiate(header) == expected
+
+
+def test_compress_skips_small_bodies():
+    small = b"x" * (compression.MIN_COMPRESS_BYTES - 1)
+    assert compression.compress(small, "gzip") == (small, None)
+    large = b'{"text":"' + b"words " * 500 + b'"}'
+    body, encoding = compression.compress(large, "gzip")
+    assert encoding == "gzip" and gzip.decompress(body) == large
+    assert compression.compress(large, None) == (large, None)
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli not installed")
+def test_compress_brotli():
+    large = b"words " * 500
+    body, encoding = compression.compress(large, "br")
+    assert encoding == "br" and compression.brotli.decompress(body) == large
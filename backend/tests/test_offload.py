@@ -0,0 +1,20 @@
+import threading
+
+import app
+
+
+def test_cpu_work_leaves_the_gevent_hub(monkeypatch):
+    monkeypatch.setattr(app, "concurrency_mode", lambda: "gevent")
+    caller = threading.get_ident()
+
+    def work(a, b=0):
+        return threading.get_ident(), a + b
+
+    ident, result = app.offload(work, 1, b=2)
+    assert result == 3
+    assert ident != caller
+
+
+def test_cpu_work_runs_inline_under_threads(monkeypatch):
+    monkeypatch.setattr(app, "concurrency_mode", lambda: "threads")
+    assert app.offload(threading.get_ident) == threading.get_ident()
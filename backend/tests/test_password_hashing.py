@@ -0,0 +1,11 @@
+from password_hashing import PasswordHasher
+
+
+def test_hash_and_check_on_spawned_pool():
+    hasher = PasswordHasher(rounds=4, max_workers=1)
+    hashed = hasher.hash("correct horse")
+
+    assert hasher._pool()._mp_context.get_start_method() == "spawn"
+    assert hasher.check(hashed, "correct horse")
+    assert not hasher.check(hashed, "wrong")
+    assert not hasher.check("not-a-bcrypt-hash", "correct horse")
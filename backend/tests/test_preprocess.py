@@ -0,0 +1,76 @@
+import os
+import wave
+
+import numpy as np
+import pytest
+
+import app
+from preprocess import normalize_wav
+from test_chunking import write_wav
+
+
+@pytest.mark.parametrize("hf_key, extension", [("test", ".wav"), ("", ".flac")])
+def test_long_audio_is_only_sent_as_wav_when_it_will_be_chunked(tmp_path, monkeypatch, hf_key, extension):
+    monkeypatch.setattr(app, "HUGGINGFACE_API_KEY", hf_key)
+    monkeypatch.setattr(app, "AUDIO_NORMALIZE_ENABLED", True)
+    monkeypatch.setattr(app, "SILENCE_TRIM_ENABLED", False)
+    upload = tmp_path / "upload.wav"
+    write_wav(upload, 3 * app.CHUNK_SECONDS, 44100, channels=2)
+
+    path, _ = app.preprocess_for_provider(str(upload), str(tmp_path), str(upload))
+    assert os.path.splitext(path)[1] == extension
+
+
+def read_pcm(path):
+    with wave.open(str(path), "rb") as wav:
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2").astype(np.float64)
+        return samples, wav.getframerate(), wav.getnchannels()
+
+
+def write_tone(path, frequency, seconds, rate, channels):
+    t = np.arange(int(seconds * rate)) / rate
+    samples = np.repeat((8000 * np.sin(2 * np.pi * frequency * t))[:, None], channels, axis=1)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.astype("<i2").tobytes())
+
+
+def peak_frequency(samples, rate):
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.argmax(spectrum) * rate / len(samples)
+
+
+def test_normalize_downmixes_and_resamples(tmp_path):
+    source, target = tmp_path / "in.wav", tmp_path / "out.wav"
+    write_tone(source, 440, 5.0, 44100, channels=2)
+
+    assert normalize_wav(str(source), str(target), 16000)
+    samples, rate, channels = read_pcm(target)
+    assert (rate, channels) == (16000, 1)
+    assert len(samples) == 5 * 16000
+    assert peak_frequency(samples, rate) == pytest.approx(440, abs=2)
+    assert np.sqrt(np.mean(samples ** 2)) == pytest.approx(8000 / np.sqrt(2), rel=0.02)
+
+
+def test_normalize_filters_out_tones_above_the_new_nyquist(tmp_path):
+    source, target = tmp_path / "in.wav", tmp_path / "out.wav"
+    write_tone(source, 10000, 2.0, 48000, channels=1)
+
+    assert normalize_wav(str(source), str(target), 16000)
+    samples, _, _ = read_pcm(target)
+    # A 10 kHz tone would alias to 6 kHz at full level without the low-pass
+    assert np.sqrt(np.mean(samples ** 2)) < 8000 / np.sqrt(2) * 0.01
+
+
+def test_normalize_keeps_lower_rates_and_skips_ready_audio(tmp_path):
+    source, target = tmp_path / "in.wav", tmp_path / "out.wav"
+    write_tone(source, 440, 1.0, 8000, channels=2)
+    assert normalize_wav(str(source), str(target), 16000)
+    assert read_pcm(target)[1:] == (8000, 1)
+
+    ready = tmp_path / "ready.wav"
+    write_tone(ready, 440, 1.0, 16000, channels=1)
+    assert not normalize_wav(str(ready), str(tmp_path / "unused.wav"), 16000)
+    assert not (tmp_path / "unused.wav").exists()
@@ -0,0 +1,42 @@
+import pytest
+import requests
+
+from providers import CircuitBreaker, HuggingFaceWhisper, CircuitOpenError
+
+
+def open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    return breaker
+
+
+def test_local_error_during_trial_frees_the_slot(tmp_path):
+    breaker = open_breaker()
+    client = HuggingFaceWhisper("key", "model", base_url="http://127.0.0.1:9", breaker=breaker)
+
+    with pytest.raises(FileNotFoundError):
+        client.transcribe(str(tmp_path / "missing.wav"))
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    admission = breaker.admit()
+    assert admission is not None and admission.trial
+
+
+def test_other_request_errors_reopen_the_circuit(tmp_path, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker._opened_at = -1e9  # long past the reset timeout: half-open
+    client = HuggingFaceWhisper("key", "model", base_url="http://127.0.0.1:9",
+                                max_retries=0, breaker=breaker)
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"RIFF")
+
+    def post(*args, **kwargs):
+        raise requests.exceptions.ChunkedEncodingError("truncated")
+
+    monkeypatch.setattr(client.session, "post", post)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        client.transcribe(str(audio))
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        client.transcribe(str(audio))
@@ -0,0 +1,66 @@
+import mongomock
+import pytest
+from bson import ObjectId
+from flask_jwt_extended import create_access_token
+
+import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, "db", mongomock.MongoClient().get_database("test"))
+    user_id = str(app.db.users.insert_one({"email": "user@example.com"}).inserted_id)
+    with app.app.app_context():
+        token = create_access_token(identity=user_id)
+    client = app.app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    client.user_id = user_id
+    return client
+
+
+def add_transcript(user_id, text, duration=60.0, audio_bytes=1000):
+    analysis = app.analyze_transcript(text, duration)
+    doc = app.TranscriptDocument.create(user_id, "t", text, "a.ogg", analysis,
+                                        duration_seconds=duration, audio_bytes=audio_bytes)
+    doc["_id"] = app.TranscriptDocument.insert(doc)
+    app.UserStatsDocument.record_insert(doc)
+    return doc
+
+
+def rollups(user_id):
+    totals = app.db.user_stats.find_one({"_id": ObjectId(user_id)})
+    buckets = list(app.db.user_stats_buckets.find())
+    return totals, buckets
+
+
+FIELDS = ("transcripts", "words", "sentences", "audio_seconds", "audio_bytes")
+
+
+def test_insert_and_update_apply_deltas(client):
+    first = add_transcript(client.user_id, "One two three. Four five.")
+    add_transcript(client.user_id, "Six seven.", duration=30.0, audio_bytes=500)
+
+    totals, buckets = rollups(client.user_id)
+    assert [totals[f] for f in FIELDS] == [2, 7, 3, 90.0, 1500]
+    assert {b["_id"]["period"] for b in buckets} == {"daily", "weekly"}
+    assert all(b["words"] == 7 for b in buckets)
+
+    # As the PUT route does after its (pipeline) update, which mongomock can't run
+    app.UserStatsDocument.record_update(first, app.analyze_transcript("Just one sentence here.", 60.0))
+
+    totals, buckets = rollups(client.user_id)
+    # Words and sentences move by the edit; counts and audio figures do not
+    assert [totals[f] for f in FIELDS] == [2, 6, 2, 90.0, 1500]
+    assert all((b["words"], b["sentences"], b["transcripts"]) == (6, 2, 2) for b in buckets)
+
+
+def test_delete_subtracts_the_transcript(client):
+    kept = add_transcript(client.user_id, "Kept words here.")
+    gone = add_transcript(client.user_id, "Deleted one. Deleted two.", duration=20.0, audio_bytes=300)
+
+    assert client.delete(f"/api/transcripts/{gone['_id']}").status_code == 200
+
+    totals, buckets = rollups(client.user_id)
+    assert [totals[f] for f in FIELDS] == [1, kept["word_count"], kept["sentence_count"], 60.0, 1000]
+    assert all(b["transcripts"] == 1 for b in buckets)
+    assert client.get("/api/stats").get_json()["transcripts"] == 1
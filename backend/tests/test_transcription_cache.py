@@ -0,0 +1,110 @@
+import mongomock
+import pytest
+
+import app
+from providers import ProviderError
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock.MongoClient().get_database("test")
+    monkeypatch.setattr(app, "db", database)
+    monkeypatch.setattr(app, "transcription_cache", app.TranscriptionCache(
+        lambda: database.transcription_cache, lru_size=0
+    ))
+    return database
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / "clip.flac"
+    path.write_bytes(b"not really audio")
+    return str(path)
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    calls = {"huggingface": 0, "openai": 0, "hf_fails": False}
+
+    def huggingface(path, cancel_event=None):
+        calls["huggingface"] += 1
+        if calls["hf_fails"]:
+            raise ProviderError(503, "loading")
+        return "from huggingface"
+
+    def openai(path):
+        calls["openai"] += 1
+        return "from openai"
+
+    monkeypatch.setattr(app, "HEDGE_ENABLED", False)
+    monkeypatch.setattr(app, "AUDIO_NORMALIZE_ENABLED", False)
+    monkeypatch.setattr(app, "SILENCE_TRIM_ENABLED", False)
+    monkeypatch.setattr(app, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(app.huggingface_whisper, "transcribe", huggingface)
+    monkeypatch.setattr(app.openai_whisper, "transcribe", openai)
+    return calls
+
+
+def transcribe(path):
+    return app.transcribe_upload(path, {}, path)[0]
+
+
+def test_entry_is_tagged_with_the_provider_that_answered(db, audio, providers):
+    assert transcribe(audio) == "from huggingface"
+    assert transcribe(audio) == "from huggingface"
+    assert providers["huggingface"] == 1
+
+    (entry,) = db.transcription_cache.find()
+    assert (entry["provider"], entry["model"]) == ("huggingface", app.HF_WHISPER_MODEL)
+
+
+def test_fallback_result_is_not_stored_as_huggingface(db, audio, providers):
+    providers["hf_fails"] = True
+    assert transcribe(audio) == "from openai"
+
+    (entry,) = db.transcription_cache.find()
+    assert (entry["provider"], entry["model"]) == ("openai", app.OPENAI_WHISPER_MODEL)
+    assert entry["_id"].endswith(":openai:" + app.OPENAI_WHISPER_MODEL)
+
+    # Hugging Face is preferred again once it recovers
+    providers["hf_fails"] = False
+    assert transcribe(audio) == "from huggingface"
+
+
+def test_key_is_the_upload_not_the_provider_audio(db, audio, providers, tmp_path, monkeypatch):
+    # Ogg encodes carry a random stream serial: the provider file differs every time
+    encodes = iter(range(100))
+
+    @app.contextmanager
+    def provider_audio(upload_path, metadata, stored_path):
+        path = tmp_path / f"provider{next(encodes)}.ogg"
+        path.write_bytes(path.name.encode())
+        yield str(path), None
+
+    monkeypatch.setattr(app, "provider_audio", provider_audio)
+    assert transcribe(audio) == "from huggingface"
+    assert transcribe(audio) == "from huggingface"
+    assert providers["huggingface"] == 1
+
+    # A preprocessing change must not reuse the old transcript
+    monkeypatch.setattr(app, "PROVIDER_SAMPLE_RATE", 8000)
+    transcribe(audio)
+    assert providers["huggingface"] == 2
+
+
+def test_hit_restores_the_speech_map(db, audio, providers, monkeypatch):
+    speech = app.SpeechMap([(1.0, 2.5), (4.0, 5.0)], 6.0)
+    speech.applied = True
+
+    @app.contextmanager
+    def provider_audio(upload_path, metadata, stored_path):
+        yield stored_path, speech
+
+    monkeypatch.setattr(app, "provider_audio", provider_audio)
+    transcribe(audio)
+    monkeypatch.setattr(app, "provider_audio", None)  # a hit must not preprocess at all
+
+    text, cached = app.transcribe_upload(audio, {}, audio)
+    assert text == "from huggingface"
+    assert cached.applied and cached.to_list() == [[1.0, 2.5], [4.0, 5.0]]
+    assert cached.speech_seconds == speech.speech_seconds
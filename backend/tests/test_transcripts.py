@@ -0,0 +1,97 @@
+import mongomock
+import pytest
+from bson import ObjectId
+from flask_jwt_extended import create_access_token
+
+import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, "db", mongomock.MongoClient().get_database("test"))
+    user_id = str(app.db.users.insert_one({"email": "user@example.com"}).inserted_id)
+    with app.app.app_context():
+        token = create_access_token(identity=user_id)
+    client = app.app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    client.user_id = user_id
+    return client
+
+
+def test_malformed_cursor_is_a_client_error(client):
+    response = client.get("/api/transcripts?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
+
+
+def test_value_errors_from_the_query_are_server_errors(client, monkeypatch):
+    def broken_page(*args, **kwargs):
+        raise ValueError("unexpected document shape")
+
+    monkeypatch.setattr(app.TranscriptDocument, "find_page", broken_page)
+    assert client.get("/api/transcripts?limit=5").status_code == 500
+
+
+def test_bulk_delete_decrements_stats(client):
+    user_id = client.user_id
+    docs = [
+        app.TranscriptDocument.create(user_id, f"t{i}", "one two. three.", f"r{i}.ogg",
+                                      {"word_count": 3, "sentence_count": 2, "speech_rate": 1.5},
+                                      duration_seconds=10, audio_bytes=100)
+        for i in range(3)
+    ]
+    for doc in docs:
+        doc["_id"] = app.TranscriptDocument.insert(doc)
+        app.UserStatsDocument.record_insert(doc)
+
+    response = client.post("/api/transcripts/bulk",
+                           json={"delete": [str(docs[0]["_id"]), str(docs[1]["_id"])],
+                                 "rename": {str(docs[2]["_id"]): "kept"}})
+    assert response.get_json() == {"deleted": 2, "renamed": 1}
+
+    totals = app.db.user_stats.find_one({"_id": ObjectId(user_id)})
+    assert (totals["transcripts"], totals["words"], totals["audio_bytes"]) == (1, 3, 100)
+    for bucket in app.db.user_stats_buckets.find():
+        assert bucket["transcripts"] == 1
+    assert app.db.transcripts.find_one({"_id": docs[2]["_id"]})["name"] == "kept"
+
+
+def test_legacy_list_returns_every_transcript(client):
+    # More than one keyset batch, and past the old cap of 100
+    for i in range(120):
+        doc = app.TranscriptDocument.create(client.user_id, f"t{i}", "words", None,
+                                            {"word_count": 1, "sentence_count": 1, "speech_rate": 1.0})
+        app.TranscriptDocument.insert(doc)
+
+    items = client.get("/api/transcripts").get_json()
+    assert len(items) == 120
+    assert len({item["id"] for item in items}) == 120
+
+
+def test_bulk_delete_counts_only_what_it_removed(client):
+    docs = []
+    for i in range(3):
+        doc = app.TranscriptDocument.create(client.user_id, f"t{i}", "one two.", None,
+                                            {"word_count": 2, "sentence_count": 1, "speech_rate": 1.0})
+        doc["_id"] = app.TranscriptDocument.insert(doc)
+        app.UserStatsDocument.record_insert(doc)
+        docs.append(doc)
+
+    # Another request got to one of them first
+    assert client.delete(f"/api/transcripts/{docs[0]['_id']}").status_code == 200
+    ids = [str(doc["_id"]) for doc in docs[:2]]
+    response = client.post("/api/transcripts/bulk", json={"delete": ids + ids})
+    assert response.get_json() == {"deleted": 1, "renamed": 0}
+
+    totals = app.db.user_stats.find_one({"_id": ObjectId(client.user_id)})
+    assert (totals["transcripts"], totals["words"]) == (1, 2)
+
+
+def test_token_of_a_deleted_user_is_rejected(client):
+    assert client.get("/api/transcripts?limit=5").status_code == 200
+    app.db.users.delete_one({"_id": ObjectId(client.user_id)})
+    app.user_cache.clear()
+
+    response = client.get("/api/transcripts?limit=5")
+    assert response.status_code == 401
+    assert response.get_json() == {"error": "User not found"}
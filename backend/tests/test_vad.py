@@ -0,0 +1,81 @@
+import wave
+
+import numpy as np
+import pytest
+
+from audio_metadata import probe_audio
+from preprocess import SpeechMap, detect_speech, write_segments
+
+RATE = 16000
+
+
+def write_pcm(path, samples, rate=RATE):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.clip(samples, -32768, 32767).astype("<i2").tobytes())
+
+
+def tone(seconds, amplitude=8000):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return amplitude * np.sin(2 * np.pi * 440 * t)
+
+
+def hiss(seconds):
+    return np.random.default_rng(0).normal(0, 10, int(seconds * RATE))
+
+
+@pytest.fixture
+def speech_gap_speech(tmp_path):
+    path = tmp_path / "speech.wav"
+    write_pcm(path, np.concatenate([tone(1.0), hiss(3.0), tone(1.0)]))
+    return path
+
+
+def test_long_silence_is_cut_with_padding(speech_gap_speech):
+    speech = detect_speech(str(speech_gap_speech), pad_ms=200)
+    assert len(speech.segments) == 2
+    (first_start, first_end), (second_start, second_end) = speech.segments
+    assert first_start == 0.0
+    assert first_end == pytest.approx(1.2, abs=0.05)
+    assert second_start == pytest.approx(3.8, abs=0.05)
+    assert second_end == pytest.approx(5.0, abs=0.01)
+    assert speech.trimmed_seconds == pytest.approx(2.6, abs=0.1)
+
+
+def test_short_pauses_are_kept(tmp_path):
+    path = tmp_path / "pause.wav"
+    write_pcm(path, np.concatenate([tone(1.0), hiss(0.3), tone(1.0), hiss(3.0)]))
+    speech = detect_speech(str(path), min_silence_ms=700, pad_ms=0)
+    assert len(speech.segments) == 1
+    assert speech.segments[0][1] == pytest.approx(2.3, abs=0.05)
+
+
+def test_all_silence_has_no_segments(tmp_path):
+    path = tmp_path / "silence.wav"
+    write_pcm(path, np.zeros(RATE * 2))
+    assert detect_speech(str(path)).segments == []
+
+
+def test_write_segments_keeps_only_speech(speech_gap_speech, tmp_path):
+    speech = detect_speech(str(speech_gap_speech))
+    trimmed = tmp_path / "trimmed.wav"
+    write_segments(str(speech_gap_speech), str(trimmed), speech.segments)
+    assert probe_audio(str(trimmed))["duration"] == pytest.approx(speech.speech_seconds, abs=0.01)
+
+
+def test_to_original_maps_trimmed_time_back():
+    speech = SpeechMap([(0.5, 1.5), (4.0, 6.0)], 8.0)
+    assert speech.to_original(0.0) == 0.5
+    assert speech.to_original(1.0) == 1.5
+    assert speech.to_original(1.25) == 4.25
+    assert speech.to_original(10.0) == 6.0
+    assert SpeechMap([], 3.0).to_original(2.0) == 2.0
+
+
+def test_speech_map_round_trips_through_a_dict():
+    speech = SpeechMap([(0.5, 1.5)], 2.0)
+    speech.applied = True
+    restored = SpeechMap.from_dict(speech.to_dict())
+    assert (restored.segments, restored.duration, restored.applied) == ([(0.5, 1.5)], 2.0, True)
@@ -0,0 +1,148 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# Results like "[API Error: 503]" are failures and must never be cached
+ERROR_MARKER = re.compile(r'^\[.*\]$')
+CACHEABLE_MARKERS = {"[No speech detected]"}
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_audio_file(audio_path):
+    """SHA-256 of the audio bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(audio_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_cacheable(text):
+    if not text:
+        return False
+    text = text.strip()
+    return text in CACHEABLE_MARKERS or not ERROR_MARKER.match(text)
+
+
+class TranscriptionCache:
+    """
+    Two-tier transcription result cache keyed by audio hash, provider and model.
+    An optional in-process LRU sits in front of a Mongo collection whose TTL
+    index (on created_at) handles eviction.
+    """
+
+    def __init__(self, get_collection, ttl_seconds=7 * 24 * 3600, lru_size=256):
+        self._get_collection = get_collection
+        self.ttl_seconds = ttl_seconds
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"lru_hits": 0, "db_hits": 0, "misses": 0, "stores": 0}
+
+    def _collection(self):
+        # The database may be unreachable; the cache then degrades to the LRU
+        try:
+            return self._get_collection()
+        except Exception as e:
+            print(f"Transcription cache collection unavailable: {e}")
+            return None
+
+    @staticmethod
+    def make_key(audio_hash, provider, model):
+        return f"{audio_hash}:{provider}:{model}"
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _lru_get(self, key):
+        if self.lru_size <= 0:
+            return None
+        with self._lock:
+            cached = self._lru.get(key)
+            if cached is None:
+                return None
+            entry, stored_at = cached
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+            return entry
+
+    def _lru_put(self, key, entry, stored_at=None):
+        if self.lru_size <= 0:
+            return
+        with self._lock:
+            self._lru[key] = (entry, stored_at or time.time())
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get(self, key):
+        """Cached text for `key`, or None"""
+        entry = self.get_entry(key)
+        return entry["text"] if entry else None
+
+    def get_entry(self, key):
+        """{"text": ..., "speech": ...} for `key`, or None; speech is whatever put() was given"""
+        entry = self._lru_get(key)
+        if entry is not None:
+            self._count("lru_hits")
+            return entry
+
+        collection = self._collection()
+        if collection is not None:
+            try:
+                doc = collection.find_one({"_id": key}, {"text": 1, "speech": 1, "created_at": 1})
+                if doc:
+                    stored_at = doc["created_at"]
+                    age = (datetime.utcnow() - stored_at).total_seconds()
+                    # The TTL monitor only runs once a minute, so check age here too
+                    if age <= self.ttl_seconds:
+                        entry = {"text": doc["text"], "speech": doc.get("speech")}
+                        self._lru_put(key, entry, time.time() - age)
+                        self._count("db_hits")
+                        return entry
+            except Exception as e:
+                print(f"Transcription cache lookup error: {e}")
+
+        self._count("misses")
+        return None
+
+    def put(self, key, text, provider, model, speech=None):
+        if not is_cacheable(text):
+            return False
+
+        self._lru_put(key, {"text": text, "speech": speech})
+
+        collection = self._collection()
+        if collection is None:
+            return False
+        try:
+            collection.replace_one(
+                {"_id": key},
+                {"_id": key,
+                 "text": text,
+                 "provider": provider,
+                 "model": model,
+                 "speech": speech,
+                 "created_at": datetime.utcnow()},
+                upsert=True
+            )
+            self._count("stores")
+            return True
+        except Exception as e:
+            print(f"Transcription cache store error: {e}")
+            return False
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["lru_entries"] = len(self._lru)
+        lookups = stats["lru_hits"] + stats["db_hits"] + stats["misses"]
+        stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else 0.0
+        return stats